@@ -1,9 +1,11 @@
 import sys
+import multiprocessing
 import os
 import platform
 import json
-import subprocess
-from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QFileDialog, QMessageBox, QLineEdit, QHBoxLayout)
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QFileDialog, QMessageBox, QLineEdit, QHBoxLayout,
+                             QComboBox, QSpinBox)
+from decode_policy import DEFAULT_DECODE_SETTINGS, MODES, MODE_LABELS, load_probe
 
 # Definir las rutas predeterminadas según el sistema operativo
 def get_default_paths():
@@ -86,6 +88,29 @@ class AdminWindow(QWidget):
         urls_recommendation = QLabel(self.get_urls_recommendation())
         urls_recommendation.setStyleSheet("font-size: 10px; color: grey;")
 
+        # Layout para la decodificación por hardware
+        self.decode_settings = dict(DEFAULT_DECODE_SETTINGS, **self.config.get("decode", {}))
+        decode_layout = QHBoxLayout()
+        decode_layout.addWidget(QLabel("Decodificación:"))
+        self.decode_mode_combo = QComboBox()
+        for mode in MODES:
+            self.decode_mode_combo.addItem(MODE_LABELS[mode], mode)
+        if self.decode_settings["mode"] in MODES:
+            self.decode_mode_combo.setCurrentIndex(MODES.index(self.decode_settings["mode"]))
+        decode_layout.addWidget(self.decode_mode_combo)
+        decode_layout.addWidget(QLabel("Pantallas por hardware:"))
+        self.decode_slots_spin = QSpinBox()
+        self.decode_slots_spin.setRange(0, 64)
+        self.decode_slots_spin.setValue(int(self.decode_settings["slots"]))
+        decode_layout.addWidget(self.decode_slots_spin)
+        reprobe_button = QPushButton("Volver a Detectar")
+        reprobe_button.clicked.connect(lambda: self.show_decode_probe(reprobe=True))
+        decode_layout.addWidget(reprobe_button)
+
+        self.decode_probe_label = QLabel()
+        self.decode_probe_label.setStyleSheet("font-size: 10px; color: grey;")
+        self.show_decode_probe()
+
         # Añadir las rutas actuales al layout principal
         main_layout.addLayout(vlc_lib_layout)
         main_layout.addWidget(vlc_lib_recommendation)
@@ -96,6 +121,9 @@ class AdminWindow(QWidget):
         main_layout.addLayout(urls_layout)
         main_layout.addWidget(urls_recommendation)
 
+        main_layout.addLayout(decode_layout)
+        main_layout.addWidget(self.decode_probe_label)
+
         # Botón para guardar la configuración
         save_button = QPushButton("Guardar Configuración")
         save_button.clicked.connect(self.save_configuration)
@@ -158,6 +186,14 @@ class AdminWindow(QWidget):
         else:
             return "Ingrese la ruta del archivo JSON donde almacenar las URLs."
 
+    def show_decode_probe(self, reprobe=False):
+        """Mostrar la aceleración por hardware detectada (guardada, o detectándola de nuevo)."""
+        probe = load_probe(self.decode_settings["cache"], reprobe)
+        if probe["backends"]:
+            self.decode_probe_label.setText(f"Aceleración detectada: {', '.join(probe['backends'])}")
+        else:
+            self.decode_probe_label.setText("No se detectó aceleración por hardware (en modo automático se decodifica por software).")
+
     def select_vlc_lib_path(self):
         """Seleccionar la ruta de libvlc.dll o libvlc.dylib"""
         file_path, _ = QFileDialog.getOpenFileName(self, "Seleccionar librería VLC", "", "Dynamic Library Files (*.dll *.dylib)")
@@ -200,6 +236,9 @@ class AdminWindow(QWidget):
         self.config["vlc_lib_path"] = self.vlc_lib_input.text()
         self.config["vlc_core_path"] = self.vlc_core_input.text()
         self.config["urls_file"] = self.urls_input.text()
+        self.decode_settings["mode"] = self.decode_mode_combo.currentData()
+        self.decode_settings["slots"] = self.decode_slots_spin.value()
+        self.config["decode"] = self.decode_settings
 
         # Validar antes de guardar
         vlc_lib_path = self.config["vlc_lib_path"]
@@ -218,15 +257,20 @@ class AdminWindow(QWidget):
             QMessageBox.warning(self, "Error al Guardar", "Las rutas proporcionadas no son válidas. Por favor, verifique.")
 
     def open_multiviewer(self):
-        """Abrir el archivo multiviewer.py una vez que las configuraciones estén guardadas"""
+        """Abrir el visor en este mismo proceso una vez que las configuraciones estén guardadas"""
         self.save_configuration()  # Guardar la configuración antes de abrir
         try:
-            subprocess.Popen(["python3", "multiviewer.py"])
-            self.close()  # Cerrar la ventana actual de admin_multiviewer
-        except FileNotFoundError:
-            QMessageBox.critical(self, "Error", "No se pudo encontrar el archivo multiviewer.py para ejecutarlo. Verifique la ubicación.")
+            # El visor y sus dependencias se importan recién aquí
+            from multiviewer import MainWindow
+        except ImportError as e:
+            QMessageBox.critical(self, "Error", f"No se pudo cargar el visor: {e}")
+            return
+        self.main_window = MainWindow()
+        self.main_window.show()
+        self.close()  # Cerrar la ventana actual de admin_multiviewer
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Procesos de decodificación en el ejecutable empaquetado
     app = QApplication(sys.argv)
     window = AdminWindow()
     window.show()
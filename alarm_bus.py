@@ -0,0 +1,268 @@
+import collections
+import json
+import queue
+import threading
+import time
+from PyQt5.QtCore import QObject, QTimer, QCoreApplication, pyqtSignal
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QListWidget, QListWidgetItem
+
+SEVERITY_INFO = 0
+SEVERITY_WARNING = 1
+SEVERITY_CRITICAL = 2
+
+SEVERITY_NAMES = {
+    SEVERITY_INFO: "info",
+    SEVERITY_WARNING: "warning",
+    SEVERITY_CRITICAL: "critical",
+}
+SEVERITY_COLORS = {
+    SEVERITY_INFO: "#8ab4f8",
+    SEVERITY_WARNING: "#f5c542",
+    SEVERITY_CRITICAL: "#ff5555",
+}
+
+# Periodo con que se procesa la cola de alarmas (agrupa ráfagas en un solo refresco)
+DRAIN_MS = 250
+# Una misma alarma que se repite no se registra más de una vez cada N segundos
+LOG_MIN_INTERVAL = 10.0
+# Archivo de registro por defecto (se puede cambiar con la clave "alarm_log")
+DEFAULT_ALARM_LOG = "multiviewer_alarms.log"
+
+_bus = None
+
+
+def get_alarm_bus():
+    """Obtener el bus de alarmas único de la aplicación."""
+    global _bus
+    if _bus is None:
+        _bus = AlarmBus(parent=QCoreApplication.instance())
+    return _bus
+
+
+class Alarm:
+    """Alarma activa identificada por su origen (pantalla) y su tipo."""
+    def __init__(self, source, kind, severity, message, label, now):
+        self.source = source
+        self.kind = kind
+        self.severity = severity
+        self.message = message
+        self.label = label
+        self.raised_at = now
+        self.last_seen = now
+        self.count = 1
+
+    def as_record(self, event):
+        """Representación para el registro en disco."""
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "event": event,
+            "source": self.source,
+            "label": self.label,
+            "kind": self.kind,
+            "severity": SEVERITY_NAMES[self.severity],
+            "message": self.message,
+            "count": self.count,
+        }
+
+
+class AlarmLog:
+    """Registro de alarmas en disco (solo se añade) escrito desde un hilo propio."""
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="alarm-log", daemon=True)
+        self.thread.start()
+
+    def write(self, record):
+        """Encolar un registro sin bloquear la interfaz."""
+        self.queue.put(record)
+
+    def run(self):
+        """Bucle del hilo de escritura."""
+        while True:
+            record = self.queue.get()
+            if record is None:
+                return
+            records = [record]
+            # Escribir de una vez todo lo que se haya acumulado
+            while True:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    self.append(records)
+                    return
+                records.append(record)
+            self.append(records)
+
+    def append(self, records):
+        """Añadir registros al final del archivo."""
+        try:
+            with open(self.path, 'a') as file:
+                for record in records:
+                    file.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Error al escribir el registro de alarmas: {e}")
+
+    def close(self):
+        """Terminar de escribir lo pendiente y detener el hilo."""
+        self.queue.put(None)
+        self.thread.join(timeout=2.0)
+
+
+class AlarmBus(QObject):
+    """Bus de alarmas no modal con cola, deduplicación y límite de frecuencia.
+
+    Las pantallas publican con raise_alarm/clear_alarm (desde cualquier hilo);
+    la cola se procesa periódicamente en el hilo de la interfaz, de modo que
+    una ráfaga (por ejemplo diez pantallas que caen a la vez) produce un único
+    refresco del panel y una sola escritura en el registro.
+    """
+    alarms_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending = collections.deque()
+        self.active = {}  # (origen, tipo) -> Alarm
+        self.overlays = {}  # origen -> función que recibe la severidad máxima
+        self.last_logged = {}  # (origen, tipo) -> instante del último registro
+        self.suppressed = collections.Counter()
+        self.log = None
+
+        self.drain_timer = QTimer(self)
+        self.drain_timer.timeout.connect(self.drain)
+        self.drain_timer.start(DRAIN_MS)
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close)
+
+    def configure(self, log_path):
+        """Abrir el registro de alarmas en disco."""
+        if self.log is None and log_path:
+            self.log = AlarmLog(log_path)
+
+    def register_overlay(self, source, callback):
+        """Recibir la severidad máxima de un origen cada vez que cambie (None si no hay alarmas)."""
+        self.overlays[source] = callback
+
+    def unregister_overlay(self, source):
+        """Dejar de notificar a un origen (al cerrar su pantalla)."""
+        self.overlays.pop(source, None)
+
+    def raise_alarm(self, source, kind, severity, message, label=None):
+        """Publicar (o mantener) una alarma."""
+        self.pending.append(("raise", source, kind, severity, message, label or source, time.time()))
+
+    def clear_alarm(self, source, kind):
+        """Indicar que la condición de una alarma ya no se cumple."""
+        self.pending.append(("clear", source, kind, None, None, None, time.time()))
+
+    def clear_source(self, source):
+        """Borrar todas las alarmas de un origen (al detener o cerrar una pantalla)."""
+        self.pending.append(("clear_source", source, None, None, None, None, time.time()))
+
+    def drain(self):
+        """Aplicar los eventos encolados y notificar una sola vez."""
+        if not self.pending:
+            return
+        changed_sources = set()
+        while self.pending:
+            operation, source, kind, severity, message, label, now = self.pending.popleft()
+            if operation == "clear_source":
+                for key in [key for key in self.active if key[0] == source]:
+                    self.write_log(key, self.active.pop(key), "cleared", now)
+                    changed_sources.add(source)
+                continue
+            key = (source, kind)
+            alarm = self.active.get(key)
+            if operation == "raise":
+                if alarm is not None:
+                    # Duplicado: solo se actualiza el contador
+                    alarm.count += 1
+                    alarm.last_seen = now
+                    if alarm.severity != severity or alarm.message != message:
+                        alarm.severity = severity
+                        alarm.message = message
+                        changed_sources.add(source)
+                    continue
+                alarm = Alarm(source, kind, severity, message, label, now)
+                self.active[key] = alarm
+                self.write_log(key, alarm, "raised", now)
+                changed_sources.add(source)
+            elif alarm is not None:
+                del self.active[key]
+                self.write_log(key, alarm, "cleared", now)
+                changed_sources.add(source)
+
+        if changed_sources:
+            for source in changed_sources:
+                callback = self.overlays.get(source)
+                if callback is not None:
+                    callback(self.max_severity(source))
+            self.alarms_changed.emit()
+
+    def write_log(self, key, alarm, event, now):
+        """Escribir en el registro respetando el límite de frecuencia por alarma."""
+        if self.log is None:
+            return
+        last = self.last_logged.get(key)
+        # Solo se limitan las repeticiones; el fin de una alarma siempre se registra
+        if event == "raised" and last is not None and now - last < LOG_MIN_INTERVAL:
+            self.suppressed[key] += 1
+            return
+        record = alarm.as_record(event)
+        if self.suppressed[key]:
+            record["suppressed"] = self.suppressed.pop(key)
+        self.last_logged[key] = now
+        self.log.write(record)
+
+    def max_severity(self, source):
+        """Severidad más alta activa para un origen, o None."""
+        severities = [alarm.severity for (active_source, _), alarm in self.active.items()
+                      if active_source == source]
+        return max(severities) if severities else None
+
+    def active_alarms(self):
+        """Alarmas activas ordenadas por severidad y antigüedad."""
+        return sorted(self.active.values(), key=lambda alarm: (-alarm.severity, alarm.raised_at))
+
+    def close(self):
+        """Procesar lo pendiente y cerrar el registro."""
+        self.drain()
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+
+class AlarmPanel(QListWidget):
+    """Panel no modal con las alarmas activas agrupadas por tipo."""
+    def __init__(self, bus, parent=None):
+        super().__init__(parent)
+        self.bus = bus
+        self.setMaximumHeight(90)
+        self.setStyleSheet("background-color: #222; border: 1px solid #555; border-radius: 5px;")
+        bus.alarms_changed.connect(self.refresh)
+        self.refresh()
+
+    def refresh(self):
+        """Redibujar el panel con una línea por tipo de alarma."""
+        groups = collections.OrderedDict()
+        for alarm in self.bus.active_alarms():
+            group = groups.setdefault((alarm.severity, alarm.kind), [])
+            group.append(alarm)
+
+        self.clear()
+        if not groups:
+            item = QListWidgetItem("Sin alarmas activas")
+            item.setForeground(QColor("#888"))
+            self.addItem(item)
+            return
+        for (severity, _), alarms in groups.items():
+            labels = ", ".join(alarm.label for alarm in alarms)
+            text = f"{alarms[0].message} ({len(alarms)}): {labels}"
+            item = QListWidgetItem(text)
+            item.setForeground(QColor(SEVERITY_COLORS[severity]))
+            self.addItem(item)
@@ -0,0 +1,293 @@
+"""Captura del audio de cada pantalla para los medidores, el espectro y la escucha.
+
+Uso:
+    python audio_meter.py --self-test     Comprobar el búfer circular y los niveles
+"""
+import argparse
+import ctypes
+import sys
+import threading
+import numpy as np
+import vlc
+from PyQt5.QtCore import QObject, QTimer
+
+# Formato fijo en el que libvlc entrega el PCM decodificado
+SAMPLE_RATE = 48000
+CHANNELS = 2
+# Segundos de audio que conserva el búfer circular de cada pantalla
+RING_SECONDS = 1.0
+# Tamaño de la ventana de análisis (RMS/pico/FFT)
+FFT_SIZE = 2048
+SPECTRUM_BANDS = 100
+# Rango del medidor: -60 dBFS se muestra como 0 y 0 dBFS como 100
+METER_FLOOR_DB = -60.0
+SILENCE_DB = -120.0
+
+
+def to_db(values):
+    """Convertir amplitudes lineales a dBFS."""
+    return 20.0 * np.log10(np.maximum(values, 10 ** (SILENCE_DB / 20.0)))
+
+
+def db_to_meter(db):
+    """Escalar dBFS al rango 0-100 de la barra de nivel."""
+    return np.clip((db - METER_FLOOR_DB) * (100.0 / -METER_FLOOR_DB), 0.0, 100.0)
+
+
+def compute_levels(frames):
+    """Calcular pico y RMS en dBFS de bloques (..., muestras, canales)."""
+    peak = np.max(np.abs(frames), axis=(-2, -1))
+    rms = np.sqrt(np.mean(np.square(frames), axis=(-2, -1)))
+    return to_db(peak), to_db(rms)
+
+
+def spectrum_band_edges(fft_size=FFT_SIZE, bands=SPECTRUM_BANDS, sample_rate=SAMPLE_RATE):
+    """Índices de inicio de cada banda logarítmica entre 20 Hz y Nyquist."""
+    bins = fft_size // 2 + 1
+    freqs = np.geomspace(20.0, sample_rate / 2.0, bands + 1)[:-1]
+    edges = np.round(freqs * fft_size / sample_rate).astype(np.intp)
+    # Cada banda debe tener al menos un bin y los índices deben ser crecientes
+    edges = np.maximum(edges, np.arange(bands))
+    return np.minimum(edges, bins - 1)
+
+
+def compute_spectrum(frames, window, band_edges):
+    """Espectro por bandas (0-100) de bloques (..., muestras, canales)."""
+    mono = frames.mean(axis=-1) * window
+    magnitude = np.abs(np.fft.rfft(mono, axis=-1)) * (2.0 / window.sum())
+    bands = np.maximum.reduceat(magnitude, band_edges, axis=-1)
+    return db_to_meter(to_db(bands))
+
+
+class AudioTap:
+    """Captura el PCM decodificado de un reproductor VLC en un búfer circular.
+
+    Los callbacks de audio de libvlc reemplazan la salida de sonido, por eso el
+    volumen se recibe por callback (sin escalar las muestras): el medidor sigue
+    funcionando aunque la pantalla esté silenciada y la escucha la hace
+    AudioMonitorOutput solo para la pantalla activa.
+    """
+    def __init__(self, player, sample_rate=SAMPLE_RATE, channels=CHANNELS, seconds=RING_SECONDS):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.capacity = int(sample_rate * seconds)
+        self.ring = np.zeros((self.capacity, channels), dtype=np.float32)
+        self.write_pos = 0  # Total de muestras escritas desde el inicio
+        self.lock = threading.Lock()
+        self.volume = 0.0
+        self.muted = False
+
+        # Mantener referencias a los callbacks para que ctypes no los libere
+        self._play_cb = vlc.CallbackDecorators.AudioPlayCb(self._on_play)
+        self._flush_cb = vlc.CallbackDecorators.AudioFlushCb(self._on_flush)
+        self._volume_cb = vlc.CallbackDecorators.AudioSetVolumeCb(self._on_volume)
+        player.audio_set_callbacks(self._play_cb, None, None, self._flush_cb, None, None)
+        player.audio_set_volume_callback(self._volume_cb)
+        player.audio_set_format("FL32", sample_rate, channels)
+
+    def _on_play(self, data, samples, count, pts):
+        """Copiar las muestras entregadas por libvlc (hilo de audio de VLC)."""
+        if not count:
+            return
+        buffer = (ctypes.c_float * (count * self.channels)).from_address(samples)
+        pcm = np.frombuffer(buffer, dtype=np.float32).reshape(count, self.channels)
+        self.write(pcm)
+
+    def _on_flush(self, data, pts):
+        """Descartar el audio pendiente cuando libvlc lo solicita."""
+        self.reset()
+
+    def _on_volume(self, data, volume, mute):
+        """Recordar el volumen pedido sin aplicarlo a las muestras medidas."""
+        self.volume = float(volume)
+        self.muted = bool(mute)
+
+    def write(self, pcm):
+        """Escribir un bloque (muestras, canales) en el búfer circular."""
+        count = len(pcm)
+        with self.lock:
+            if count > self.capacity:
+                # Solo caben las últimas muestras: las descartadas cuentan como ya escritas
+                self.write_pos += count - self.capacity
+                pcm = pcm[-self.capacity:]
+                count = self.capacity
+            start = self.write_pos % self.capacity
+            first = min(len(pcm), self.capacity - start)
+            self.ring[start:start + first] = pcm[:first]
+            if first < len(pcm):
+                self.ring[:len(pcm) - first] = pcm[first:]
+            self.write_pos += count
+
+    def read_latest(self, out):
+        """Copiar en `out` las últimas len(out) muestras. Devuelve la posición de escritura."""
+        frames = len(out)
+        with self.lock:
+            end = self.write_pos % self.capacity
+            if end >= frames:
+                out[:] = self.ring[end - frames:end]
+            else:
+                out[:frames - end] = self.ring[self.capacity - (frames - end):]
+                out[frames - end:] = self.ring[:end]
+            return self.write_pos
+
+    def read_since(self, position, max_frames):
+        """Leer las muestras escritas después de `position` (para la escucha)."""
+        with self.lock:
+            position = max(position, self.write_pos - self.capacity)
+            frames = min(self.write_pos - position, max_frames)
+            start = position % self.capacity
+            first = min(frames, self.capacity - start)
+            data = np.concatenate((self.ring[start:start + first], self.ring[:frames - first]))
+            return data, position + frames
+
+    def read_block(self, position, out):
+        """Copiar en `out` las len(out) muestras siguientes a `position`, si ya llegaron.
+
+        Devuelve la posición siguiente, o None si aún no hay un bloque completo.
+        Si el lector se quedó más de un búfer atrás, salta a lo más antiguo que se conserva.
+        """
+        frames = len(out)
+        with self.lock:
+            position = max(position, self.write_pos - self.capacity)
+            if self.write_pos - position < frames:
+                return None
+            start = position % self.capacity
+            first = min(frames, self.capacity - start)
+            out[:first] = self.ring[start:start + first]
+            out[first:] = self.ring[:frames - first]
+            return position + frames
+
+    def reset(self):
+        """Vaciar el búfer (por ejemplo al detener el stream)."""
+        with self.lock:
+            self.ring.fill(0.0)
+
+
+class AudioMeter:
+    """Medidor de nivel y espectro de una pantalla a partir de un AudioTap."""
+    def __init__(self, player, fft_size=FFT_SIZE, bands=SPECTRUM_BANDS):
+        self.tap = AudioTap(player)
+        # Búferes reutilizados en cada lectura
+        self.frames = np.zeros((fft_size, self.tap.channels), dtype=np.float32)
+        self.window = np.hanning(fft_size).astype(np.float32)
+        self.band_edges = spectrum_band_edges(fft_size, bands, self.tap.sample_rate)
+        self.silent_spectrum = np.zeros(bands)
+        self.last_position = 0
+
+    def snapshot(self, out):
+        """Copiar la ventana de análisis más reciente en `out`. Devuelve False si no hay audio nuevo."""
+        position = self.tap.read_latest(out)
+        if position == self.last_position:
+            # Sin audio nuevo: el stream está detenido o sin pista de audio
+            return False
+        self.last_position = position
+        return True
+
+    def read_levels(self):
+        """Devolver (nivel 0-100, pico dBFS, RMS dBFS, espectro 0-100)."""
+        if not self.snapshot(self.frames):
+            return 0.0, SILENCE_DB, SILENCE_DB, self.silent_spectrum
+        peak_db, rms_db = compute_levels(self.frames)
+        spectrum = compute_spectrum(self.frames, self.window, self.band_edges)
+        return float(db_to_meter(peak_db)), float(peak_db), float(rms_db), spectrum
+
+    def reset(self):
+        """Vaciar el audio capturado."""
+        self.tap.reset()
+
+
+class AudioMonitorOutput(QObject):
+    """Reproduce por la tarjeta de sonido el audio capturado de una pantalla."""
+    def __init__(self, tap, parent=None):
+        super().__init__(parent)
+        # QtMultimedia solo se carga cuando alguien escucha una pantalla
+        from PyQt5.QtMultimedia import QAudioFormat, QAudioOutput
+        self.tap = tap
+        audio_format = QAudioFormat()
+        audio_format.setSampleRate(tap.sample_rate)
+        audio_format.setChannelCount(tap.channels)
+        audio_format.setSampleSize(16)
+        audio_format.setCodec("audio/pcm")
+        audio_format.setByteOrder(QAudioFormat.LittleEndian)
+        audio_format.setSampleType(QAudioFormat.SignedInt)
+        self.output = QAudioOutput(audio_format, self)
+        self.device = None
+        self.position = 0
+
+        self.pump_timer = QTimer(self)
+        self.pump_timer.timeout.connect(self.pump)
+
+    def start(self):
+        """Empezar a escuchar desde el audio más reciente."""
+        self.device = self.output.start()
+        self.position = self.tap.write_pos
+        self.pump_timer.start(20)
+
+    def stop(self):
+        """Dejar de escuchar la pantalla."""
+        self.pump_timer.stop()
+        self.output.stop()
+        self.device = None
+
+    def pump(self):
+        """Enviar a la salida de audio las muestras nuevas que quepan."""
+        if self.device is None:
+            return
+        bytes_per_frame = 2 * self.tap.channels
+        max_frames = self.output.bytesFree() // bytes_per_frame
+        if max_frames <= 0:
+            return
+        data, self.position = self.tap.read_since(self.position, max_frames)
+        if len(data):
+            gain = 0.0 if self.tap.muted else self.tap.volume
+            pcm = np.clip(data * gain, -1.0, 1.0) * 32767.0
+            self.device.write(pcm.astype('<i2').tobytes())
+
+
+def self_test():
+    """Comprobar el búfer circular y los niveles sin libvlc ni dispositivo de audio."""
+    class Player:
+        def audio_set_callbacks(self, *callbacks):
+            pass
+
+        def audio_set_volume_callback(self, callback):
+            pass
+
+        def audio_set_format(self, *audio_format):
+            pass
+
+    def ramp(start, count):
+        return np.repeat(np.arange(start, start + count, dtype=np.float32)[:, None], 2, axis=1)
+
+    tap = AudioTap(Player(), sample_rate=10, seconds=1.0)
+    tap.write(ramp(0, 3))
+    tap.write(ramp(100, 15))  # Más que el búfer entero: solo se conservan las 10 últimas
+    out = np.zeros((4, 2), dtype=np.float32)
+    assert tap.read_latest(out) == 18
+    assert out[:, 0].tolist() == [111, 112, 113, 114], out[:, 0]
+    data, position = tap.read_since(0, 100)
+    assert position == 18 and data[:, 0].tolist() == list(range(105, 115)), data[:, 0]
+
+    tap.write(ramp(200, 7))  # Da la vuelta al final del búfer
+    assert tap.read_latest(out) == 25 and out[:, 0].tolist() == [203, 204, 205, 206], out[:, 0]
+    data, position = tap.read_since(20, 100)
+    assert position == 25 and data[:, 0].tolist() == [202, 203, 204, 205, 206], data[:, 0]
+
+    peak, rms = compute_levels(np.full((FFT_SIZE, 2), 0.5, dtype=np.float32))
+    assert abs(peak + 6.02) < 0.01 and abs(rms - peak) < 0.01, (peak, rms)
+    print("Prueba de la captura de audio correcta")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Captura de audio del MultiViewer")
+    parser.add_argument("--self-test", action="store_true", help="comprobar el búfer circular y los niveles")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return self_test()
+    parser.print_help()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,699 @@
+"""Mediciones de arranque, rendimiento y estabilidad del MultiViewer.
+
+Uso:
+    python benchmark_multiviewer.py imports [--module combined_multiviewer] [--repeat 5]
+                                            [--top 15] [--budget-ms 400]
+    python benchmark_multiviewer.py tiles [--counts 8 15 40 75] [--seconds 30] [--kind hls|ts]
+                                          [--workers 0] [--output antes.json] [--baseline antes.json]
+    python benchmark_multiviewer.py soak [--hours 4] [--tiles 15] [--cycle-seconds 60]
+    python benchmark_multiviewer.py serve [--sources 75] [--port 8900]
+
+`imports` importa el módulo en un intérprete nuevo con `-X importtime`, muestra
+los módulos que más tardan y falla (código de salida 1) si se cargó alguna
+dependencia pesada que ese punto de entrada no debería necesitar, o si se supera
+el presupuesto indicado.
+
+`tiles` sirve N fuentes sintéticas (patrón de prueba en HLS en directo o TS
+continuo desde un servidor HTTP local) y, para cada cantidad de pantallas,
+abre el visor sin pantalla (plataforma offscreen de Qt) en un proceso nuevo.
+Mide el arranque, la CPU y la memoria por pantalla (con psutil, incluidos los
+procesos de decodificación), el desfase de un temporizador de 10 ms y la
+latencia del bucle de eventos. Con --output se guardan los resultados y con
+--baseline se comparan con los de una ejecución anterior (antes/después de un cambio).
+
+`soak` abre y cierra la ventana con sus reproductores en ciclos durante horas
+y falla si la memoria, los descriptores/handles o los hilos crecen de forma
+sostenida. `serve` solo levanta las fuentes sintéticas (para pruebas a mano).
+
+El patrón de prueba se genera una vez con ffmpeg en bench_media/ (o se usa el
+de --media: una carpeta con pattern.m3u8 y sus segmentos).
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Dependencias que solo necesita el visor (libvlc, cálculo de audio y gráficos)
+HEAVY_MODULES = ("vlc", "numpy", "pyqtgraph", "psutil")
+# Dependencias pesadas que cada punto de entrada no debe cargar al importarse
+IMPORT_CHECKS = {
+    "combined_multiviewer": HEAVY_MODULES,
+    "admin_multiviewer": HEAVY_MODULES,
+    "multiviewer": (),
+}
+
+# Cantidades de pantallas que se miden por defecto
+TILE_COUNTS = (8, 15, 40, 75)
+# Carpeta donde se genera el patrón de prueba y duración del bucle
+MEDIA_DIR = os.path.join(HERE, "bench_media")
+MEDIA_SECONDS = 10
+SEGMENT_SECONDS = 2
+# Segmentos que anuncia la lista HLS en directo
+LIVE_WINDOW = 3
+# Periodo del temporizador con que se mide el desfase, y de las sondas del bucle de eventos
+JITTER_INTERVAL_MS = 10
+LATENCY_PROBE_MS = 100
+# Espera máxima a que todas las pantallas estén en reproducción
+STARTUP_TIMEOUT = 120.0
+# Ciclos iniciales del soak que no cuentan (cachés y asignadores se estabilizan)
+SOAK_WARMUP_CYCLES = 3
+# Prefijo de la línea con la que el proceso medido entrega sus resultados
+RESULT_PREFIX = "RESULTADO "
+# Métricas que se comparan con --baseline: (clave, etiqueta, formato)
+REPORT_COLUMNS = (
+    ("startup_seconds", "arranque s", "{:.2f}"),
+    ("cpu_per_tile", "CPU/pant. %", "{:.1f}"),
+    ("rss_per_tile_mb", "RSS/pant. MB", "{:.1f}"),
+    ("jitter_p99_ms", "desfase p99 ms", "{:.1f}"),
+    ("latency_p99_ms", "latencia p99 ms", "{:.1f}"),
+)
+
+
+def measure_imports(module):
+    """Importar `module` en un intérprete nuevo y devolver las filas de -X importtime.
+
+    Cada fila es (nombre, microsegundos propios, microsegundos acumulados).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=HERE, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # Encabezado
+        rows.append((fields[2].strip(), self_us, cumulative_us))
+    return rows
+
+
+def report_imports(module, repeat, top, budget_ms):
+    """Medir los imports de un punto de entrada y devolver si pasa los controles."""
+    runs = [measure_imports(module) for _ in range(repeat)]
+    totals = [sum(self_us for _, self_us, _ in rows) / 1000.0 for rows in runs]
+    total_ms = statistics.median(totals)
+    # Se detalla la ejecución central para que el informe no dependa de un caso extremo
+    rows = sorted(zip(totals, runs), key=lambda run: run[0])[len(runs) // 2][1]
+    loaded = {name for name, _, _ in rows}
+
+    print(f"{module}: {total_ms:.1f} ms (mediana de {repeat}, mín {min(totals):.1f}, máx {max(totals):.1f})")
+    print(f"  {'propio ms':>10} {'acum. ms':>10}  módulo")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[1])[:top]:
+        print(f"  {self_us / 1000.0:10.1f} {cumulative_us / 1000.0:10.1f}  {name}")
+
+    ok = True
+    unexpected = [name for name in IMPORT_CHECKS.get(module, ()) if name in loaded]
+    if unexpected:
+        print(f"FALLO: {module} carga dependencias del visor: {', '.join(unexpected)}")
+        ok = False
+    if budget_ms is not None and total_ms > budget_ms:
+        print(f"FALLO: {module} tarda {total_ms:.1f} ms en importarse (presupuesto {budget_ms:.1f} ms)")
+        ok = False
+    return ok
+
+
+def generate_media(directory, seconds=MEDIA_SECONDS, segment_seconds=SEGMENT_SECONDS):
+    """Generar con ffmpeg un patrón de prueba 720p con tono de 1 kHz en segmentos HLS."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("No se encontró ffmpeg para generar el patrón de prueba; "
+                           "instálelo o indique una carpeta con --media")
+    os.makedirs(directory, exist_ok=True)
+    fps = 25
+    subprocess.run([
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate={fps}",
+        "-f", "lavfi", "-i", "sine=frequency=1000:sample_rate=48000",
+        "-t", str(seconds),
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-b:v", "2500k",
+        "-g", str(fps * segment_seconds), "-keyint_min", str(fps * segment_seconds), "-sc_threshold", "0",
+        "-c:a", "aac", "-b:a", "128k", "-ac", "2",
+        "-f", "hls", "-hls_time", str(segment_seconds), "-hls_list_size", "0",
+        "-hls_segment_filename", os.path.join(directory, "pattern%03d.ts"),
+        os.path.join(directory, "pattern.m3u8"),
+    ], check=True)
+
+
+def load_media(directory):
+    """Leer los segmentos del patrón: lista de (bytes, duración)."""
+    from hls_playlist import parse_playlist
+    playlist_path = os.path.join(directory, "pattern.m3u8")
+    if not os.path.exists(playlist_path):
+        generate_media(directory)
+    with open(playlist_path, "r") as file:
+        playlist = parse_playlist(file.read())
+    segments = []
+    for segment in playlist.segments:
+        with open(os.path.join(directory, os.path.basename(segment.uri)), "rb") as file:
+            segments.append((file.read(), segment.duration))
+    if not segments:
+        raise RuntimeError(f"{playlist_path} no tiene segmentos")
+    return segments
+
+
+class SyntheticSources:
+    """Servidor HTTP local con `count` canales que repiten el patrón de prueba.
+
+    Cada canal tiene su propia URL (así el visor no los comparte) y se ofrece
+    como lista HLS en directo (/chN/live.m3u8, una ventana deslizante que da la
+    vuelta al patrón con #EXT-X-DISCONTINUITY) o como TS continuo
+    (/chN/stream.ts, entregado al ritmo real).
+    """
+    def __init__(self, segments, count, port=0):
+        self.segments = segments
+        self.count = count
+        self.loop_seconds = sum(duration for _, duration in segments)
+        self.target = max(int(duration + 0.999) for _, duration in segments)
+        self.started = time.monotonic()
+        sources = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                sources.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="bench-sources", daemon=True)
+        self.thread.start()
+
+    def url(self, index, kind="hls"):
+        path = "live.m3u8" if kind == "hls" else "stream.ts"
+        return f"http://127.0.0.1:{self.server.server_address[1]}/ch{index}/{path}"
+
+    def sequence_start(self, sequence):
+        """Segundos desde el inicio en que empieza el segmento número `sequence`."""
+        loops, position = divmod(sequence, len(self.segments))
+        return loops * self.loop_seconds + sum(duration for _, duration in self.segments[:position])
+
+    def live_playlist(self):
+        elapsed = time.monotonic() - self.started
+        loops = int(elapsed // self.loop_seconds)
+        sequence = loops * len(self.segments)
+        while self.sequence_start(sequence + 1) <= elapsed:
+            sequence += 1
+        first = max(0, sequence - LIVE_WINDOW + 1)
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{self.target}",
+                 f"#EXT-X-MEDIA-SEQUENCE:{first}",
+                 f"#EXT-X-DISCONTINUITY-SEQUENCE:{first // len(self.segments)}"]
+        for number in range(first, sequence + 1):
+            if number > first and number % len(self.segments) == 0:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines.append(f"#EXTINF:{self.segments[number % len(self.segments)][1]:.3f},")
+            lines.append(f"seg{number}.ts")
+        return ("\n".join(lines) + "\n").encode()
+
+    def handle(self, request):
+        parts = request.path.strip("/").split("/")
+        if len(parts) != 2 or not parts[0].startswith("ch"):
+            request.send_error(404)
+            return
+        name = parts[1]
+        try:
+            if name == "live.m3u8":
+                self.send(request, "application/vnd.apple.mpegurl", self.live_playlist())
+            elif name.startswith("seg") and name.endswith(".ts"):
+                number = int(name[3:-3])
+                self.send(request, "video/mp2t", self.segments[number % len(self.segments)][0])
+            elif name == "stream.ts":
+                self.stream(request)
+            else:
+                request.send_error(404)
+        except (BrokenPipeError, ConnectionResetError, ValueError):
+            pass  # El visor cerró la conexión
+
+    @staticmethod
+    def send(request, content_type, body):
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.send_header("Cache-Control", "no-cache")
+        request.end_headers()
+        request.wfile.write(body)
+
+    def stream(self, request):
+        """TS continuo: los segmentos en bucle, con un segmento de adelanto sobre el tiempo real."""
+        request.send_response(200)
+        request.send_header("Content-Type", "video/mp2t")
+        request.end_headers()
+        started = time.monotonic()
+        sent = 0.0
+        for number in range(sys.maxsize):
+            body, duration = self.segments[number % len(self.segments)]
+            request.wfile.write(body)
+            sent += duration
+            delay = sent - duration - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentile(values, fraction):
+    """Percentil por el método de la posición más cercana (0 si no hay valores)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def process_usage(process):
+    """(segundos de CPU, bytes de RSS, hilos, descriptores o handles) del proceso y sus hijos."""
+    import psutil
+    cpu = rss = threads = handles = 0
+    for member in [process] + process.children(recursive=True):
+        try:
+            with member.oneshot():
+                times = member.cpu_times()
+                cpu += times.user + times.system
+                rss += member.memory_info().rss
+                threads += member.num_threads()
+                handles += member.num_handles() if sys.platform == "win32" else member.num_fds()
+        except psutil.Error:
+            continue  # Un proceso de decodificación que terminó entre medio
+    return cpu, rss, threads, handles
+
+
+def prepare_workdir(workdir, count, url_template, workers):
+    """Configuración y canales del visor medido en una carpeta propia (no toca la del usuario)."""
+    config = {}
+    try:
+        with open(os.path.join(HERE, "multiviewer_config.json"), "r") as file:
+            config = json.load(file)  # Rutas de libvlc del equipo
+    except (OSError, json.JSONDecodeError):
+        pass
+    urls_file = os.path.join(workdir, "urls.json")
+    config.update({"urls_file": urls_file, "autostart": True, "max_widgets": max(count, 1),
+                   "decode_workers": workers, "alarm_log": os.path.join(workdir, "alarms.log")})
+    with open(os.path.join(workdir, "multiviewer_config.json"), "w") as file:
+        json.dump(config, file)
+    state = {"window_1": {"num_widgets": count,
+                   "urls": {str(index): url_template.format(index=index) for index in range(count)},
+                   "names": {str(index): f"Sintético {index + 1}" for index in range(count)}}}
+    with open(urls_file, "w") as file:
+        json.dump(state, file)
+
+
+class LoopProbe:
+    """Mide el desfase de un temporizador periódico y la latencia del bucle de eventos de Qt."""
+    def __init__(self):
+        from PyQt5.QtCore import Qt, QTimer
+        self.intervals = []  # Desfase (ms) de cada disparo respecto del periodo pedido
+        self.latencies = []  # Espera (ms) de un evento encolado hasta ser atendido
+        self.last = None
+        self.jitter_timer = QTimer()
+        self.jitter_timer.setTimerType(Qt.PreciseTimer)
+        self.jitter_timer.setInterval(JITTER_INTERVAL_MS)
+        self.jitter_timer.timeout.connect(self.on_jitter)
+        self.latency_timer = QTimer()
+        self.latency_timer.setInterval(LATENCY_PROBE_MS)
+        self.latency_timer.timeout.connect(self.post)
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.jitter_timer.start()
+        self.latency_timer.start()
+
+    def stop(self):
+        self.jitter_timer.stop()
+        self.latency_timer.stop()
+
+    def on_jitter(self):
+        now = time.perf_counter()
+        self.intervals.append(abs((now - self.last) * 1000.0 - JITTER_INTERVAL_MS))
+        self.last = now
+
+    def post(self):
+        from PyQt5.QtCore import QTimer
+        posted = time.perf_counter()
+        QTimer.singleShot(0, lambda: self.latencies.append((time.perf_counter() - posted) * 1000.0))
+
+    def summary(self):
+        return {
+            "jitter_p50_ms": percentile(self.intervals, 0.50),
+            "jitter_p99_ms": percentile(self.intervals, 0.99),
+            "jitter_max_ms": max(self.intervals, default=0.0),
+            "latency_p50_ms": percentile(self.latencies, 0.50),
+            "latency_p99_ms": percentile(self.latencies, 0.99),
+            "latency_max_ms": max(self.latencies, default=0.0),
+        }
+
+
+def run_for(seconds):
+    """Atender el bucle de eventos de Qt durante `seconds`."""
+    from PyQt5.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+
+
+def wait_until(predicate, timeout, step=0.1):
+    """Atender el bucle de eventos hasta que `predicate()` se cumpla. Devuelve si se cumplió."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        run_for(step)
+    return True
+
+
+def playing_tiles(window):
+    from reconnect import STATE_PLAYING
+    return sum(1 for tile in window.video_widgets
+               if tile.reconnect is not None and tile.reconnect.state == STATE_PLAYING)
+
+
+def start_viewer(workdir):
+    """Preparar el proceso medido: plataforma sin pantalla, carpeta propia y QApplication."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.chdir(workdir)
+    sys.path.insert(0, HERE)
+    import startup_timing  # Primero, para medir el arranque desde aquí
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    return startup_timing, app
+
+
+def run_tiles(args):
+    """Proceso medido de `tiles`: abrir `count` pantallas y medir (escribe una línea RESULTADO)."""
+    import psutil
+    startup_timing, app = start_viewer(args.workdir)
+    process = psutil.Process()
+    _, base_rss, _, _ = process_usage(process)
+    import multiviewer
+
+    window = multiviewer.MainWindow(args.count)
+    window.show()
+    all_playing = wait_until(lambda: (len(window.video_widgets) == args.count
+                                      and playing_tiles(window) == args.count), args.startup_timeout)
+    startup_seconds = time.perf_counter() - startup_timing.T0
+    run_for(args.warmup)
+
+    probe = LoopProbe()
+    cpu_before, _, _, _ = process_usage(process)
+    wall_before = time.perf_counter()
+    probe.start()
+    run_for(args.seconds)
+    probe.stop()
+    cpu_after, rss, threads, handles = process_usage(process)
+    wall = time.perf_counter() - wall_before
+    cpu_percent = 100.0 * (cpu_after - cpu_before) / wall
+
+    result = {
+        "tiles": args.count,
+        "playing": playing_tiles(window),
+        "all_playing": all_playing,
+        "startup_seconds": startup_seconds,
+        "marks": startup_timing.marks(),
+        "cpu_percent": cpu_percent,
+        "cpu_per_tile": cpu_percent / args.count,
+        "rss_mb": rss / 2 ** 20,
+        "rss_per_tile_mb": (rss - base_rss) / 2 ** 20 / args.count,
+        "threads": threads,
+        "handles": handles,
+    }
+    result.update(probe.summary())
+    window.close()
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    return 0
+
+
+def measure_tiles(sources, count, args):
+    """Medir `count` pantallas en un proceso nuevo y devolver su resultado (o None)."""
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir, count, sources.url(0, args.kind).replace("/ch0/", "/ch{index}/"),
+                        args.workers)
+        command = [sys.executable, os.path.abspath(__file__), "tile-run", "--workdir", workdir,
+                   "--count", str(count), "--seconds", str(args.seconds), "--warmup", str(args.warmup),
+                   "--startup-timeout", str(args.startup_timeout)]
+        timeout = args.startup_timeout + args.warmup + args.seconds + 60
+        try:
+            completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            print(f"FALLO: {count} pantallas: el proceso medido no terminó en {timeout:.0f} s")
+            return None
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    print(f"FALLO: {count} pantallas: el proceso medido no entregó resultados "
+          f"(código {completed.returncode})\n{completed.stderr[-2000:]}")
+    return None
+
+
+def run_metadata():
+    """Contexto de una ejecución, para saber qué se comparó con qué."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit,
+            "platform": platform.platform(), "python": platform.python_version(),
+            "cpus": os.cpu_count()}
+
+
+def print_tile_report(results, baseline=None):
+    """Tabla de resultados por cantidad de pantallas (con la diferencia respecto de `baseline`)."""
+    before = {result["tiles"]: result for result in (baseline or {}).get("results", [])}
+    print(f"{'pantallas':>9} {'en repr.':>8}" + "".join(f" {label:>16}" for _, label, _ in REPORT_COLUMNS))
+    for result in results:
+        cells = []
+        for key, _, pattern in REPORT_COLUMNS:
+            cell = pattern.format(result[key])
+            previous = before.get(result["tiles"], {}).get(key)
+            if previous is not None:
+                cell += f" ({result[key] - previous:+.1f})"
+            cells.append(f" {cell:>16}")
+        print(f"{result['tiles']:>9} {result['playing']:>8}" + "".join(cells))
+    if baseline:
+        print(f"Diferencias entre paréntesis respecto de {baseline['meta'].get('commit') or 'la referencia'} "
+              f"({baseline['meta'].get('time', '')})")
+
+
+def run_tile_benchmark(args):
+    segments = load_media(args.media)
+    sources = SyntheticSources(segments, max(args.counts))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+    results = []
+    try:
+        for count in args.counts:
+            print(f"Midiendo {count} pantallas...", flush=True)
+            result = measure_tiles(sources, count, args)
+            if result is not None:
+                results.append(result)
+    finally:
+        sources.close()
+    print()
+    print_tile_report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"meta": run_metadata(), "kind": args.kind, "workers": args.workers,
+                       "results": results}, file, indent=2)
+        print(f"Resultados guardados en {args.output}")
+    ok = len(results) == len(args.counts) and all(result["all_playing"] for result in results)
+    return 0 if ok else 1
+
+
+def linear_growth(samples):
+    """Pendiente por ciclo (mínimos cuadrados) de una serie de valores."""
+    if len(samples) < 2:
+        return 0.0
+    mean_x = (len(samples) - 1) / 2.0
+    mean_y = sum(samples) / len(samples)
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(samples))
+    return numerator / sum((x - mean_x) ** 2 for x in range(len(samples)))
+
+
+def run_soak(args):
+    """Proceso medido de `soak`: ciclos de abrir, reproducir y cerrar la ventana."""
+    import psutil
+    _, app = start_viewer(args.workdir)
+    import multiviewer
+    process = psutil.Process()
+    deadline = time.monotonic() + args.hours * 3600.0
+    samples = []
+    cycle = 0
+    while time.monotonic() < deadline:
+        cycle += 1
+        window = multiviewer.MainWindow(args.tiles)
+        window.show()
+        wait_until(lambda: playing_tiles(window) == args.tiles, args.startup_timeout)
+        playing = playing_tiles(window)
+        run_for(args.cycle_seconds)
+        window.close()
+        window.deleteLater()
+        run_for(1.0)  # Que se procesen los borrados diferidos
+        gc.collect()
+        _, rss, threads, handles = process_usage(process)
+        sample = {"cycle": cycle, "playing": playing, "rss_mb": rss / 2 ** 20, "threads": threads,
+                  "handles": handles, "objects": len(gc.get_objects())}
+        samples.append(sample)
+        print(RESULT_PREFIX + json.dumps(sample), flush=True)
+    return 0
+
+
+def report_soak(samples, args):
+    """Decidir si hay una fuga a partir de las muestras tomadas después de cada ciclo."""
+    measured = samples[SOAK_WARMUP_CYCLES:]
+    if len(measured) < 3:
+        print(f"FALLO: solo {len(samples)} ciclos; se necesitan al menos {SOAK_WARMUP_CYCLES + 3} "
+              "(aumente --hours o reduzca --cycle-seconds)")
+        return 1
+    limits = {"rss_mb": args.max_rss_growth_mb, "handles": args.max_handle_growth,
+              "threads": args.max_handle_growth, "objects": args.max_object_growth}
+    ok = True
+    print(f"{len(measured)} ciclos medidos (sin contar {SOAK_WARMUP_CYCLES} de calentamiento):")
+    for key, limit in limits.items():
+        values = [sample[key] for sample in measured]
+        growth = linear_growth(values) * (len(values) - 1)
+        leak = growth > limit
+        ok = ok and not leak
+        print(f"  {'FUGA ' if leak else 'ok   '}{key}: {values[0]:.1f} -> {values[-1]:.1f}, "
+              f"tendencia {growth:+.1f} en la prueba (límite {limit:g})")
+    return 0 if ok else 1
+
+
+def run_soak_benchmark(args):
+    segments = load_media(args.media)
+    sources = SyntheticSources(segments, args.tiles)
+    samples = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            prepare_workdir(workdir, args.tiles, sources.url(0, args.kind).replace("/ch0/", "/ch{index}/"),
+                            args.workers)
+            command = [sys.executable, os.path.abspath(__file__), "soak-run", "--workdir", workdir,
+                       "--tiles", str(args.tiles), "--hours", str(args.hours),
+                       "--cycle-seconds", str(args.cycle_seconds),
+                       "--startup-timeout", str(args.startup_timeout)]
+            # Las muestras se muestran a medida que llegan: la prueba dura horas
+            with subprocess.Popen(command, stdout=subprocess.PIPE, text=True) as child:
+                for line in child.stdout:
+                    if not line.startswith(RESULT_PREFIX):
+                        continue
+                    sample = json.loads(line[len(RESULT_PREFIX):])
+                    samples.append(sample)
+                    print(f"ciclo {sample['cycle']}: {sample['playing']}/{args.tiles} en reproducción, "
+                          f"RSS {sample['rss_mb']:.1f} MB, {sample['handles']} descriptores, "
+                          f"{sample['threads']} hilos, {sample['objects']} objetos", flush=True)
+            if child.returncode:
+                print(f"FALLO: el proceso de la prueba terminó con código {child.returncode}")
+                return 1
+    finally:
+        sources.close()
+    return report_soak(samples, args)
+
+
+def serve(args):
+    sources = SyntheticSources(load_media(args.media), args.sources, args.port)
+    print(f"{args.sources} fuentes sintéticas: {sources.url(0, 'hls')} ... "
+          f"{sources.url(args.sources - 1, 'ts')} (Ctrl+C para terminar)")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        sources.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mediciones de arranque del MultiViewer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("imports", help="tiempo de import de los puntos de entrada")
+    imports.add_argument("--module", action="append",
+                         help="módulo a medir (se puede repetir; por defecto todos)")
+    imports.add_argument("--repeat", type=int, default=5)
+    imports.add_argument("--top", type=int, default=15)
+    imports.add_argument("--budget-ms", type=float, default=None,
+                         help="falla si la mediana supera este tiempo")
+
+    def add_source_options(command):
+        command.add_argument("--media", default=MEDIA_DIR, help="carpeta con pattern.m3u8 y sus segmentos")
+        command.add_argument("--kind", choices=("hls", "ts"), default="hls")
+        command.add_argument("--workers", type=int, default=0, help="procesos de decodificación (decode_workers)")
+        command.add_argument("--startup-timeout", type=float, default=STARTUP_TIMEOUT)
+
+    tiles = commands.add_parser("tiles", help="CPU, memoria, desfase y latencia por cantidad de pantallas")
+    tiles.add_argument("--counts", type=int, nargs="+", default=list(TILE_COUNTS))
+    tiles.add_argument("--seconds", type=float, default=30.0, help="duración de la medición")
+    tiles.add_argument("--warmup", type=float, default=5.0, help="espera tras el arranque antes de medir")
+    tiles.add_argument("--output", help="guardar los resultados en este archivo JSON")
+    tiles.add_argument("--baseline", help="comparar con los resultados guardados de otra ejecución")
+    add_source_options(tiles)
+
+    soak = commands.add_parser("soak", help="ciclos de crear y liberar reproductores para detectar fugas")
+    soak.add_argument("--hours", type=float, default=4.0)
+    soak.add_argument("--tiles", type=int, default=15)
+    soak.add_argument("--cycle-seconds", type=float, default=60.0, help="reproducción en cada ciclo")
+    soak.add_argument("--max-rss-growth-mb", type=float, default=64.0)
+    soak.add_argument("--max-handle-growth", type=float, default=20.0, help="descriptores/handles e hilos")
+    soak.add_argument("--max-object-growth", type=float, default=20000.0, help="objetos de Python")
+    add_source_options(soak)
+
+    serve_command = commands.add_parser("serve", help="solo servir las fuentes sintéticas")
+    serve_command.add_argument("--sources", type=int, default=max(TILE_COUNTS))
+    serve_command.add_argument("--port", type=int, default=8900)
+    serve_command.add_argument("--media", default=MEDIA_DIR)
+
+    # Procesos medidos (los lanzan `tiles` y `soak`)
+    tile_run = commands.add_parser("tile-run")
+    tile_run.add_argument("--workdir", required=True)
+    tile_run.add_argument("--count", type=int, required=True)
+    tile_run.add_argument("--seconds", type=float, required=True)
+    tile_run.add_argument("--warmup", type=float, required=True)
+    tile_run.add_argument("--startup-timeout", type=float, required=True)
+    soak_run = commands.add_parser("soak-run")
+    soak_run.add_argument("--workdir", required=True)
+    soak_run.add_argument("--tiles", type=int, required=True)
+    soak_run.add_argument("--hours", type=float, required=True)
+    soak_run.add_argument("--cycle-seconds", type=float, required=True)
+    soak_run.add_argument("--startup-timeout", type=float, required=True)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "tiles":
+            return run_tile_benchmark(args)
+        if args.command == "soak":
+            return run_soak_benchmark(args)
+        if args.command == "serve":
+            return serve(args)
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"Error: {e}")
+        return 1
+    if args.command == "tile-run":
+        return run_tiles(args)
+    if args.command == "soak-run":
+        return run_soak(args)
+    if args.command == "imports":
+        ok = True
+        for module in args.module or list(IMPORT_CHECKS):
+            ok = report_imports(module, args.repeat, args.top, args.budget_ms) and ok
+            print()
+        return 0 if ok else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
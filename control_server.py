@@ -0,0 +1,841 @@
+"""Servidor de control local (HTTP y WebSocket) para manejar la pared sin ratón.
+
+Uso:
+    python control_server.py --self-test     Comprobar HTTP, WebSocket y el puente con la interfaz
+
+Se activa con "control": {"port": 8765} en multiviewer_config.json. Escucha
+solo en 127.0.0.1 salvo que se indique "host"; si se configura "token", cada
+petición debe llevar "Authorization: Bearer <token>" (o ?token=<token>).
+Las peticiones de un navegador (con cabecera Origin) solo se aceptan desde el
+propio origen del servidor, así una página web abierta por el operador no
+puede manejar la pared, y las órdenes por POST deben ser application/json.
+
+    GET  /api/state         Ventanas y pantallas (URL, nombre, conexión, audio, alarma)
+    GET  /api/layouts       Distribuciones guardadas
+    GET  /api/alarms        Alarmas activas
+    GET  /api/telemetry     Última muestra de telemetría de cada pantalla
+    POST /api/commands      Lote de órdenes ({"commands": [...]} o la lista sola)
+    GET  /api/events        WebSocket: eventos "state", "tile", "alarms" y "telemetry";
+                            acepta {"id": ..., "commands": [...]} y responde "result"
+
+Órdenes ("window" es 1 si se omite; "tile" empieza en 0 y puede ser una lista, o
+se omite para toda la ventana; "source": URL elige las pantallas que la muestran):
+    {"op": "assign", "window": 1, "tile": 0, "url": "...", "name": "...", "play": true}
+    {"op": "assign", "window": 1, "tile": 0, "channels": [{"url": "...", "name": "..."}, ...]}
+    {"op": "play" | "pause" | "stop", "window": 1, "tile": [0, 1, 2]}
+    {"op": "audio", "tile": 3, "on": true}
+    {"op": "fullscreen", "tile": 3, "on": true}
+    {"op": "add_tiles", "window": 1, "count": 4}
+    {"op": "save_layout" | "recall_layout" | "delete_layout", "name": "Noticias"}
+
+El servidor corre en un hilo con su propio lazo de asyncio. Las órdenes y
+consultas no tocan la interfaz desde ese hilo: se encolan y el hilo de la
+interfaz las aplica todas juntas en una sola pasada, así un lote de decenas de
+pantallas (o muchas peticiones simultáneas) cuesta un único despertar.
+"""
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import hmac
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from http import HTTPStatus
+from PyQt5.QtCore import QObject, QCoreApplication, Qt, pyqtSignal
+from alarm_bus import get_alarm_bus, SEVERITY_NAMES
+from layout_presets import get_layout_presets
+from playlist_import import Channel
+from reconnect import STATE_IDLE
+from tile_telemetry import get_telemetry, FIELDS
+
+# Valores por defecto (se pueden cambiar en multiviewer_config.json bajo la clave "control")
+DEFAULT_CONTROL_SETTINGS = {
+    "port": 0,              # Puerto local de la API (0 = desactivada)
+    "host": "127.0.0.1",    # Dirección de escucha
+    "token": None,          # Si se indica, se exige en cada petición
+}
+# Tamaño máximo del cuerpo de una petición o de un mensaje WebSocket
+MAX_BODY = 1 << 20
+MAX_HEADERS = 100
+# Eventos pendientes por cliente WebSocket; si uno lento se atrasa más, se le descartan
+CLIENT_QUEUE = 256
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+_server = None
+
+
+def get_control_server():
+    """Obtener el servidor de control único de la aplicación."""
+    global _server
+    if _server is None:
+        _server = ControlServer(WallController(), parent=QCoreApplication.instance())
+    return _server
+
+
+class CommandError(ValueError):
+    """Orden mal formada o que no se puede aplicar (se responde sin interrumpir el lote)."""
+
+
+class Request:
+    """Petición HTTP ya leída."""
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+
+async def read_request(reader):
+    """Leer una petición HTTP/1.1, o None si el cliente cerró la conexión."""
+    line = await reader.readline()
+    if not line:
+        return None
+    parts = line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise ValueError("línea de petición inválida")
+    method, target, _ = parts
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+        if len(headers) > MAX_HEADERS:
+            raise ValueError("demasiadas cabeceras")
+    length = int(headers.get("content-length") or 0)
+    if length < 0 or length > MAX_BODY:
+        raise ValueError("cuerpo demasiado grande")
+    body = await reader.readexactly(length) if length else b""
+    url = urllib.parse.urlsplit(target)
+    return Request(method.upper(), url.path, urllib.parse.parse_qs(url.query), headers, body)
+
+
+def http_response(status, payload, keep_alive=True):
+    """Respuesta HTTP con cuerpo JSON."""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+def binary_response(status, body, content_type, headers=None, keep_alive=True):
+    """Respuesta HTTP con un cuerpo binario (imágenes, segmentos, archivos)."""
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Content-Length: {len(body)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if content_type:
+        lines.append(f"Content-Type: {content_type}")
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def websocket_accept(key):
+    """Valor de Sec-WebSocket-Accept para la clave del cliente (RFC 6455)."""
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def unmask(data, mask):
+    """Quitar la máscara de 4 bytes de un mensaje del cliente (XOR de enteros, sin bucle por byte)."""
+    if not data:
+        return data
+    key = (mask * (len(data) // 4 + 1))[:len(data)]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(len(data), "big")
+
+
+def encode_frame(opcode, payload, mask=None):
+    """Trama WebSocket completa (las del servidor van sin máscara; `mask` es para el cliente de prueba)."""
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        head = bytes((0x80 | opcode, mask_bit | length))
+    elif length < 1 << 16:
+        head = bytes((0x80 | opcode, mask_bit | 126)) + length.to_bytes(2, "big")
+    else:
+        head = bytes((0x80 | opcode, mask_bit | 127)) + length.to_bytes(8, "big")
+    if mask:
+        return head + mask + unmask(payload, mask)
+    return head + payload
+
+
+async def read_message(reader):
+    """Leer un mensaje WebSocket (uniendo fragmentos). Devuelve (opcode, datos)."""
+    message_opcode = None
+    chunks = []
+    size = 0
+    while True:
+        first, second = await reader.readexactly(2)
+        final = first & 0x80
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = int.from_bytes(await reader.readexactly(2), "big")
+        elif length == 127:
+            length = int.from_bytes(await reader.readexactly(8), "big")
+        size += length
+        if size > MAX_BODY:
+            raise ValueError("mensaje demasiado grande")
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        data = await reader.readexactly(length)
+        if mask:
+            data = unmask(data, mask)
+        if opcode >= OP_CLOSE:
+            # Las tramas de control pueden llegar entre fragmentos
+            return opcode, data
+        if opcode != OP_CONTINUATION:
+            message_opcode = opcode
+        chunks.append(data)
+        if final:
+            return message_opcode, b"".join(chunks)
+
+
+class ControlServer(QObject):
+    """API local en un hilo de asyncio con un puente por lotes hacia la interfaz.
+
+    El hilo de asyncio encola funciones en `pending` y despierta a la interfaz
+    con una señal (una sola por tanda); el hilo de la interfaz las ejecuta
+    todas en `drain` y devuelve cada resultado a su futuro de asyncio. Los
+    eventos van en sentido contrario con `publish`, que reparte el mensaje a
+    las colas de los clientes WebSocket sin esperar a ninguno.
+    """
+    wake = pyqtSignal()
+
+    def __init__(self, wall, parent=None):
+        super().__init__(parent)
+        self.wall = wall
+        self.settings = dict(DEFAULT_CONTROL_SETTINGS)
+        self.pending = collections.deque()  # (función, futuro) desde el hilo de asyncio
+        self.lock = threading.Lock()
+        self.wake_pending = False
+        self.passes = 0  # Pasadas del puente por la interfaz (para medir el agrupamiento)
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.clients = set()  # Colas de los clientes WebSocket (solo desde el lazo)
+        self.wake.connect(self.drain, Qt.QueuedConnection)
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close)
+
+    def configure(self, settings):
+        """Aplicar la sección "control" de la configuración y abrir el puerto la primera vez."""
+        self.settings = dict(DEFAULT_CONTROL_SETTINGS)
+        self.settings.update(settings or {})
+        port = self.settings["port"]
+        if port and self.loop is None:
+            try:
+                self.start(self.settings["host"], int(port))
+            except OSError as e:
+                print(f"No se pudo abrir el puerto de control {port}: {e}")
+                return
+            self.wall.attach(self)
+
+    def start(self, host, port):
+        """Abrir el puerto (en este hilo, para informar errores) y lanzar el lazo de asyncio. Devuelve el puerto."""
+        loop = asyncio.new_event_loop()
+        try:
+            self.server = loop.run_until_complete(asyncio.start_server(self.handle, host, port))
+        except OSError:
+            loop.close()
+            raise
+        self.loop = loop
+        self.thread = threading.Thread(target=loop.run_forever, name="control-server", daemon=True)
+        self.thread.start()
+        return self.server.sockets[0].getsockname()[1]
+
+    def close(self):
+        """Cerrar el puerto y detener el lazo."""
+        if self.loop is None:
+            return
+        loop = self.loop
+        self.loop = None
+        loop.call_soon_threadsafe(self.server.close)
+        loop.call_soon_threadsafe(loop.stop)
+        self.thread.join(timeout=2.0)
+
+    # --- Puente con la interfaz ---
+
+    async def call(self, function):
+        """Ejecutar `function` en el hilo de la interfaz (en la próxima pasada) y esperar su resultado."""
+        future = self.loop.create_future()
+        self.pending.append((function, future))
+        with self.lock:
+            wake = not self.wake_pending
+            self.wake_pending = True
+        if wake:
+            self.wake.emit()
+        return await future
+
+    def drain(self):
+        """Aplicar juntas, en el hilo de la interfaz, todas las funciones encoladas."""
+        with self.lock:
+            self.wake_pending = False
+        loop = self.loop
+        if loop is None:
+            self.pending.clear()
+            return
+        self.passes += 1
+        while self.pending:
+            function, future = self.pending.popleft()
+            try:
+                result, error = function(), None
+            except Exception as e:
+                print(f"Error al aplicar una orden de control: {e!r}")
+                result, error = None, e
+            loop.call_soon_threadsafe(resolve, future, result, error)
+
+    def publish(self, event):
+        """Enviar un evento a los clientes WebSocket (desde el hilo de la interfaz, sin esperar)."""
+        loop = self.loop
+        if loop is None or not self.clients:
+            return
+        frame = encode_frame(OP_TEXT, json.dumps(event, ensure_ascii=False).encode("utf-8"))
+        loop.call_soon_threadsafe(self.broadcast, frame)
+
+    def has_clients(self):
+        return self.loop is not None and bool(self.clients)
+
+    def broadcast(self, frame):
+        for queue in self.clients:
+            if queue.full():
+                continue  # Cliente atrasado: pierde este evento, el siguiente trae el estado completo
+            queue.put_nowait(frame)
+
+    # --- HTTP y WebSocket (hilo de asyncio) ---
+
+    def authorized(self, request):
+        token = self.settings["token"]
+        if not token:
+            return True
+        supplied = request.query.get("token", [""])[0]
+        header = request.headers.get("authorization", "")
+        if header.lower().startswith("bearer "):
+            supplied = header[len("bearer "):].strip()
+        return hmac.compare_digest(supplied.encode(), str(token).encode())
+
+    def same_origin(self, request):
+        """Sin cabecera Origin (clientes que no son navegadores) o con la del propio servidor.
+
+        Además del Origin igual al Host, el Host tiene que ser esta máquina (o
+        el "host" configurado): una página que redirige su nombre a 127.0.0.1
+        manda Origin y Host iguales, pero con su propio nombre.
+        """
+        origin = request.headers.get("origin")
+        if origin is None:
+            return True
+        host = request.headers.get("host", "")
+        hostname = urllib.parse.urlsplit(f"http://{host}").hostname or ""
+        trusted = set(LOOPBACK_HOSTS) | {self.settings["host"]}
+        return origin.lower() == f"http://{host}".lower() and hostname.lower() in trusted
+
+    async def handle(self, reader, writer):
+        """Atender una conexión: peticiones HTTP seguidas o un WebSocket."""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError as e:
+                    writer.write(http_response(400, {"error": str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                if not self.authorized(request):
+                    writer.write(http_response(401, {"error": "token inválido"}, keep_alive=False))
+                    break
+                if not self.same_origin(request):
+                    writer.write(http_response(403, {"error": "origen no permitido"}, keep_alive=False))
+                    break
+                if request.path == "/api/events" and request.headers.get("upgrade", "").lower() == "websocket":
+                    await self.serve_websocket(request, reader, writer)
+                    break
+                try:
+                    status, payload = await self.route(request)
+                except Exception as e:
+                    status, payload = 500, {"error": f"error interno: {e}"}
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, request):
+        """Resolver una petición REST. Devuelve (estado HTTP, cuerpo)."""
+        if request.method == "GET":
+            getter = {"/api/state": self.wall.state,
+                      "/api/layouts": self.wall.layouts,
+                      "/api/alarms": self.wall.alarms,
+                      "/api/telemetry": self.wall.telemetry}.get(request.path)
+            if getter is not None:
+                return 200, await self.call(getter)
+        elif request.method == "POST" and request.path == "/api/commands":
+            # Un formulario o un fetch "simple" de otra página no puede mandar JSON
+            if request.headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+                return 415, {"error": "se espera Content-Type: application/json"}
+            try:
+                commands = parse_commands(json.loads(request.body or b"null"))
+            except ValueError as e:
+                return 400, {"error": f"JSON inválido: {e}"}
+            return 200, {"results": await self.call(lambda: self.wall.apply(commands))}
+        return 404, {"error": f"ruta desconocida: {request.method} {request.path}"}
+
+    async def serve_websocket(self, request, reader, writer):
+        """Sesión WebSocket: eventos de la pared hacia el cliente y lotes de órdenes desde él."""
+        key = request.headers.get("sec-websocket-key")
+        if not key:
+            writer.write(http_response(400, {"error": "falta Sec-WebSocket-Key"}, keep_alive=False))
+            return
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n").encode("latin-1"))
+        queue = asyncio.Queue(CLIENT_QUEUE)
+        sender = asyncio.ensure_future(self.send_frames(writer, queue))
+        try:
+            # Primero el estado completo; desde ahí, los cambios
+            state = await self.call(self.wall.state)
+            queue.put_nowait(encode_frame(OP_TEXT, json.dumps({"type": "state", **state}).encode("utf-8")))
+            self.clients.add(queue)
+            while True:
+                opcode, data = await read_message(reader)
+                if opcode == OP_CLOSE:
+                    await queue.put(encode_frame(OP_CLOSE, data[:2]))
+                    break
+                if opcode == OP_PING:
+                    await queue.put(encode_frame(OP_PONG, data))
+                elif opcode == OP_TEXT:
+                    await queue.put(await self.websocket_commands(data))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.clients.discard(queue)
+            await queue.put(None)
+            await sender
+
+    async def websocket_commands(self, data):
+        """Aplicar un lote recibido por WebSocket y armar la respuesta."""
+        try:
+            message = json.loads(data)
+            commands = parse_commands(message)
+        except ValueError as e:
+            return encode_frame(OP_TEXT, json.dumps({"type": "error", "error": str(e)}).encode("utf-8"))
+        reply = {"type": "result", "id": message.get("id") if isinstance(message, dict) else None}
+        try:
+            reply["results"] = await self.call(lambda: self.wall.apply(commands))
+        except Exception as e:
+            reply = {"type": "error", "id": reply["id"], "error": f"error interno: {e}"}
+        return encode_frame(OP_TEXT, json.dumps(reply, ensure_ascii=False).encode("utf-8"))
+
+    async def send_frames(self, writer, queue):
+        """Escribir en orden las tramas encoladas para un cliente (None termina)."""
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    return
+                writer.write(frame)
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+
+def resolve(future, result, error):
+    """Entregar al futuro de asyncio el resultado calculado en la interfaz."""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def parse_commands(payload):
+    """Lista de órdenes de un cuerpo {"commands": [...]} o de la lista sola."""
+    commands = payload.get("commands") if isinstance(payload, dict) else payload
+    if not isinstance(commands, list):
+        raise ValueError('se esperaba una lista de órdenes o {"commands": [...]}')
+    return commands
+
+
+class WallController:
+    """Consultas y órdenes sobre las ventanas abiertas del visor (solo en el hilo de la interfaz).
+
+    Las ventanas son las registradas en el gestor de distribuciones. Las
+    señales de alarmas y telemetría se reenvían como eventos al servidor.
+    """
+    def __init__(self):
+        self.server = None
+        self.commands = {
+            "assign": self.assign,
+            "play": self.play,
+            "pause": self.pause,
+            "stop": self.stop,
+            "audio": self.audio,
+            "fullscreen": self.fullscreen,
+            "add_tiles": self.add_tiles,
+            "save_layout": self.save_layout,
+            "recall_layout": self.recall_layout,
+            "delete_layout": self.delete_layout,
+        }
+
+    def attach(self, server):
+        """Empezar a publicar alarmas y telemetría como eventos."""
+        self.server = server
+        get_alarm_bus().alarms_changed.connect(self.publish_alarms)
+        get_telemetry().sampled.connect(self.publish_telemetry)
+
+    def windows(self):
+        return {window.window_number: window for window in get_layout_presets().windows}
+
+    # --- Consultas ---
+
+    def state(self):
+        return {"windows": [{"window": number, "max_tiles": window.max_widgets,
+                             "tiles": [self.tile_state(tile) for tile in window.video_widgets]}
+                            for number, window in sorted(self.windows().items())]}
+
+    def tile_state(self, tile):
+        severity = get_alarm_bus().max_severity(tile.alarm_source)
+        return {"id": tile.alarm_source, "window": tile.window_number, "tile": tile.index,
+                "url": tile.url_input.text(), "name": tile.name_input.text(),
+                "state": tile.reconnect.state if tile.reconnect is not None else STATE_IDLE,
+                "playing": tile.is_playing(), "audio": tile.toggle_audio_button.isChecked(),
+                "fullscreen": tile.is_fullscreen, "alarm": SEVERITY_NAMES.get(severity)}
+
+    def layouts(self):
+        return {"layouts": get_layout_presets().names()}
+
+    def alarms(self):
+        return {"alarms": [dict(alarm.as_record("active"), raised_at=alarm.raised_at)
+                           for alarm in get_alarm_bus().active_alarms()]}
+
+    def telemetry(self):
+        telemetry = get_telemetry()
+        samples = []
+        for window in self.windows().values():
+            for tile in window.video_widgets:
+                ring = telemetry.rings.get(tile)
+                row = ring.latest() if ring is not None else None
+                if row is not None:
+                    samples.append(((tile.alarm_source, tile.alarm_label()), row))
+        return {"tiles": telemetry_records(samples)}
+
+    # --- Eventos ---
+
+    def publish_alarms(self):
+        if self.server.has_clients():
+            self.server.publish({"type": "alarms", **self.alarms()})
+
+    def publish_telemetry(self, samples):
+        if self.server.has_clients():
+            self.server.publish({"type": "telemetry", "time": time.time(), "tiles": telemetry_records(samples)})
+
+    def tile_changed(self, tile):
+        """Avisar que cambió el estado de conexión de una pantalla."""
+        if self.server is not None and self.server.has_clients():
+            self.server.publish({"type": "tile", **self.tile_state(tile)})
+
+    # --- Órdenes ---
+
+    def apply(self, commands):
+        """Aplicar un lote de órdenes en orden. Devuelve un resultado por orden."""
+        results = []
+        for command in commands:
+            try:
+                if not isinstance(command, dict):
+                    raise CommandError("cada orden debe ser un objeto")
+                handler = self.commands.get(command.get("op"))
+                if handler is None:
+                    raise CommandError(f"orden desconocida: {command.get('op')!r}")
+                results.append(dict(handler(command), ok=True))
+            except CommandError as e:
+                results.append({"ok": False, "error": str(e)})
+            except Exception as e:
+                # Un fallo inesperado no debe dejar sin aplicar el resto del lote
+                print(f"Error al aplicar la orden de control {command!r}: {e!r}")
+                results.append({"ok": False, "error": f"error interno: {e}"})
+        return results
+
+    def window(self, command):
+        try:
+            number = int(command.get("window", 1))
+        except (TypeError, ValueError):
+            raise CommandError("'window' debe ser un número")
+        window = self.windows().get(number)
+        if window is None:
+            raise CommandError(f"no está abierta la ventana {number}")
+        return window
+
+    def tiles(self, command):
+        """Pantallas a las que se dirige una orden ("source", "tile" o toda la ventana)."""
+        if "source" in command:
+            return [tile for window in self.windows().values() for tile in window.video_widgets
+                    if tile.url_input.text() == command["source"]]
+        window = self.window(command)
+        indexes = command.get("tile")
+        if indexes is None:
+            return list(window.video_widgets)
+        if not isinstance(indexes, list):
+            indexes = [indexes]
+        tiles = []
+        for index in indexes:
+            if not isinstance(index, int) or not 0 <= index < len(window.video_widgets):
+                raise CommandError(f"no existe la pantalla {index!r} en la ventana {window.window_number}")
+            tiles.append(window.video_widgets[index])
+        return tiles
+
+    def tile(self, command):
+        tiles = self.tiles(command)
+        if len(tiles) != 1:
+            raise CommandError("la orden requiere una sola pantalla")
+        return tiles[0]
+
+    def assign(self, command):
+        window = self.window(command)
+        start = command.get("tile", 0)
+        if not isinstance(start, int) or start < 0:
+            raise CommandError("'tile' debe ser el índice de la primera pantalla")
+        entries = command.get("channels")
+        if entries is None:
+            entries = [{"url": command.get("url", ""), "name": command.get("name", "")}]
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise CommandError("'channels' debe ser una lista de objetos con url y name")
+        channels = [Channel(str(entry.get("name", "")), str(entry.get("url", ""))) for entry in entries]
+        assigned = window.assign_channels(channels, start)
+        tiles = window.video_widgets[start:start + assigned]
+        if command.get("play"):
+            for tile in tiles:
+                if tile.url_input.text() and not tile.is_playing():
+                    tile.play()
+        return {"assigned": assigned, "tiles": [tile.alarm_source for tile in tiles]}
+
+    def play(self, command):
+        tiles = [tile for tile in self.tiles(command) if tile.url_input.text() and not tile.is_playing()]
+        for tile in tiles:
+            tile.play()
+        return {"tiles": [tile.alarm_source for tile in tiles]}
+
+    def pause(self, command):
+        tiles = [tile for tile in self.tiles(command) if tile.is_playing()]
+        for tile in tiles:
+            tile.pause()
+        return {"tiles": [tile.alarm_source for tile in tiles]}
+
+    def stop(self, command):
+        tiles = [tile for tile in self.tiles(command) if tile.player is not None]
+        for tile in tiles:
+            tile.stop()
+        return {"tiles": [tile.alarm_source for tile in tiles]}
+
+    def audio(self, command):
+        on = bool(command.get("on", True))
+        tiles = [tile for tile in self.tiles(command)
+                 if tile.toggle_audio_button.isEnabled() and tile.toggle_audio_button.isChecked() != on]
+        for tile in tiles:
+            tile.toggle_audio_button.setChecked(on)
+            tile.toggle_audio()
+        return {"tiles": [tile.alarm_source for tile in tiles]}
+
+    def fullscreen(self, command):
+        tile = self.tile(command)
+        if bool(command.get("on", True)) != tile.is_fullscreen:
+            tile.toggle_fullscreen()
+        return {"tiles": [tile.alarm_source]}
+
+    def add_tiles(self, command):
+        window = self.window(command)
+        try:
+            count = int(command.get("count", 1))
+        except (TypeError, ValueError):
+            raise CommandError("'count' debe ser un número")
+        before = window.widget_count()
+        layout = dict(window.state_store.window_state(window.window_number))
+        layout["num_widgets"] = min(before + max(count, 0), window.max_widgets)
+        window.apply_layout(layout)
+        return {"added": window.widget_count() - before}
+
+    def save_layout(self, command):
+        if not get_layout_presets().save(str(command.get("name", ""))):
+            raise CommandError("falta el nombre de la distribución")
+        return {}
+
+    def recall_layout(self, command):
+        changed = get_layout_presets().recall(str(command.get("name", "")))
+        if changed is None:
+            raise CommandError(f"no existe la distribución {command.get('name')!r}")
+        return {"changed": changed}
+
+    def delete_layout(self, command):
+        if not get_layout_presets().delete(str(command.get("name", ""))):
+            raise CommandError(f"no existe la distribución {command.get('name')!r}")
+        return {}
+
+
+def telemetry_records(samples):
+    """Muestras [((pantalla, nombre), fila)] como diccionarios con las columnas de la telemetría."""
+    return [dict(zip(FIELDS, map(float, row)), tile=source, name=label) for (source, label), row in samples]
+
+
+def self_test():
+    """Levantar el servidor con una pared simulada y comprobar REST, WebSocket, lotes y eventos."""
+    import os
+    import socket
+    import urllib.error
+    import urllib.request
+
+    class FakeWall:
+        def __init__(self):
+            self.tiles = {}
+            self.batches = []
+
+        def state(self):
+            return {"windows": [{"window": 1, "tiles": [{"tile": index, "url": url}
+                                                        for index, url in sorted(self.tiles.items())]}]}
+
+        def layouts(self):
+            return {"layouts": ["Noticias"]}
+
+        alarms = telemetry = layouts
+
+        def apply(self, commands):
+            self.batches.append(len(commands))
+            for command in commands:
+                self.tiles[command["tile"]] = command["url"]
+            return [{"ok": True} for _ in commands]
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    wall = FakeWall()
+    server = ControlServer(wall)
+    server.settings["token"] = "secreto"
+    port = server.start("127.0.0.1", 0)
+    base = f"http://127.0.0.1:{port}"
+    results = {}
+
+    def fetch(name, path, payload=None, token="secreto", headers=None):
+        headers = dict({"Authorization": f"Bearer {token}", "Content-Type": "application/json"}, **(headers or {}))
+        request = urllib.request.Request(base + path, json.dumps(payload).encode() if payload is not None else None,
+                                         headers)
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                results[name] = (response.status, json.loads(response.read()))
+        except urllib.error.HTTPError as e:
+            results[name] = (e.code, json.loads(e.read()))
+
+    def spin_until(condition, seconds=5.0):
+        deadline = time.monotonic() + seconds
+        while not condition() and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.002)
+        assert condition()
+
+    # Diez clientes mandan a la vez un lote de 8 pantallas cada uno: la interfaz despierta pocas veces
+    threads = [threading.Thread(target=fetch, args=(f"batch{number}", "/api/commands",
+                                                    {"commands": [{"tile": number * 8 + index, "url": f"u{number}"}
+                                                                  for index in range(8)]}))
+               for number in range(10)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)  # Que lleguen todas antes de que la interfaz atienda
+    spin_until(lambda: len(results) == 10)
+    assert all(results[f"batch{number}"] == (200, {"results": [{"ok": True}] * 8}) for number in range(10))
+    assert len(wall.tiles) == 80 and server.passes <= 2, server.passes
+
+    threading.Thread(target=fetch, args=("state", "/api/state")).start()
+    threading.Thread(target=fetch, args=("denied", "/api/state", None, "otro")).start()
+    threading.Thread(target=fetch, args=("missing", "/api/nada")).start()
+    threading.Thread(target=fetch, args=("bad", "/api/commands", {"commands": 3})).start()
+    spin_until(lambda: len(results) == 14)
+    assert len(results["state"][1]["windows"][0]["tiles"]) == 80
+    assert [results[name][0] for name in ("denied", "missing", "bad")] == [401, 404, 400]
+
+    # Otra página web: ni con otro origen, ni haciéndose pasar por 127.0.0.1, ni como texto plano
+    command = {"commands": [{"tile": 0, "url": "ajena"}]}
+    for name, headers in (("foreign", {"Origin": "http://ejemplo.invalid"}),
+                          ("rebound", {"Origin": f"http://ejemplo.invalid:{port}", "Host": f"ejemplo.invalid:{port}"}),
+                          ("plain", {"Content-Type": "text/plain"}),
+                          ("own", {"Origin": base})):
+        threading.Thread(target=fetch, args=(name, "/api/commands", command, "secreto", headers)).start()
+    spin_until(lambda: len(results) == 18)
+    assert [results[name][0] for name in ("foreign", "rebound", "plain", "own")] == [403, 403, 415, 200]
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    sock.sendall((f"GET /api/events?token=secreto HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+                  "Origin: http://ejemplo.invalid\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  "Sec-WebSocket-Key: x\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    assert sock.makefile("rb").readline().startswith(b"HTTP/1.1 403")
+    sock.close()
+
+    # WebSocket: estado inicial, órdenes con respuesta y eventos empujados
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((f"GET /api/events?token=secreto HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\n"
+                  f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    stream = sock.makefile("rb")
+    assert stream.readline().startswith(b"HTTP/1.1 101")
+    headers = []
+    while True:
+        line = stream.readline()
+        if line == b"\r\n":
+            break
+        headers.append(line)
+    assert f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n".encode() in headers
+
+    def receive():
+        first, second = stream.read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = int.from_bytes(stream.read(2), "big")
+        elif length == 127:
+            length = int.from_bytes(stream.read(8), "big")
+        return first & 0x0F, stream.read(length)
+
+    received = []
+    reader = threading.Thread(target=lambda: received.extend(receive() for _ in range(3)))
+    reader.start()
+    spin_until(lambda: len(received) == 1)
+    assert json.loads(received[0][1])["type"] == "state"
+    message = json.dumps({"id": 7, "commands": [{"tile": 200, "url": "ws"}]}).encode()
+    sock.sendall(encode_frame(OP_TEXT, message, mask=os.urandom(4)))
+    spin_until(lambda: len(received) == 2)
+    assert json.loads(received[1][1]) == {"type": "result", "id": 7, "results": [{"ok": True}]}
+    spin_until(lambda: len(server.clients) == 1)
+    server.publish({"type": "alarms", "alarms": []})
+    spin_until(lambda: len(received) == 3)
+    assert json.loads(received[2][1]) == {"type": "alarms", "alarms": []}
+    reader.join()
+    sock.sendall(encode_frame(OP_CLOSE, b"\x03\xe8", mask=os.urandom(4)))
+    assert receive()[0] == OP_CLOSE
+    sock.close()
+    spin_until(lambda: not server.clients)
+    server.close()
+    print(f"Prueba del servidor de control correcta ({len(wall.batches)} lotes en {server.passes} pasadas de la interfaz)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de control local del MultiViewer")
+    parser.add_argument("--self-test", action="store_true", help="comprobar HTTP, WebSocket y el puente")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return self_test()
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""Decodificación por hardware con vuelta a software por pantalla.
+
+Uso:
+    python decode_policy.py [--reprobe]     Mostrar (o volver a detectar) la aceleración disponible
+    python decode_policy.py --self-test     Comprobar el reparto de plazas y la vuelta a software
+
+La detección se hace una vez y se guarda en un archivo; el visor asigna la
+decodificación por hardware a las pantallas hasta agotar las plazas
+configuradas y pasa a software la pantalla cuyo decodificador no entrega
+imagen.
+"""
+import argparse
+import ctypes.util
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from PyQt5.QtCore import QObject, QTimer, QCoreApplication
+
+MODE_AUTO = "auto"          # Hardware si se detectó, hasta agotar las plazas
+MODE_HARDWARE = "hardware"  # Hardware aunque la detección no lo encontró (backend "any")
+MODE_SOFTWARE = "software"  # Todo por software (equipos sin GPU)
+MODES = (MODE_AUTO, MODE_HARDWARE, MODE_SOFTWARE)
+MODE_LABELS = {
+    MODE_AUTO: "Automático",
+    MODE_HARDWARE: "Forzar hardware",
+    MODE_SOFTWARE: "Solo software",
+}
+
+# Valores por defecto (se pueden cambiar en multiviewer_config.json bajo la clave "decode")
+DEFAULT_DECODE_SETTINGS = {
+    "mode": MODE_AUTO,
+    "slots": 8,                        # Pantallas que decodifican por hardware a la vez
+    "backend": None,                   # Valor de --avcodec-hw; None = el detectado
+    "cache": "decode_probe.json",      # Resultado guardado de la detección
+}
+# Segundos tras abrir un stream por hardware para comprobar que entrega imagen
+HARDWARE_GRACE = 8.0
+# Periodo de esa comprobación
+CHECK_MS = 2000
+
+_policy = None
+
+
+def get_decode_policy():
+    """Obtener la política de decodificación única de la aplicación."""
+    global _policy
+    if _policy is None:
+        _policy = DecodePolicy(parent=QCoreApplication.instance())
+    return _policy
+
+
+def machine_key():
+    """Identifica el equipo y el sistema: si cambian, la detección guardada ya no vale."""
+    return f"{platform.node()}|{platform.platform()}"
+
+
+def probe_backends():
+    """Aceleraciones utilizables en este equipo, de la preferida a la menos preferida.
+
+    Solo se comprueba que existan el dispositivo y la biblioteca del controlador;
+    si luego la GPU no puede con un stream, esa pantalla vuelve a software.
+    """
+    backends = []
+    if sys.platform.startswith("linux"):
+        if glob.glob("/dev/dri/renderD*") and ctypes.util.find_library("va"):
+            backends.append("vaapi")
+        if os.environ.get("DISPLAY") and ctypes.util.find_library("vdpau"):
+            backends.append("vdpau_avcodec")
+    elif sys.platform == "win32":
+        # D3D11VA desde Windows 8; DXVA2 en todos
+        if sys.getwindowsversion()[:2] >= (6, 2):
+            backends.append("d3d11va")
+        backends.append("dxva2")
+    elif sys.platform == "darwin":
+        backends.append("videotoolbox")
+    return backends
+
+
+def load_probe(cache_path, reprobe=False):
+    """Resultado de la detección: el guardado si es de este equipo, o uno nuevo."""
+    if not reprobe and cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r") as file:
+                probe = json.load(file)
+            if probe.get("machine") == machine_key():
+                return probe
+        except (OSError, json.JSONDecodeError):
+            pass
+    probe = {"machine": machine_key(), "backends": probe_backends(), "probed_at": time.time()}
+    if cache_path:
+        try:
+            with open(cache_path, "w") as file:
+                json.dump(probe, file)
+        except OSError as e:
+            print(f"No se pudo guardar la detección de decodificación: {e}")
+    return probe
+
+
+class DecodePolicy(QObject):
+    """Reparte las plazas de decodificación por hardware entre las pantallas.
+
+    Cada pantalla pide su opción `:avcodec-hw` al abrir el stream. Las que
+    reciben hardware se vigilan unos segundos: si llegan datos pero no se
+    decodifica ningún cuadro, la pantalla libera su plaza y se reabre por
+    software (y ya no vuelve a intentarlo hasta que se detenga).
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.settings = dict(DEFAULT_DECODE_SETTINGS)
+        self.probe = None
+        self.hardware = {}  # pantalla -> instante en que abrió por hardware
+        self.fallback = set()  # pantallas que pasaron a software
+        self.timer = QTimer(self)
+        self.timer.setInterval(CHECK_MS)
+        self.timer.timeout.connect(self.check)
+
+    def configure(self, settings):
+        """Aplicar la configuración y cargar (o hacer) la detección."""
+        self.settings.update(settings or {})
+        if self.probe is None:
+            self.probe = load_probe(self.settings["cache"])
+
+    def backend(self):
+        """Aceleración a usar, o None si se decodifica todo por software."""
+        mode = self.settings["mode"]
+        if mode == MODE_SOFTWARE:
+            return None
+        if self.settings["backend"]:
+            return self.settings["backend"]
+        backends = (self.probe or {}).get("backends") or []
+        if backends:
+            return backends[0]
+        return "any" if mode == MODE_HARDWARE else None
+
+    def option(self, tile):
+        """Opción de libvlc con la que `tile` debe abrir su stream (ocupa una plaza si es hardware)."""
+        backend = self.backend()
+        if backend is None or tile in self.fallback:
+            self.hardware.pop(tile, None)
+            return ":avcodec-hw=none"
+        if tile not in self.hardware and len(self.hardware) >= int(self.settings["slots"]):
+            return ":avcodec-hw=none"
+        self.hardware[tile] = time.monotonic()
+        if not self.timer.isActive():
+            self.timer.start()
+        return f":avcodec-hw={backend}"
+
+    def release(self, tile):
+        """La pantalla se detuvo: liberar su plaza y olvidar su vuelta a software."""
+        self.hardware.pop(tile, None)
+        self.fallback.discard(tile)
+        if not self.hardware:
+            self.timer.stop()
+
+    def check(self):
+        """Pasar a software las pantallas cuyo decodificador por hardware no entrega imagen."""
+        # El recolector de telemetría ya lee las estadísticas de cada pantalla
+        from tile_telemetry import get_telemetry, COLUMN
+        telemetry = get_telemetry()
+        now = time.monotonic()
+        for tile, since in list(self.hardware.items()):
+            # Sin tiempo suficiente, o con la imagen pausada por estar fuera de vista
+            if now - since < HARDWARE_GRACE or tile.video_suspended:
+                continue
+            ring = telemetry.rings.get(tile)
+            sample = ring.latest() if ring is not None else None
+            if sample is None:
+                continue
+            if sample[COLUMN["demux_kbps"]] > 0 and sample[COLUMN["decoded_video"]] == 0:
+                print(f"{tile.alarm_label()}: la decodificación por hardware no entrega imagen; "
+                      "se pasa a software")
+                self.hardware.pop(tile)
+                self.fallback.add(tile)
+                tile.reopen_stream()
+        if not self.hardware:
+            self.timer.stop()
+
+    def status(self):
+        """Resumen para el panel de administración."""
+        return {
+            "backend": self.backend(),
+            "detected": (self.probe or {}).get("backends", []),
+            "slots": int(self.settings["slots"]),
+            "in_use": len(self.hardware),
+            "fallback": sorted(tile.alarm_label() for tile in self.fallback),
+        }
+
+
+def self_test():
+    """Comprobar el reparto de plazas y la vuelta a software sin GPU ni streams."""
+    import tempfile
+    import tile_telemetry
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+    class Tile:
+        def __init__(self, name):
+            self.name = name
+            self.reopened = 0
+            self.video_suspended = False
+
+        def alarm_label(self):
+            return self.name
+
+        def reopen_stream(self):
+            self.reopened += 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        policy = DecodePolicy()
+        policy.configure({"mode": MODE_SOFTWARE, "slots": 2, "cache": os.path.join(directory, "probe.json")})
+        tiles = [Tile(f"P{index}") for index in range(3)]
+        assert [policy.option(tile) for tile in tiles] == [":avcodec-hw=none"] * 3
+
+        policy.settings.update({"mode": MODE_AUTO, "backend": "vaapi"})
+        assert [policy.option(tile) for tile in tiles] == [":avcodec-hw=vaapi"] * 2 + [":avcodec-hw=none"]
+        policy.release(tiles[0])
+        assert policy.option(tiles[2]) == ":avcodec-hw=vaapi"
+
+        # Llegan datos pero no se decodifica imagen: la pantalla pasa a software
+        telemetry = tile_telemetry.get_telemetry()
+        for tile, decoded in ((tiles[1], 0), (tiles[2], 250)):
+            ring = telemetry.rings[tile] = tile_telemetry.TelemetryRing(4)
+            row = [0.0] * len(tile_telemetry.FIELDS)
+            row[tile_telemetry.COLUMN["demux_kbps"]] = 3000.0
+            row[tile_telemetry.COLUMN["decoded_video"]] = decoded
+            ring.append(row)
+            policy.hardware[tile] -= HARDWARE_GRACE
+        policy.check()
+        assert tiles[1].reopened == 1 and tiles[2].reopened == 0
+        assert policy.option(tiles[1]) == ":avcodec-hw=none"
+        assert policy.status()["in_use"] == 1 and policy.status()["fallback"] == ["P1"]
+        assert os.path.exists(os.path.join(directory, "probe.json"))
+    del app
+    print("Prueba de la política de decodificación correcta")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decodificación por hardware del MultiViewer")
+    parser.add_argument("--cache", default=DEFAULT_DECODE_SETTINGS["cache"])
+    parser.add_argument("--reprobe", action="store_true", help="volver a detectar la aceleración")
+    parser.add_argument("--self-test", action="store_true", help="comprobar sin GPU ni streams")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return self_test()
+    probe = load_probe(args.cache, args.reprobe)
+    backends = probe["backends"]
+    print(f"Aceleración detectada: {', '.join(backends) if backends else 'ninguna (solo software)'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
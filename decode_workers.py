@@ -0,0 +1,460 @@
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+import vlc
+from PyQt5.QtCore import QObject, QTimer, QCoreApplication, pyqtSignal
+from tile_telemetry import read_stats, STATS_FIELDS
+from tile_visibility import VideoGate
+
+# Periodo con que cada proceso envía las mediciones de sus pantallas
+WORKER_TICK = 0.1
+# Periodo con que se envía la sonoridad (la interfaz la muestra cada medio segundo)
+LOUDNESS_INTERVAL = 0.5
+# Segundos sin noticias de un proceso antes de darlo por colgado y reiniciarlo
+WORKER_TIMEOUT = 10.0
+# Periodo de la vigilancia de los procesos
+SUPERVISE_MS = 1000
+# Espera antes de relanzar un proceso caído (evita un bucle si falla al arrancar)
+RESTART_DELAY_MS = 1000
+# Eventos de libvlc que el proceso reenvía a la interfaz
+FORWARDED_EVENTS = ("MediaPlayerPlaying", "MediaPlayerEncounteredError", "MediaPlayerEndReached")
+
+_pool = None
+
+
+def worker_mode_supported():
+    """Dibujar en la ventana de otro proceso solo es posible con X11 y Windows."""
+    return sys.platform.startswith('linux') or sys.platform == "win32"
+
+
+def get_worker_pool(count, vlc_args, probe_settings):
+    """Obtener (creándolo la primera vez) el conjunto de procesos de decodificación."""
+    global _pool
+    if _pool is None:
+        _pool = WorkerPool(count, vlc_args, probe_settings, parent=QCoreApplication.instance())
+    return _pool
+
+
+class RemoteMedia:
+    """Lo mínimo de vlc.Media que necesita una pantalla: la URL y sus opciones."""
+    def __init__(self, url, options=()):
+        self.url = url
+        self.options = list(options)
+
+    def get_mrl(self):
+        return self.url
+
+    def add_option(self, option):
+        self.options.append(option)
+
+
+class RemoteEventManager:
+    """Registro de callbacks de eventos que dispara el proceso de decodificación."""
+    def __init__(self):
+        self.callbacks = {}  # nombre del tipo de evento -> [(callback, argumentos)]
+
+    def event_attach(self, event_type, callback, *args):
+        name = str(event_type).split(".")[-1]
+        self.callbacks.setdefault(name, []).append((callback, args))
+
+    def event_detach(self, event_type):
+        self.callbacks.pop(str(event_type).split(".")[-1], None)
+
+    def dispatch(self, name):
+        for callback, args in self.callbacks.get(name, []):
+            callback(None, *args)
+
+
+class RemotePlayer:
+    """Reproductor de una pantalla cuyo libvlc corre en un proceso de decodificación.
+
+    Imita la parte de vlc.MediaPlayer que usan la pantalla y su supervisor de
+    reconexión; las órdenes se envían al proceso y las mediciones llegan por
+    `metrics_callback` en el hilo de la interfaz.
+    """
+    remote = True
+
+    def __init__(self, worker, tile_id):
+        self.worker = worker
+        self.tile_id = tile_id
+        self.events = RemoteEventManager()
+        self.media = None
+        self.drawable = None
+        self.volume = 0
+        self.active = False
+        self.time_ms = 0
+        self.bitrate = 0.0
+        self.stats = None  # Última lectura de read_stats (telemetría)
+        self.video_suspended = False
+        self.metrics_callback = None
+
+    def event_manager(self):
+        return self.events
+
+    def set_media(self, media):
+        self.media = media
+
+    def get_media(self):
+        return self.media
+
+    def set_window(self, handle):
+        """Cambiar la ventana nativa donde dibuja el proceso."""
+        self.drawable = handle
+        if self.active:
+            self.worker.send(("window", self.tile_id, handle))
+
+    set_hwnd = set_window
+    set_xwindow = set_window
+    set_nsobject = set_window
+
+    def play(self):
+        self.active = True
+        self.worker.send(self.play_command())
+        return 0
+
+    def play_command(self):
+        """Orden completa para (re)abrir el stream, también tras reiniciar el proceso."""
+        return ("play", self.tile_id, self.media.url, self.media.options, self.drawable, self.volume,
+                self.video_suspended)
+
+    def pause(self):
+        self.active = False
+        self.worker.send(("pause", self.tile_id))
+
+    def stop(self):
+        self.active = False
+        self.worker.send(("stop", self.tile_id))
+
+    def set_video_suspended(self, suspended):
+        """Pausar o reanudar la decodificación de la imagen en el proceso."""
+        self.video_suspended = suspended
+        if self.active:
+            self.worker.send(("video", self.tile_id, suspended))
+
+    def audio_set_volume(self, volume):
+        self.volume = volume
+        self.worker.send(("volume", self.tile_id, volume))
+        return 0
+
+    def is_playing(self):
+        # El proceso recrea la salida de video por su cuenta al cambiar de ventana
+        return False
+
+    def video_get_track(self):
+        return -1
+
+    def get_time(self):
+        return self.time_ms
+
+    def release(self):
+        self.active = False
+        self.worker.send(("release", self.tile_id))
+        self.worker.players.pop(self.tile_id, None)
+
+
+class WorkerProcess:
+    """Un proceso hijo de decodificación y el hilo que lee sus mensajes."""
+    def __init__(self, pool, index):
+        self.pool = pool
+        self.index = index
+        self.players = {}  # id de pantalla -> RemotePlayer
+        self.process = None
+        self.conn = None
+        self.restarting = False
+        self.last_seen = time.monotonic()
+
+    def start(self):
+        """Lanzar el proceso y reabrir los streams que tenía asignados."""
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, name=f"multiviewer-decode-{self.index}",
+                                       args=(child_conn, self.pool.vlc_args, self.pool.probe_settings),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.last_seen = time.monotonic()
+        threading.Thread(target=self.read, args=(self.conn,), name=f"decode-reader-{self.index}",
+                         daemon=True).start()
+        for player in self.players.values():
+            if player.active:
+                self.send(player.play_command())
+
+    def read(self, conn):
+        """Hilo lector: reenviar cada mensaje del proceso al hilo de la interfaz."""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                self.pool.message.emit(self.index, ("exit", conn))
+                return
+            self.pool.message.emit(self.index, message)
+
+    def send(self, message):
+        """Enviar una orden; si el proceso murió, la supervisión la repetirá al reiniciarlo."""
+        try:
+            self.conn.send(message)
+        except (OSError, ValueError):
+            pass
+
+    def stop(self):
+        """Pedir al proceso que termine y forzarlo si no responde."""
+        self.send(("shutdown",))
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class WorkerPool(QObject):
+    """Procesos de decodificación que aíslan a las pantallas entre sí.
+
+    Se usa en lugar de la instancia de libvlc: `media_player_new` reparte las
+    pantallas entre los procesos (al que tenga menos). Cada proceso dibuja en
+    la ventana nativa de sus pantallas, mide audio e imagen y envía los
+    resultados por una tubería. Si un proceso se cae o deja de responder se
+    reinicia y sus pantallas vuelven a abrir sus streams.
+    """
+    message = pyqtSignal(int, object)  # índice del proceso, mensaje
+
+    def __init__(self, count, vlc_args, probe_settings, parent=None):
+        super().__init__(parent)
+        self.vlc_args = list(vlc_args)
+        self.probe_settings = dict(probe_settings)
+        self.next_tile_id = 0
+        self.closing = False
+        self.message.connect(self.deliver)
+        self.workers = [WorkerProcess(self, index) for index in range(max(1, int(count)))]
+        for worker in self.workers:
+            worker.start()
+
+        self.supervise_timer = QTimer(self)
+        self.supervise_timer.timeout.connect(self.supervise)
+        self.supervise_timer.start(SUPERVISE_MS)
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close)
+
+    def media_new(self, url, *options):
+        return RemoteMedia(url, options)
+
+    def media_player_new(self):
+        """Crear el reproductor de una pantalla en el proceso con menos pantallas."""
+        worker = min(self.workers, key=lambda worker: len(worker.players))
+        self.next_tile_id += 1
+        player = RemotePlayer(worker, self.next_tile_id)
+        worker.players[player.tile_id] = player
+        return player
+
+    def deliver(self, index, message):
+        """Aplicar un mensaje de un proceso en el hilo de la interfaz."""
+        worker = self.workers[index]
+        kind = message[0]
+        if kind == "exit":
+            # Solo cuenta si es la conexión actual (no la de un proceso ya reiniciado)
+            if message[1] is worker.conn:
+                self.schedule_restart(worker, "terminó")
+            return
+        worker.last_seen = time.monotonic()
+        if kind == "metrics":
+            _, tile_id, metrics = message
+            player = worker.players.get(tile_id)
+            if player is not None and player.active:
+                player.time_ms = metrics["time"]
+                player.bitrate = metrics["bitrate"]
+                player.stats = metrics["stats"]
+                if player.metrics_callback is not None:
+                    player.metrics_callback(metrics)
+        elif kind == "event":
+            _, tile_id, name = message
+            player = worker.players.get(tile_id)
+            if player is not None:
+                player.events.dispatch(name)
+
+    def supervise(self):
+        """Reiniciar los procesos que dejaron de responder."""
+        now = time.monotonic()
+        for worker in self.workers:
+            if not worker.restarting and now - worker.last_seen > WORKER_TIMEOUT:
+                self.schedule_restart(worker, "no responde")
+
+    def schedule_restart(self, worker, reason):
+        """Terminar un proceso caído o colgado y relanzarlo tras una breve espera."""
+        if worker.restarting or self.closing:
+            return
+        print(f"El proceso de decodificación {worker.index} {reason}; reiniciándolo")
+        worker.restarting = True
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(timeout=2.0)
+        QTimer.singleShot(RESTART_DELAY_MS, lambda: self.restart(worker))
+
+    def restart(self, worker):
+        """Lanzar de nuevo un proceso con los mismos streams."""
+        worker.restarting = False
+        worker.conn.close()
+        worker.start()
+
+    def close(self):
+        """Detener todos los procesos al salir."""
+        self.closing = True
+        self.supervise_timer.stop()
+        for worker in self.workers:
+            worker.stop()
+
+
+class WorkerTile:
+    """Reproductor y mediciones de una pantalla dentro del proceso hijo."""
+    def __init__(self, instance, tile_id, events, probe_settings, loudness):
+        # Los módulos de medición solo se cargan en el proceso hijo
+        from audio_meter import AudioMeter
+        from frame_probe import FrameProbe
+        self.instance = instance
+        self.tile_id = tile_id
+        self.player = instance.media_player_new()
+        self.meter = AudioMeter(self.player)
+        # Sonoridad: una plaza en el motor compartido por las pantallas del proceso
+        self.loudness = loudness
+        self.loudness_slot = loudness.add(self.meter.tap.write_pos)
+        self.last_loudness = 0.0
+        self.probe = FrameProbe(self.player, probe_settings)
+        self.gate = VideoGate(self.player)
+        self.probe_interval = probe_settings["min_interval"]
+        self.last_probe = 0.0
+        self.video_alarms = []
+        self.active = False
+        self.stats = vlc.MediaStats()
+
+        manager = self.player.event_manager()
+        for name in FORWARDED_EVENTS:
+            manager.event_attach(getattr(vlc.EventType, name),
+                                 lambda event, name=name: events.put((tile_id, name)))
+
+    def play(self, url, options, drawable, volume, video_suspended):
+        media = self.instance.media_new(url, *options)
+        self.player.set_media(media)
+        self.set_window(drawable)
+        self.player.audio_set_volume(volume)
+        self.player.play()
+        self.meter.reset()
+        self.probe.reset()
+        self.loudness.reset(self.loudness_slot, self.meter.tap.write_pos)
+        self.set_video_suspended(video_suspended)
+        self.active = True
+
+    def set_video_suspended(self, suspended):
+        if suspended:
+            self.gate.suspend()
+        elif self.gate.suspended:
+            self.gate.resume()
+            self.probe.reset()
+
+    def set_window(self, drawable):
+        if not drawable:
+            return
+        if sys.platform == "win32":
+            self.player.set_hwnd(drawable)
+        else:
+            self.player.set_xwindow(drawable)
+        if self.player.is_playing():
+            # Recrear la salida de video en la ventana nueva sin reabrir el stream
+            track = self.player.video_get_track()
+            if track >= 0:
+                self.player.video_set_track(-1)
+                self.player.video_set_track(track)
+
+    def stop(self):
+        self.active = False
+        self.player.stop()
+        self.meter.reset()
+        self.probe.reset()
+
+    def metrics(self, now):
+        """Nivel, espectro, alarmas de imagen, posición y tasa de bits de la pantalla."""
+        level, _, _, spectrum = self.meter.read_levels()
+        # Con la imagen pausada se conservan las últimas alarmas de imagen
+        self.gate.enforce()
+        if not self.gate.suspended and now - self.last_probe >= self.probe_interval:
+            self.last_probe = now
+            self.video_alarms = sorted(self.probe.sample())
+        stats = read_stats(self.player, self.stats)
+        metrics = {
+            "level": int(level),
+            "spectrum": spectrum,
+            "video_alarms": self.video_alarms,
+            "time": self.player.get_time(),
+            "bitrate": stats[STATS_FIELDS.index("demux_kbps")],
+            "stats": stats,
+        }
+        # La sonoridad se envía al ritmo con que la interfaz la muestra
+        if now - self.last_loudness >= LOUDNESS_INTERVAL:
+            self.last_loudness = now
+            metrics["loudness"] = self.loudness.results(self.loudness_slot)
+        return metrics
+
+    def close(self):
+        self.loudness.remove(self.loudness_slot)
+        self.probe.close()
+        self.player.stop()
+        self.player.release()
+
+
+def worker_main(conn, vlc_args, probe_settings):
+    """Bucle de un proceso de decodificación (se ejecuta en el proceso hijo)."""
+    from loudness_meter import LoudnessEngine
+    instance = vlc.Instance(list(vlc_args))
+    tiles = {}  # id de pantalla -> WorkerTile
+    loudness = LoudnessEngine()  # Sonoridad de todas las pantallas del proceso, en lote
+    events = queue.Queue()  # Eventos de libvlc, desde sus hilos
+    try:
+        while True:
+            deadline = time.monotonic() + WORKER_TICK
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not conn.poll(remaining):
+                    break
+                command, *args = conn.recv()
+                if command == "shutdown":
+                    return
+                tile_id = args[0]
+                tile = tiles.get(tile_id)
+                if command == "play":
+                    if tile is None:
+                        tile = tiles[tile_id] = WorkerTile(instance, tile_id, events, probe_settings,
+                                                             loudness)
+                    tile.play(*args[1:])
+                elif tile is None:
+                    continue
+                elif command == "window":
+                    tile.set_window(args[1])
+                elif command == "video":
+                    tile.set_video_suspended(args[1])
+                elif command == "volume":
+                    tile.player.audio_set_volume(args[1])
+                elif command == "pause":
+                    tile.active = False
+                    tile.player.pause()
+                elif command == "stop":
+                    tile.stop()
+                elif command == "release":
+                    tiles.pop(tile_id).close()
+
+            while True:
+                try:
+                    conn.send(("event",) + events.get_nowait())
+                except queue.Empty:
+                    break
+            loudness.pump([(tile.loudness_slot, tile.meter.tap) for tile in tiles.values() if tile.active])
+            now = time.monotonic()
+            for tile_id, tile in tiles.items():
+                if tile.active:
+                    conn.send(("metrics", tile_id, tile.metrics(now)))
+            conn.send(("heartbeat",))
+    except (EOFError, OSError):
+        pass  # La interfaz se cerró
+    finally:
+        for tile in tiles.values():
+            tile.close()
+        instance.release()
@@ -0,0 +1,228 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QImage
+from alarm_bus import SEVERITY_WARNING, SEVERITY_CRITICAL
+
+# Tamaño reducido de las capturas que se analizan
+PROBE_WIDTH = 64
+PROBE_HEIGHT = 36
+
+# Umbrales y tiempos de espera por defecto (se pueden cambiar en
+# multiviewer_config.json bajo la clave "frame_probe")
+DEFAULT_PROBE_SETTINGS = {
+    "black_luma": 20.0,        # Luma media (0-255) por debajo de la cual la imagen es negra
+    "black_variance": 40.0,    # Varianza máxima de una imagen negra
+    "freeze_difference": 0.5,  # Diferencia media entre capturas por debajo de la cual está congelada
+    "black_hold": 5.0,         # Segundos seguidos en negro antes de alarmar
+    "freeze_hold": 10.0,       # Segundos seguidos congelada antes de alarmar
+    "no_signal_hold": 5.0,     # Segundos sin imagen antes de alarmar
+    "min_interval": 1.0,       # Intervalo mínimo entre capturas de una pantalla
+    "sample_budget": 25.0,     # Capturas por segundo para todas las pantallas juntas
+}
+
+ALARM_BLACK = "black"
+ALARM_FROZEN = "frozen"
+ALARM_NO_SIGNAL = "no_signal"
+
+# Texto que se muestra en la pantalla para cada alarma
+ALARM_LABELS = {
+    ALARM_BLACK: "Pantalla negra",
+    ALARM_FROZEN: "Imagen congelada",
+    ALARM_NO_SIGNAL: "Sin señal",
+}
+ALARM_SEVERITIES = {
+    ALARM_BLACK: SEVERITY_CRITICAL,
+    ALARM_FROZEN: SEVERITY_WARNING,
+    ALARM_NO_SIGNAL: SEVERITY_CRITICAL,
+}
+
+_snapshot_dir = None
+
+
+def snapshot_dir():
+    """Carpeta temporal (borrada al salir) donde libvlc deja las capturas."""
+    global _snapshot_dir
+    if _snapshot_dir is None:
+        _snapshot_dir = tempfile.mkdtemp(prefix="multiviewer-probe-")
+        atexit.register(shutil.rmtree, _snapshot_dir, True)
+    return _snapshot_dir
+
+
+class FrameAnalyzer:
+    """Detecta imagen negra y congelada a partir de capturas de luma reducidas."""
+    def __init__(self, settings, width=PROBE_WIDTH, height=PROBE_HEIGHT):
+        self.settings = settings
+        # Búferes reutilizados entre capturas
+        self.current = np.zeros((height, width), dtype=np.float32)
+        self.previous = np.zeros((height, width), dtype=np.float32)
+        self.has_previous = False
+        self.black_since = None
+        self.frozen_since = None
+        self.no_signal_since = None
+        self.mean = 0.0
+        self.variance = 0.0
+        self.difference = 0.0
+
+    def update(self, luma, now):
+        """Analizar una captura (uint8, alto x ancho) y devolver las alarmas activas."""
+        self.previous, self.current = self.current, self.previous
+        np.copyto(self.current, luma, casting='unsafe')
+        self.mean = float(self.current.mean())
+        self.variance = float(self.current.var())
+        if self.has_previous:
+            self.difference = float(np.abs(self.current - self.previous).mean())
+        else:
+            self.difference = float('inf')
+        self.has_previous = True
+        self.no_signal_since = None
+
+        is_black = (self.mean <= self.settings["black_luma"]
+                    and self.variance <= self.settings["black_variance"])
+        # Una imagen negra también es estática: solo cuenta como negra
+        is_frozen = not is_black and self.difference <= self.settings["freeze_difference"]
+        self.black_since = (self.black_since or now) if is_black else None
+        self.frozen_since = (self.frozen_since or now) if is_frozen else None
+        return self.active_alarms(now)
+
+    def update_no_signal(self, now):
+        """Registrar que no se pudo obtener imagen y devolver las alarmas activas."""
+        self.no_signal_since = self.no_signal_since or now
+        self.has_previous = False
+        self.black_since = None
+        self.frozen_since = None
+        return self.active_alarms(now)
+
+    def active_alarms(self, now):
+        """Alarmas cuya condición se ha mantenido más que su tiempo de espera."""
+        alarms = set()
+        if self.black_since is not None and now - self.black_since >= self.settings["black_hold"]:
+            alarms.add(ALARM_BLACK)
+        if self.frozen_since is not None and now - self.frozen_since >= self.settings["freeze_hold"]:
+            alarms.add(ALARM_FROZEN)
+        if (self.no_signal_since is not None
+                and now - self.no_signal_since >= self.settings["no_signal_hold"]):
+            alarms.add(ALARM_NO_SIGNAL)
+        return alarms
+
+    def reset(self):
+        """Olvidar el historial (al detener o cambiar de stream)."""
+        self.has_previous = False
+        self.black_since = None
+        self.frozen_since = None
+        self.no_signal_since = None
+
+
+class FrameProbe:
+    """Captura y analiza la imagen de un reproductor sin tocar su salida de video."""
+    def __init__(self, player, settings):
+        self.player = player
+        self.analyzer = FrameAnalyzer(settings)
+        self.path = os.path.join(snapshot_dir(), f"tile-{id(self)}.png")
+        self.luma = np.zeros((PROBE_HEIGHT, PROBE_WIDTH), dtype=np.uint8)
+        # Evita liberar el reproductor mientras se toma una captura
+        self.lock = threading.Lock()
+        self.closed = False
+        self.busy = False
+        self.last_sample = 0.0
+        # Cambia en cada reinicio para descartar capturas de la reproducción anterior
+        self.generation = 0
+
+    def sample(self):
+        """Tomar y analizar una captura (se ejecuta en un hilo de trabajo)."""
+        now = time.monotonic()
+        with self.lock:
+            if self.closed:
+                return set()
+            try:
+                has_video = self.player.video_get_size(0) != (0, 0)
+            except Exception:
+                has_video = False
+            if not has_video or self.player.video_take_snapshot(0, self.path, PROBE_WIDTH, PROBE_HEIGHT) != 0:
+                return self.analyzer.update_no_signal(now)
+
+        image = QImage(self.path)
+        if image.isNull():
+            return self.analyzer.update_no_signal(now)
+        if image.width() != PROBE_WIDTH or image.height() != PROBE_HEIGHT:
+            image = image.scaled(PROBE_WIDTH, PROBE_HEIGHT)
+        image = image.convertToFormat(QImage.Format_Grayscale8)
+        bits = image.constBits()
+        bits.setsize(image.bytesPerLine() * PROBE_HEIGHT)
+        rows = np.frombuffer(bits, dtype=np.uint8).reshape(PROBE_HEIGHT, image.bytesPerLine())
+        np.copyto(self.luma, rows[:, :PROBE_WIDTH])
+        return self.analyzer.update(self.luma, now)
+
+    def reset(self):
+        """Reiniciar el análisis (al empezar o detener la reproducción)."""
+        self.analyzer.reset()
+        self.last_sample = time.monotonic()
+        self.generation += 1
+
+    def close(self):
+        """Esperar a que termine una captura en curso e impedir nuevas."""
+        with self.lock:
+            self.closed = True
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class FrameSampler(QObject):
+    """Reparte las capturas entre las pantallas dentro de un presupuesto fijo.
+
+    Con pocas pantallas cada una se captura cada `min_interval` segundos; con
+    muchas el intervalo crece para que el total no pase de `sample_budget`
+    capturas por segundo. Las capturas se hacen en hilos de trabajo y el
+    resultado vuelve al hilo de la interfaz mediante una señal.
+    """
+    sampled = pyqtSignal(object, object, int)  # pantalla, conjunto de alarmas, generación
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.settings = dict(DEFAULT_PROBE_SETTINGS)
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="frame-probe")
+        self.sampled.connect(self.deliver)
+
+    def configure(self, settings):
+        """Aplicar umbrales de la configuración sobre los valores por defecto."""
+        self.settings.update(settings or {})
+
+    def interval(self, tile_count):
+        """Segundos entre capturas de una misma pantalla según cuántas hay activas."""
+        return max(self.settings["min_interval"], tile_count / self.settings["sample_budget"])
+
+    def schedule(self, tiles):
+        """Lanzar las capturas de las pantallas a las que ya les toca."""
+        now = time.monotonic()
+        interval = self.interval(len(tiles))
+        for tile in tiles:
+            probe = tile.frame_probe
+            if probe.busy or now - probe.last_sample < interval:
+                continue
+            probe.busy = True
+            probe.last_sample = now
+            self.executor.submit(self.run, tile, probe, probe.generation)
+
+    def run(self, tile, probe, generation):
+        """Tomar la captura en el hilo de trabajo y publicar el resultado."""
+        try:
+            alarms = probe.sample()
+        except Exception as e:
+            print(f"Error al analizar la imagen: {e}")
+            alarms = set()
+        self.sampled.emit(tile, alarms, generation)
+
+    def deliver(self, tile, alarms, generation):
+        """Entregar el resultado a la pantalla en el hilo de la interfaz."""
+        probe = tile.frame_probe
+        probe.busy = False
+        if not probe.closed and generation == probe.generation:
+            tile.apply_video_alarms(alarms)
@@ -0,0 +1,104 @@
+import re
+import urllib.parse
+
+# Pares CLAVE=valor de una lista de atributos HLS (los valores entre comillas pueden tener comas)
+ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class Variant:
+    """Una calidad de una lista maestra (#EXT-X-STREAM-INF)."""
+    def __init__(self, uri, bandwidth=0, resolution=None, codecs="", frame_rate=None):
+        self.uri = uri
+        self.bandwidth = bandwidth
+        self.resolution = resolution  # (ancho, alto) o None
+        self.codecs = codecs
+        self.frame_rate = frame_rate
+
+
+class Segment:
+    """Un segmento de una lista de medios."""
+    def __init__(self, uri, duration, sequence):
+        self.uri = uri
+        self.duration = duration
+        self.sequence = sequence
+
+
+class MasterPlaylist:
+    """Lista maestra: las variantes disponibles de un canal."""
+    is_master = True
+
+    def __init__(self, variants):
+        self.variants = variants
+
+
+class MediaPlaylist:
+    """Lista de medios: los segmentos de una variante."""
+    is_master = False
+
+    def __init__(self, target_duration, media_sequence, segments, ended):
+        self.target_duration = target_duration
+        self.media_sequence = media_sequence
+        self.segments = segments
+        self.ended = ended  # False en directo (sin #EXT-X-ENDLIST)
+
+
+def parse_attributes(text):
+    """Convertir una lista de atributos HLS en un diccionario."""
+    return {key: value.strip('"') for key, value in ATTRIBUTE_PATTERN.findall(text)}
+
+
+def is_playlist(data):
+    """Indica si el contenido (texto o bytes) es una lista HLS."""
+    if isinstance(data, bytes):
+        data = data[:64].decode("utf-8", "replace")
+    return data.lstrip("\ufeff \r\n\t").startswith("#EXTM3U")
+
+
+def parse_playlist(text, base_url=""):
+    """Interpretar una lista HLS maestra o de medios; las URI se resuelven contra `base_url`."""
+    if not is_playlist(text):
+        raise ValueError("No es una lista HLS (falta #EXTM3U)")
+    variants = []
+    segments = []
+    target_duration = 0.0
+    media_sequence = 0
+    ended = False
+    pending_variant = None
+    pending_duration = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            attributes = parse_attributes(line[len("#EXT-X-STREAM-INF:"):])
+            resolution = None
+            if "x" in attributes.get("RESOLUTION", ""):
+                width, height = attributes["RESOLUTION"].split("x", 1)
+                resolution = (int(width), int(height))
+            frame_rate = attributes.get("FRAME-RATE")
+            pending_variant = Variant(None, int(attributes.get("BANDWIDTH", 0) or 0), resolution,
+                                      attributes.get("CODECS", ""),
+                                      float(frame_rate) if frame_rate else None)
+        elif line.startswith("#EXTINF:"):
+            pending_duration = float(line[len("#EXTINF:"):].split(",", 1)[0] or 0)
+        elif line.startswith("#EXT-X-TARGETDURATION:"):
+            target_duration = float(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+            media_sequence = int(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-ENDLIST"):
+            ended = True
+        elif line.startswith("#"):
+            continue
+        elif pending_variant is not None:
+            pending_variant.uri = urllib.parse.urljoin(base_url, line)
+            variants.append(pending_variant)
+            pending_variant = None
+        elif pending_duration is not None:
+            segments.append(Segment(urllib.parse.urljoin(base_url, line), pending_duration,
+                                    media_sequence + len(segments)))
+            pending_duration = None
+
+    if variants:
+        return MasterPlaylist(variants)
+    return MediaPlaylist(target_duration, media_sequence, segments, ended)
@@ -0,0 +1,593 @@
+"""Proxy HLS local con caché: cada lista y cada segmento se descargan una vez para todos.
+
+Uso:
+    python hls_proxy.py [--host 127.0.0.1] [--port 8089] [URL ...]   Servir (e imprimir las URL locales)
+    python hls_proxy.py --self-test                                   Comprobar contra un origen falso local
+
+El visor lo activa solo (clave "hls_proxy" de multiviewer_config.json) y abre
+las URL .m3u8 de las pantallas a través de él; el servidor de mosaico lo sirve
+bajo /hls/ para el cliente web. Las URI de las listas se reescriben como rutas
+/hls/<origen codificado>/<archivo>, así maestras, variantes, segmentos, claves
+y segmentos de inicio pasan todos por la caché.
+
+- Una lista de medios en directo se pide al origen como mucho una vez por
+  duración objetivo (#EXT-X-TARGETDURATION); las maestras y las listas
+  terminadas se guardan más tiempo.
+- Los segmentos quedan en una caché LRU en memoria, acotada en bytes y con
+  vencimiento. Al refrescar una lista en directo se piden por adelantado los
+  últimos segmentos, que son los que van a pedir todas las pantallas.
+- Peticiones simultáneas de lo mismo esperan a una única descarga, y las
+  conexiones con los orígenes y con los clientes se mantienen abiertas.
+
+Solo se descargan las fuentes de las pantallas (las que pasan por
+`local_url` o `allow`) y las URI que el propio proxy escribió en una lista
+que sirvió; cualquier otra ruta /hls/ se rechaza con 403, así el proxy no
+sirve para llegar a otras direcciones. Una respuesta del origen mayor que
+"max_response_bytes" se descarta sin guardarla.
+"""
+import argparse
+import asyncio
+import base64
+import collections
+import http.client
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from control_server import read_request, http_response, binary_response
+from hls_playlist import is_playlist, parse_playlist
+
+# Valores por defecto (se pueden cambiar en multiviewer_config.json bajo la clave "hls_proxy")
+DEFAULT_PROXY_SETTINGS = {
+    "enabled": True,
+    "host": "127.0.0.1",
+    "port": 0,                      # 0 = un puerto libre
+    "max_bytes": 256 * 1024 * 1024,  # Tamaño máximo de la caché de segmentos
+    "segment_ttl": 120.0,           # Segundos que se guarda un segmento
+    "master_ttl": 60.0,             # Segundos que se guarda una lista maestra
+    "vod_ttl": 600.0,               # Segundos que se guarda una lista terminada (#EXT-X-ENDLIST)
+    "prefetch": 2,                  # Últimos segmentos de una lista en directo que se piden por adelantado
+    "max_response_bytes": 64 * 1024 * 1024,  # Tamaño máximo de una respuesta del origen
+}
+PROXY_PREFIX = "/hls/"
+PLAYLIST_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_TYPE = "video/mp2t"
+# Vencimiento mínimo de una lista en directo (algunas anuncian una duración objetivo de 0)
+MIN_PLAYLIST_TTL = 1.0
+UPSTREAM_TIMEOUT = 10.0
+MAX_REDIRECTS = 5
+# Conexiones ociosas que se conservan por origen
+IDLE_CONNECTIONS = 4
+USER_AGENT = "Multiviewer-HLS-Proxy"
+# URI escritas en listas servidas que se recuerdan como permitidas (las más antiguas se olvidan)
+MAX_LISTED_URIS = 50000
+
+_proxy = None
+
+
+def get_hls_proxy():
+    """Obtener el proxy HLS único de la aplicación."""
+    global _proxy
+    if _proxy is None:
+        _proxy = HlsProxy()
+    return _proxy
+
+
+def proxy_path(url):
+    """Ruta local de una URL remota: el origen codificado y el nombre del archivo (para detectar el tipo)."""
+    token = base64.urlsafe_b64encode(url.encode("utf-8")).decode("ascii").rstrip("=")
+    name = urllib.parse.urlsplit(url).path.rsplit("/", 1)[-1] or "index.m3u8"
+    return f"{PROXY_PREFIX}{token}/{urllib.parse.quote(name)}"
+
+
+def origin_url(path):
+    """URL remota de una ruta local del proxy (ValueError si no es una)."""
+    if not path.startswith(PROXY_PREFIX):
+        raise ValueError("no es una ruta del proxy")
+    token = path[len(PROXY_PREFIX):].split("/", 1)[0]
+    try:
+        url = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("ruta del proxy inválida")
+    if urllib.parse.urlsplit(url).scheme not in ("http", "https"):
+        raise ValueError("solo se admiten orígenes http y https")
+    return url
+
+
+def is_proxiable(url):
+    """Listas HLS remotas por http o https."""
+    parts = urllib.parse.urlsplit(url.strip())
+    return parts.scheme.lower() in ("http", "https") and parts.path.lower().endswith((".m3u8", ".m3u"))
+
+
+def rewrite_playlist(text, base_url):
+    """Reescribir las URI de una lista (líneas y atributos URI="...") como rutas del proxy.
+
+    Devuelve (texto, URI remotas reescritas).
+    """
+    lines = []
+    uris = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith("#"):
+            uris.append(urllib.parse.urljoin(base_url, stripped))
+            line = proxy_path(uris[-1])
+        elif 'URI="' in stripped:
+            start = line.index('URI="') + len('URI="')
+            end = line.index('"', start)
+            uris.append(urllib.parse.urljoin(base_url, line[start:end]))
+            line = line[:start] + proxy_path(uris[-1]) + line[end:]
+        lines.append(line)
+    return "\n".join(lines) + "\n", uris
+
+
+class UpstreamError(Exception):
+    """El origen respondió con error o no se pudo conectar."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class CacheEntry:
+    __slots__ = ("body", "content_type", "expires")
+
+    def __init__(self, body, content_type, expires):
+        self.body = body
+        self.content_type = content_type
+        self.expires = expires
+
+
+class ByteCache:
+    """Caché LRU acotada por la suma de los tamaños, con vencimiento por entrada."""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+    def get(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= now:
+            self.discard(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, body, content_type, expires):
+        self.discard(key)
+        # Un objeto que ocupa buena parte de la caché la vaciaría para un solo uso
+        if len(body) > self.max_bytes // 4:
+            return
+        self.entries[key] = CacheEntry(body, content_type, expires)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, oldest = self.entries.popitem(last=False)
+            self.size -= len(oldest.body)
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+
+
+class UpstreamPool:
+    """Conexiones HTTP persistentes con los orígenes, reutilizadas entre descargas (desde varios hilos)."""
+    def __init__(self, max_response_bytes=DEFAULT_PROXY_SETTINGS["max_response_bytes"]):
+        self.idle = collections.defaultdict(list)  # (esquema, host) -> conexiones libres
+        self.lock = threading.Lock()
+        self.max_response_bytes = max_response_bytes
+
+    def connection(self, scheme, netloc):
+        with self.lock:
+            if self.idle[(scheme, netloc)]:
+                return self.idle[(scheme, netloc)].pop(), True
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return connection_class(netloc, timeout=UPSTREAM_TIMEOUT), False
+
+    def give_back(self, scheme, netloc, connection):
+        with self.lock:
+            if len(self.idle[(scheme, netloc)]) < IDLE_CONNECTIONS:
+                self.idle[(scheme, netloc)].append(connection)
+                return
+        connection.close()
+
+    def fetch(self, url):
+        """Descargar `url` siguiendo redirecciones. Devuelve (cuerpo, tipo, URL final)."""
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urllib.parse.urlsplit(url)
+            target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+            status, headers, body = self.request(parts.scheme, parts.netloc, target)
+            if status in (301, 302, 303, 307, 308) and headers.get("location"):
+                url = urllib.parse.urljoin(url, headers["location"])
+                continue
+            if status != 200:
+                raise UpstreamError(status, f"el origen respondió {status}")
+            return body, headers.get("content-type", ""), url
+        raise UpstreamError(502, "demasiadas redirecciones")
+
+    def request(self, scheme, netloc, target):
+        # Una conexión reutilizada puede haberla cerrado el origen: se reintenta una vez con una nueva
+        for _ in range(2):
+            connection, reused = self.connection(scheme, netloc)
+            try:
+                connection.request("GET", target, headers={"User-Agent": USER_AGENT})
+                response = connection.getresponse()
+                body = response.read(self.max_response_bytes + 1)
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                if reused:
+                    continue
+                raise UpstreamError(502, f"no se pudo descargar del origen: {e}")
+            headers = {name.lower(): value for name, value in response.getheaders()}
+            if len(body) > self.max_response_bytes:
+                # El resto del cuerpo sigue en la conexión: no se puede reutilizar
+                connection.close()
+                raise UpstreamError(502, f"respuesta del origen mayor que {self.max_response_bytes} bytes")
+            if response.will_close:
+                connection.close()
+            else:
+                self.give_back(scheme, netloc, connection)
+            return response.status, headers, body
+        raise UpstreamError(502, "el origen cerró la conexión")
+
+
+class HlsProxy:
+    """Proxy HLS con caché sobre un lazo de asyncio; las descargas van a hilos del ejecutor.
+
+    La caché y las descargas en curso solo se tocan desde el lazo, así que no
+    necesitan bloqueos. Puede tener su propio puerto (`start`) o atender las
+    rutas /hls/ de otro servidor con `respond` (el de mosaico).
+    """
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_PROXY_SETTINGS)
+        self.settings.update(settings or {})
+        self.cache = ByteCache(int(self.settings["max_bytes"]))
+        self.upstream = UpstreamPool(int(self.settings["max_response_bytes"]))
+        self.sources = set()  # URL de las pantallas que se pueden pedir
+        self.listed = collections.OrderedDict()  # URI escritas por el proxy en listas que sirvió
+        self.inflight = {}  # URL -> futuro de la descarga en curso
+        self.stats = collections.Counter()
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.port = None
+
+    def configure(self, settings):
+        """Aplicar la sección "hls_proxy" de la configuración y abrir el puerto la primera vez."""
+        self.settings = dict(DEFAULT_PROXY_SETTINGS)
+        self.settings.update(settings or {})
+        self.cache.max_bytes = int(self.settings["max_bytes"])
+        self.upstream.max_response_bytes = int(self.settings["max_response_bytes"])
+        if self.settings["enabled"] and self.loop is None:
+            try:
+                self.start(self.settings["host"], int(self.settings["port"]))
+            except OSError as e:
+                print(f"No se pudo abrir el puerto del proxy HLS: {e}")
+
+    def start(self, host, port):
+        """Abrir el puerto y lanzar el lazo de asyncio en un hilo. Devuelve el puerto."""
+        loop = asyncio.new_event_loop()
+        try:
+            self.server = loop.run_until_complete(asyncio.start_server(self.handle, host, port))
+        except OSError:
+            loop.close()
+            raise
+        self.loop = loop
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=loop.run_forever, name="hls-proxy", daemon=True)
+        self.thread.start()
+        return self.port
+
+    def close(self):
+        """Cerrar el puerto y detener el lazo."""
+        if self.loop is None:
+            return
+        loop = self.loop
+        self.loop = None
+        self.port = None
+        loop.call_soon_threadsafe(self.server.close)
+        loop.call_soon_threadsafe(loop.stop)
+        self.thread.join(timeout=2.0)
+
+    def allow(self, url):
+        """Permitir pedir `url` (una fuente de pantalla) a través del proxy."""
+        if is_proxiable(url):
+            self.sources.add(url.strip())
+
+    def is_allowed(self, url):
+        """Una fuente de pantalla o una URI que el proxy escribió en una lista que sirvió."""
+        return url in self.sources or url in self.listed
+
+    def remember_listed(self, uris):
+        """Recordar las URI de una lista servida (desde el lazo)."""
+        for uri in uris:
+            self.listed[uri] = None
+            self.listed.move_to_end(uri)
+        while len(self.listed) > MAX_LISTED_URIS:
+            self.listed.popitem(last=False)
+
+    def local_url(self, url):
+        """URL por la que abrir `url`: la del proxy si es una lista HLS remota y el proxy está activo."""
+        if self.port is None or not is_proxiable(url):
+            return url
+        self.allow(url)
+        host = self.settings["host"]
+        if host in ("0.0.0.0", "", "::"):
+            host = "127.0.0.1"
+        return f"http://{host}:{self.port}{proxy_path(url.strip())}"
+
+    async def handle(self, reader, writer):
+        """Atender una conexión: peticiones seguidas sobre la misma conexión."""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError as e:
+                    writer.write(http_response(400, {"error": str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                writer.write(await self.respond(request, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, request, keep_alive=True):
+        """Respuesta completa a una petición /hls/ (GET o HEAD)."""
+        if request.method not in ("GET", "HEAD"):
+            return http_response(405, {"error": "solo GET"}, keep_alive)
+        try:
+            url = origin_url(request.path)
+            if not self.is_allowed(url):
+                return http_response(403, {"error": "no es una fuente de la pared"}, keep_alive)
+            entry = await self.get(url)
+        except ValueError as e:
+            return http_response(404, {"error": str(e)}, keep_alive)
+        except UpstreamError as e:
+            return http_response(e.status if 400 <= e.status < 600 else 502, {"error": str(e)}, keep_alive)
+        body = entry.body if request.method == "GET" else b""
+        self.stats["served_bytes"] += len(body)
+        headers = {"Cache-Control": "no-cache", "Access-Control-Allow-Origin": "*"}
+        response = binary_response(200, body, entry.content_type, headers, keep_alive)
+        if request.method == "HEAD":
+            # Content-Length del cuerpo que tendría un GET
+            response = response.replace(b"Content-Length: 0\r\n", f"Content-Length: {len(entry.body)}\r\n".encode(), 1)
+        return response
+
+    async def get(self, url):
+        """Entrada de la caché para `url`, descargándola (una sola vez a la vez) si falta o venció."""
+        entry = self.cache.get(url, time.monotonic())
+        if entry is not None:
+            self.stats["hits"] += 1
+            return entry
+        self.stats["misses"] += 1
+        future = self.inflight.get(url)
+        if future is None:
+            future = self.inflight[url] = asyncio.ensure_future(self.download(url))
+            future.add_done_callback(lambda _: self.inflight.pop(url, None))
+        return await asyncio.shield(future)
+
+    async def download(self, url):
+        """Descargar del origen y guardar en la caché (las listas ya reescritas)."""
+        loop = asyncio.get_running_loop()
+        body, content_type, final_url = await loop.run_in_executor(None, self.upstream.fetch, url)
+        self.stats["upstream_requests"] += 1
+        self.stats["upstream_bytes"] += len(body)
+        now = time.monotonic()
+        if not is_playlist(body):
+            self.cache.put(url, body, content_type or SEGMENT_TYPE, now + float(self.settings["segment_ttl"]))
+            return self.cache.get(url, now) or CacheEntry(body, content_type or SEGMENT_TYPE, now)
+        text = body.decode("utf-8", "replace")
+        try:
+            playlist = parse_playlist(text, final_url)
+        except ValueError as e:
+            raise UpstreamError(502, f"lista inválida del origen: {e}")
+        if playlist.is_master:
+            ttl = float(self.settings["master_ttl"])
+        elif playlist.ended:
+            ttl = float(self.settings["vod_ttl"])
+        else:
+            ttl = max(MIN_PLAYLIST_TTL, playlist.target_duration)
+            self.prefetch(playlist.segments[-int(self.settings["prefetch"]):] if self.settings["prefetch"] else [])
+        text, uris = rewrite_playlist(text, final_url)
+        self.remember_listed(uris)
+        entry = CacheEntry(text.encode("utf-8"), PLAYLIST_TYPE, now + ttl)
+        self.cache.put(url, entry.body, entry.content_type, entry.expires)
+        return entry
+
+    def prefetch(self, segments):
+        """Pedir por adelantado los segmentos que aún no están en la caché."""
+        now = time.monotonic()
+        for segment in segments:
+            if segment.uri not in self.inflight and self.cache.get(segment.uri, now) is None:
+                self.stats["prefetched"] += 1
+                task = self.inflight[segment.uri] = asyncio.ensure_future(self.download(segment.uri))
+                task.add_done_callback(lambda done, uri=segment.uri: self.finish_prefetch(uri, done))
+
+    def finish_prefetch(self, uri, task):
+        self.inflight.pop(uri, None)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"No se pudo descargar por adelantado {uri}: {task.exception()}")
+
+
+def self_test():
+    """Origen falso local con una lista en directo: caché, reescritura, coalescencia y reconexión."""
+    import http.server
+    import urllib.request
+
+    hits = collections.Counter()
+    state = {"sequence": 0}
+
+    class Origin(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            hits[self.path] += 1
+            if self.path == "/live/master.m3u8":
+                body = ("#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\nlow/index.m3u8\n"
+                        "#EXT-X-STREAM-INF:BANDWIDTH=3000000,RESOLUTION=1920x1080\n"
+                        "https://cdn.invalid/high/index.m3u8\n").encode()
+            elif self.path == "/live/low/index.m3u8":
+                sequence = state["sequence"]
+                body = (f"#EXTM3U\n#EXT-X-TARGETDURATION:1\n#EXT-X-MEDIA-SEQUENCE:{sequence}\n"
+                        '#EXT-X-KEY:METHOD=AES-128,URI="../keys/k.bin"\n' +
+                        "".join(f"#EXTINF:1.0,\nseg{number}.ts\n" for number in range(sequence, sequence + 3))).encode()
+            elif self.path.startswith("/live/low/seg"):
+                body = self.path.encode() * 1000
+            elif self.path == "/live/keys/k.bin":
+                body = b"k" * 16
+            elif self.path in ("/live/big.m3u8", "/interno/secreto"):
+                body = b"x" * 200000
+            elif self.path == "/old.m3u8":
+                self.send_response(302)
+                self.send_header("Location", "/live/master.m3u8")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            else:
+                self.send_error(404)
+                return
+            time.sleep(0.05)  # Latencia del origen, para que las peticiones simultáneas coincidan
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    origin = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Origin)
+    origin.handle_error = lambda request, address: None  # El proxy corta a propósito la respuesta grande
+    threading.Thread(target=origin.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{origin.server_address[1]}"
+
+    proxy = HlsProxy({"prefetch": 1, "max_response_bytes": 100000})
+    proxy.start("127.0.0.1", 0)
+    assert proxy.local_url("rtsp://camara/stream") == "rtsp://camara/stream"
+    master_url = proxy.local_url(base + "/old.m3u8")
+    assert master_url.startswith(f"http://127.0.0.1:{proxy.port}/hls/") and master_url.endswith("/old.m3u8")
+
+    def get(url):
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.read()
+
+    # La maestra llega por la redirección y sus variantes (relativas y absolutas) apuntan al proxy
+    master = parse_playlist(get(master_url).decode(), master_url)
+    assert master.is_master and all(variant.uri.startswith(f"http://127.0.0.1:{proxy.port}/hls/")
+                                    for variant in master.variants)
+    assert origin_url(urllib.parse.urlsplit(master.variants[1].uri).path) == "https://cdn.invalid/high/index.m3u8"
+    low_url = master.variants[0].uri
+
+    # Diez clientes a la vez: una sola descarga de la lista y de cada segmento
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get(low_url))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1 and hits["/live/low/index.m3u8"] == 1
+    text = results[0].decode()
+    assert f'URI="{proxy_path(base + "/live/keys/k.bin")}"' in text
+    media = parse_playlist(text, low_url)
+    for _ in range(5):
+        for segment in media.segments:
+            assert get(segment.uri) == f"/live/low/seg{segment.sequence}.ts".encode() * 1000
+    assert all(hits[f"/live/low/seg{number}.ts"] == 1 for number in range(3))
+    assert hits["/live/master.m3u8"] == 1
+
+    # Lista en directo: se vuelve a pedir al origen solo tras la duración objetivo, y el último
+    # segmento nuevo llega por adelantado
+    state["sequence"] = 1
+    get(low_url)
+    assert hits["/live/low/index.m3u8"] == 1
+    time.sleep(1.1)
+    newest = parse_playlist(get(low_url).decode(), low_url).segments[-1]
+    assert hits["/live/low/index.m3u8"] == 2 and newest.sequence == 3
+    deadline = time.monotonic() + 5
+    while hits["/live/low/seg3.ts"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    get(newest.uri)
+    assert hits["/live/low/seg3.ts"] == 1
+
+    # Errores del origen y rutas ajenas
+    for url, code in ((proxy.local_url(base + "/nada.m3u8"), 404), (f"http://127.0.0.1:{proxy.port}/hls/%%%/x", 404)):
+        try:
+            get(url)
+            raise AssertionError(f"se esperaba {code}")
+        except urllib.error.HTTPError as e:
+            assert e.code == code, e.code
+
+    # Solo fuentes de la pared y URI de listas servidas: nada más se pide al origen
+    for url in (base + "/interno/secreto", "https://cdn.invalid/otra/index.m3u8"):
+        try:
+            get(f"http://127.0.0.1:{proxy.port}{proxy_path(url)}")
+            raise AssertionError("se esperaba 403")
+        except urllib.error.HTTPError as e:
+            assert e.code == 403, e.code
+    assert hits["/interno/secreto"] == 0
+
+    # Una respuesta demasiado grande se rechaza y no queda en la caché
+    big_url = proxy.local_url(base + "/live/big.m3u8")
+    for attempt in (1, 2):
+        try:
+            get(big_url)
+            raise AssertionError("se esperaba 502")
+        except urllib.error.HTTPError as e:
+            assert e.code == 502 and hits["/live/big.m3u8"] == attempt
+
+    # La caché respeta el tamaño máximo
+    cache = ByteCache(100)
+    for number in range(10):
+        cache.put(number, b"x" * 20, SEGMENT_TYPE, time.monotonic() + 60)
+    assert cache.size <= 100 and cache.get(0, time.monotonic()) is None and cache.get(9, time.monotonic()) is not None
+
+    proxy.close()
+    origin.shutdown()
+    upstream, served = proxy.stats["upstream_bytes"], proxy.stats["served_bytes"]
+    print(f"Prueba del proxy HLS correcta ({upstream} bytes del origen para {served} servidos, "
+          f"{proxy.stats['hits']} aciertos de caché)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Proxy HLS local con caché")
+    parser.add_argument("urls", nargs="*", help="listas HLS cuyas URL locales se imprimen")
+    parser.add_argument("--host", default=DEFAULT_PROXY_SETTINGS["host"])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--self-test", action="store_true", help="comprobar el proxy contra un origen falso local")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return self_test()
+    settings = {}
+    try:
+        with open("multiviewer_config.json", "r") as file:
+            settings = json.load(file).get("hls_proxy") or {}
+    except (OSError, json.JSONDecodeError):
+        pass
+    proxy = HlsProxy(settings)
+    try:
+        proxy.start(args.host, args.port)
+    except OSError as e:
+        print(f"No se pudo abrir el puerto {args.port}: {e}")
+        return 1
+    print(f"Proxy HLS en http://{args.host}:{proxy.port}{PROXY_PREFIX}")
+    for url in args.urls:
+        print(f"{url} -> {proxy.local_url(url)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    proxy.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
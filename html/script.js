@@ -96,11 +96,102 @@ document.addEventListener("DOMContentLoaded", function () {
         };
     }
 
+    // Miniaturas del servidor de mosaico (mosaic_server.py): una imagen por fuente,
+    // sin decodificar video en el navegador. Solo se piden las que están a la vista.
+    function startThumbnails(sources) {
+        const thumbGrid = document.createElement("div");
+        thumbGrid.className = "thumb-grid";
+        videoGrid.parentNode.insertBefore(thumbGrid, videoGrid);
+        const tiles = new Map();
+        const visible = new Set();
+        let socket = null;
+
+        function subscribe() {
+            if (socket && socket.readyState === WebSocket.OPEN) {
+                socket.send(JSON.stringify({ subscribe: Array.from(visible) }));
+            }
+        }
+
+        const observer = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                const id = entry.target.dataset.source;
+                if (entry.isIntersecting) {
+                    visible.add(id);
+                } else {
+                    visible.delete(id);
+                }
+            });
+            subscribe();
+        });
+
+        sources.forEach(function (source) {
+            const tile = document.createElement("div");
+            tile.className = "thumb-container";
+            tile.dataset.source = source.id;
+
+            const image = document.createElement("img");
+            image.alt = source.name || source.url;
+            tile.appendChild(image);
+
+            const label = document.createElement("div");
+            label.className = "thumb-label";
+            label.textContent = source.name || source.url;
+            tile.appendChild(label);
+
+            // Abrir la fuente completa en un reproductor de la grilla
+            const liveButton = document.createElement("button");
+            liveButton.textContent = "Ver en vivo";
+            liveButton.onclick = () => addVideoScreen(new URL(source.live_url, location.href).href);
+            tile.appendChild(liveButton);
+
+            thumbGrid.appendChild(tile);
+            tiles.set(source.id, image);
+            observer.observe(tile);
+        });
+
+        function connect() {
+            const protocol = location.protocol === "https:" ? "wss:" : "ws:";
+            socket = new WebSocket(`${protocol}//${location.host}/ws`);
+            socket.binaryType = "arraybuffer";
+            socket.onopen = subscribe;
+            socket.onmessage = function (event) {
+                if (typeof event.data === "string") {
+                    return;
+                }
+                // 1 byte con el largo del id, el id y la imagen
+                const bytes = new Uint8Array(event.data);
+                const id = new TextDecoder().decode(bytes.subarray(1, 1 + bytes[0]));
+                const image = tiles.get(id);
+                if (!image) {
+                    return;
+                }
+                const previous = image.src;
+                image.src = URL.createObjectURL(new Blob([bytes.subarray(1 + bytes[0])]));
+                if (previous.startsWith("blob:")) {
+                    URL.revokeObjectURL(previous);
+                }
+            };
+            socket.onclose = function () {
+                setTimeout(connect, 2000);
+            };
+        }
+
+        if ("WebSocket" in window) {
+            connect();
+        } else {
+            // Sin WebSocket: un stream MJPEG por miniatura
+            tiles.forEach((image, id) => image.src = `mjpeg/${id}`);
+        }
+    }
+
     // Manejar el botón para agregar pantallas
     addScreenButton.addEventListener("click", function () {
         addVideoScreen();
     });
 
-    // Agregar pantallas iniciales
-    addVideoScreen();
+    // Con el servidor de mosaico se muestran sus miniaturas; sin él, una pantalla vacía como antes
+    fetch("api/sources")
+        .then(response => response.ok ? response.json() : Promise.reject(response.status))
+        .then(data => startThumbnails(data.sources))
+        .catch(() => addVideoScreen());
 });
@@ -0,0 +1,228 @@
+"""Distribuciones guardadas de la pared: forma de la cuadrícula y canal de cada pantalla.
+
+Una distribución guarda, para cada ventana abierta, cuántas pantallas tiene y
+la URL y el nombre de cada una (en la base de canales, ver channel_db). Al
+recuperarla se compara con lo que muestra la pared y solo se tocan las
+pantallas que difieren: las que siguen con la misma fuente no se detienen, las
+que cambian de fuente abren el medio nuevo en el reproductor que ya tenían, y
+solo se crean o cierran pantallas si cambia el tamaño de la cuadrícula.
+
+Atajos (en cualquier ventana del visor):
+    Ctrl+Shift+S    Guardar la pared como distribución
+    Ctrl+Shift+L    Elegir una distribución y recuperarla
+    Ctrl+1..Ctrl+9  Recuperar las nueve primeras distribuciones por orden alfabético
+y los configurados en "presets" -> "hotkeys" (p. ej. {"F1": "Noticias"}).
+"""
+import sqlite3
+from PyQt5.QtCore import QObject, QCoreApplication
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QShortcut, QInputDialog, QMessageBox
+
+# Valores por defecto (se pueden cambiar en multiviewer_config.json bajo la clave "presets")
+DEFAULT_PRESET_SETTINGS = {
+    "hotkeys": {},              # Tecla -> nombre de la distribución que recupera
+    "numbered_hotkeys": True,   # Ctrl+1..Ctrl+9 por orden alfabético
+}
+SAVE_HOTKEY = "Ctrl+Shift+S"
+RECALL_HOTKEY = "Ctrl+Shift+L"
+NUMBERED_HOTKEYS = 9
+
+_presets = None
+
+
+def get_layout_presets():
+    """Obtener el gestor de distribuciones único de la aplicación."""
+    global _presets
+    if _presets is None:
+        _presets = LayoutPresets(parent=QCoreApplication.instance())
+    return _presets
+
+
+def window_layouts(state):
+    """Pares (número de ventana, bloque) de un estado con la forma del urls.json, ordenados."""
+    layouts = []
+    for key, layout in state.items():
+        if key.startswith("window_") and key[len("window_"):].isdigit() and isinstance(layout, dict):
+            layouts.append((int(key[len("window_"):]), layout))
+    return sorted(layouts, key=lambda item: item[0])
+
+
+class LayoutPresets(QObject):
+    """Guarda y recupera distribuciones de todas las ventanas abiertas del visor.
+
+    Cada ventana se registra al crearse (y recibe los atajos) y se retira al
+    cerrarse. Las distribuciones viven en la base del almacén de estado que
+    comparten las ventanas.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.settings = dict(DEFAULT_PRESET_SETTINGS)
+        self.windows = []
+
+    def configure(self, settings):
+        """Aplicar la sección "presets" de la configuración."""
+        self.settings = dict(DEFAULT_PRESET_SETTINGS)
+        self.settings.update(settings or {})
+
+    def register_window(self, window):
+        """Incorporar una ventana del visor e instalarle los atajos."""
+        if window not in self.windows:
+            self.windows.append(window)
+        shortcuts = [(SAVE_HOTKEY, lambda: self.prompt_save(window)),
+                     (RECALL_HOTKEY, lambda: self.prompt_recall(window))]
+        if self.settings["numbered_hotkeys"]:
+            for number in range(1, NUMBERED_HOTKEYS + 1):
+                shortcuts.append((f"Ctrl+{number}", lambda position=number - 1: self.recall_position(window, position)))
+        for key, name in self.settings["hotkeys"].items():
+            shortcuts.append((key, lambda name=name: self.recall_from(window, name)))
+        for key, slot in shortcuts:
+            QShortcut(QKeySequence(key), window).activated.connect(slot)
+
+    def unregister_window(self, window):
+        """Retirar una ventana que se cierra."""
+        if window in self.windows:
+            self.windows.remove(window)
+
+    def database(self):
+        """Base de canales del almacén compartido por las ventanas, o None si no hay ventanas."""
+        return self.windows[0].state_store.database if self.windows else None
+
+    def names(self):
+        """Nombres de las distribuciones guardadas."""
+        database = self.database()
+        return database.layout_names() if database is not None else []
+
+    def capture(self):
+        """Estado de la pared con la forma del urls.json (solo ventanas abiertas y sus pantallas)."""
+        state = {}
+        for window in self.windows:
+            count = window.widget_count()
+            store = window.state_store
+            urls, names = {}, {}
+            for index in range(count):
+                url = store.get_url(window.window_number, index)
+                name = store.get_name(window.window_number, index)
+                if url:
+                    urls[str(index)] = url
+                if name:
+                    names[str(index)] = name
+            state[f"window_{window.window_number}"] = {"num_widgets": count, "urls": urls, "names": names}
+        return state
+
+    def save(self, name):
+        """Guardar la pared actual como la distribución `name` (reemplaza la anterior del mismo nombre)."""
+        name = name.strip()
+        database = self.database()
+        if not name or database is None:
+            return False
+        database.save_layout(name, self.capture())
+        return True
+
+    def delete(self, name):
+        """Borrar una distribución guardada."""
+        database = self.database()
+        return database is not None and database.delete_layout(name)
+
+    def recall(self, name):
+        """Llevar la pared a la distribución `name` tocando solo lo que difiere.
+
+        Devuelve cuántas pantallas cambiaron de fuente, se crearon o se cerraron,
+        o None si la distribución no existe.
+        """
+        database = self.database()
+        if database is None or database.layout_id(name, create=False) is None:
+            return None
+        open_windows = {window.window_number: window for window in self.windows}
+        missing = []
+        changed = 0
+        for window_number, layout in window_layouts(database.load_layout(name)):
+            window = open_windows.get(window_number)
+            if window is None:
+                missing.append((window_number, layout))
+            else:
+                changed += window.apply_layout(layout)
+        if missing:
+            changed += self.open_windows(missing)
+        return changed
+
+    def open_windows(self, layouts):
+        """Abrir las ventanas de la distribución que no están abiertas.
+
+        Su estado se escribe antes en el almacén, así cada ventana nueva lo lee
+        al crear sus pantallas como al arrancar el visor. Devuelve cuántas
+        pantallas se crearon.
+        """
+        anchor = self.windows[0]
+        store = anchor.state_store
+        for window_number, layout in layouts:
+            count = layout.get("num_widgets", 0)
+            store.set_num_widgets(window_number, count)
+            for index in range(count):
+                store.set_url(window_number, index, layout["urls"].get(str(index), ""))
+                store.set_name(window_number, index, layout["names"].get(str(index), ""))
+        wanted = {window_number for window_number, _ in layouts}
+        created = 0
+        # Las ventanas nuevas toman el número siguiente: solo se abren las que coinciden
+        while anchor.next_window_number() in wanted:
+            window_number = anchor.next_window_number()
+            window = anchor.open_window(None)
+            if window is None:
+                break
+            wanted.discard(window_number)
+            created += window.widget_count()
+        for window_number in sorted(wanted):
+            print(f"No se pudo abrir la ventana {window_number} de la distribución")
+        return created
+
+    def recall_from(self, window, name):
+        """Recuperar una distribución desde un atajo o un menú, avisando si no existe."""
+        try:
+            changed = self.recall(name)
+        except sqlite3.Error as e:
+            QMessageBox.warning(window, "Error", f"No se pudo leer la distribución: {e}")
+            return
+        if changed is None:
+            QMessageBox.information(window, "Distribuciones", f"No existe la distribución '{name}'.")
+        else:
+            window.statusBar().showMessage(f"Distribución '{name}': {changed} pantallas cambiaron", 5000)
+
+    def recall_position(self, window, position):
+        """Recuperar la distribución que ocupa `position` en el orden alfabético."""
+        names = self.names()
+        if position < len(names):
+            self.recall_from(window, names[position])
+
+    def prompt_save(self, window):
+        """Pedir un nombre y guardar la pared."""
+        name, ok = QInputDialog.getText(window, "Guardar Distribución", "Nombre de la distribución:")
+        if not ok or not name.strip():
+            return
+        try:
+            self.save(name)
+        except sqlite3.Error as e:
+            QMessageBox.warning(window, "Error", f"No se pudo guardar la distribución: {e}")
+            return
+        window.statusBar().showMessage(f"Distribución '{name.strip()}' guardada", 5000)
+
+    def prompt_recall(self, window):
+        """Elegir una distribución guardada y recuperarla."""
+        names = self.names()
+        if not names:
+            QMessageBox.information(window, "Distribuciones", "No hay distribuciones guardadas.")
+            return
+        name, ok = QInputDialog.getItem(window, "Recuperar Distribución", "Distribución:", names, 0, False)
+        if ok:
+            self.recall_from(window, name)
+
+    def prompt_delete(self, window):
+        """Elegir una distribución guardada y borrarla."""
+        names = self.names()
+        if not names:
+            QMessageBox.information(window, "Distribuciones", "No hay distribuciones guardadas.")
+            return
+        name, ok = QInputDialog.getItem(window, "Borrar Distribución", "Distribución:", names, 0, False)
+        if ok:
+            try:
+                self.delete(name)
+            except sqlite3.Error as e:
+                QMessageBox.warning(window, "Error", f"No se pudo borrar la distribución: {e}")
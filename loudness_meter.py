@@ -0,0 +1,578 @@
+"""Medición de sonoridad EBU R128 / ITU-R BS.1770 de cada pantalla.
+
+Uso:
+    python loudness_meter.py --self-test    Comprobar el medidor con señales de referencia (EBU Tech 3341/3342)
+
+El audio de las pantallas se procesa en bloques fijos de 100 ms en un hilo
+aparte (o en el proceso de decodificación de la pantalla) y todas las
+pantallas se calculan a la vez con NumPy:
+
+- Ponderación K: el filtro de dos etapas de BS.1770 se aplica en frecuencia
+  (|H|² sobre la FFT de cada bloque), lo que da la energía filtrada del bloque
+  sin recorrer las muestras una a una.
+- Sonoridad momentánea (400 ms), de corto plazo (3 s) e integrada con las
+  compuertas absoluta (-70 LUFS) y relativa (-10 LU).
+- Rango de sonoridad (LRA) según EBU Tech 3342.
+- Pico real con sobremuestreo x4 (interpolador polifásico de 12 coeficientes por fase).
+
+La integrada y el LRA se calculan sobre histogramas de 0,1 LU, así la memoria
+por pantalla es fija aunque el programa dure días.
+"""
+import argparse
+import sys
+import threading
+import time
+import numpy as np
+from PyQt5.QtCore import QObject, QTimer, QCoreApplication
+from audio_meter import SAMPLE_RATE, CHANNELS
+from alarm_bus import get_alarm_bus, SEVERITY_WARNING
+
+# Duración de cada bloque de proceso; las ventanas de medida son múltiplos de él
+HOP_SECONDS = 0.1
+MOMENTARY_HOPS = 4      # 400 ms
+SHORT_TERM_HOPS = 30    # 3 s
+# Compuertas de BS.1770 (integrada) y de EBU Tech 3342 (rango de sonoridad)
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+RANGE_RELATIVE_GATE = -20.0
+RANGE_PERCENTILES = (0.10, 0.95)
+# Histogramas de sonoridad: de la compuerta absoluta a +10 LUFS en pasos de 0,1 LU
+HISTOGRAM_STEP = 0.1
+HISTOGRAM_BINS = int(round((10.0 - ABSOLUTE_GATE) / HISTOGRAM_STEP))
+HISTOGRAM_CENTERS = ABSOLUTE_GATE + HISTOGRAM_STEP * (np.arange(HISTOGRAM_BINS) + 0.5)
+# Pico real: sobremuestreo x4 con un interpolador de 12 coeficientes por fase
+OVERSAMPLING = 4
+INTERPOLATION_TAPS = 12
+# Por debajo de este pico de muestra no se sobremuestrea (se informa el pico de muestra)
+TRUE_PEAK_FLOOR_DB = -20.0
+# Bloques que se procesan como máximo por pantalla en cada pasada (el búfer de audio guarda 1 s)
+MAX_HOPS_PER_PUMP = 10
+
+# Valores por defecto (se pueden cambiar en multiviewer_config.json bajo la clave "loudness")
+DEFAULT_LOUDNESS_SETTINGS = {
+    "enabled": True,
+    "overlay": True,          # Mostrar la sonoridad en cada pantalla
+    "target": -23.0,          # Objetivo de sonoridad integrada (EBU R128)
+    "high_lufs": -18.0,       # Alarma si la de corto plazo supera este valor (None = desactivada)
+    "silence_lufs": None,     # Alarma si la de corto plazo queda por debajo (None = desactivada;
+                              # el silencio ya lo vigila el planificador de medición por pico)
+    "true_peak_max": -1.0,    # Alarma si el pico real de los últimos 3 s supera este valor (dBTP)
+    "hold": 10.0,             # Segundos que debe durar la condición de sonoridad antes de alarmar
+}
+# Periodo con que se publican las mediciones en las pantallas
+RESULT_MS = 500
+
+ALARM_LOUDNESS_HIGH = "loudness_high"
+ALARM_LOUDNESS_SILENCE = "loudness_silence"
+ALARM_TRUE_PEAK = "true_peak"
+
+_monitor = None
+
+
+def get_loudness_monitor():
+    """Obtener el medidor de sonoridad único de la aplicación."""
+    global _monitor
+    if _monitor is None:
+        _monitor = LoudnessMonitor(parent=QCoreApplication.instance())
+    return _monitor
+
+
+def power_to_lufs(power):
+    """Sonoridad (LUFS) de una energía media ponderada K."""
+    return -0.691 + 10.0 * np.log10(np.maximum(power, 1e-12))
+
+
+def k_weighting_coefficients(sample_rate=SAMPLE_RATE):
+    """Coeficientes (b, a) de las dos etapas de la ponderación K para una frecuencia de muestreo.
+
+    Primera etapa: estante de agudos (+4 dB); segunda: paso alto RLB. Con 48 kHz
+    coinciden con los valores publicados en BS.1770.
+    """
+    # Estante de agudos
+    gain, q, frequency = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    k = np.tan(np.pi * frequency / sample_rate)
+    vh = 10.0 ** (gain / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf = ((np.array([vh + vb * k / q + k * k, 2.0 * (k * k - vh), vh - vb * k / q + k * k]) / a0),
+             np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]))
+    # Paso alto
+    q, frequency = 0.5003270373238773, 38.13547087602444
+    k = np.tan(np.pi * frequency / sample_rate)
+    a0 = 1.0 + k / q + k * k
+    highpass = (np.array([1.0, -2.0, 1.0]),
+                np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]))
+    return shelf, highpass
+
+
+def k_weighting_power(size, sample_rate=SAMPLE_RATE):
+    """Pesos por bin de rfft que convierten |X|² de un bloque de `size` muestras en su energía media ponderada K."""
+    z = np.exp(-1j * 2.0 * np.pi * np.fft.rfftfreq(size))  # z^-1 en cada bin
+    response = np.ones(len(z))
+    for b, a in k_weighting_coefficients(sample_rate):
+        h = (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+        response *= np.abs(h) ** 2
+    # Parseval con la mitad del espectro: los bins intermedios cuentan dos veces
+    response[1:(size + 1) // 2] *= 2.0
+    return response / (size * size)
+
+
+def interpolation_taps():
+    """Coeficientes (taps, fases) del interpolador x4 y la ganancia máxima de sus fases.
+
+    Cada columna estima la señal entre la 6.ª y la 7.ª muestra de una ventana
+    de 12, a 1/4, 2/4 y 3/4 del intervalo (seno cardinal con ventana de Kaiser).
+    """
+    half = INTERPOLATION_TAPS // 2
+    fractions = np.arange(1, OVERSAMPLING) / OVERSAMPLING
+    t = np.arange(INTERPOLATION_TAPS)[:, None] - (half - 1) - fractions[None, :]
+    window = np.i0(5.0 * np.sqrt(np.clip(1.0 - (t / half) ** 2, 0.0, None))) / np.i0(5.0)
+    taps = np.sinc(t) * window
+    taps /= taps.sum(axis=0)
+    return taps.astype(np.float32), float(np.abs(taps).sum(axis=0).max())
+
+
+def gated_mean(counts, energy, relative_gate):
+    """Energía media de los bloques que pasan la compuerta relativa, y la máscara de bins que la pasan."""
+    total = counts.sum()
+    if not total:
+        return None, None
+    threshold = power_to_lufs(energy.sum() / total) + relative_gate
+    keep = HISTOGRAM_CENTERS > threshold
+    kept = counts[keep].sum()
+    if not kept:
+        return None, None
+    return energy[keep].sum() / kept, keep
+
+
+class LoudnessEngine:
+    """Estado y cálculo de sonoridad de varias pantallas, cada una en una plaza.
+
+    `process` recibe un bloque de 100 ms de cada plaza en un único arreglo y
+    actualiza todas a la vez; `pump` lee esos bloques de los AudioTap. Los
+    búferes se reservan al crear el motor (y crecen al doble si faltan plazas).
+    """
+    def __init__(self, capacity=8, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.hop = int(round(sample_rate * HOP_SECONDS))
+        self.power_weights = k_weighting_power(self.hop, sample_rate)
+        self.channel_weights = np.ones(channels)  # Estéreo: izquierdo y derecho pesan 1
+        self.taps, self.taps_gain = interpolation_taps()
+        self.tail_size = INTERPOLATION_TAPS - 1
+        self.true_peak_floor = 10.0 ** (TRUE_PEAK_FLOOR_DB / 20.0)
+        self.capacity = 0
+        self.free = []
+        # Búferes de lote: bloques leídos, bloques por canal con la cola del anterior y
+        # dos filas de trabajo por canal para la interpolación
+        self.batch = np.zeros((0, self.hop, channels), dtype=np.float32)
+        self.extended = np.zeros((0, channels, self.tail_size + self.hop), dtype=np.float32)
+        self.work = np.zeros((2, 0, self.hop), dtype=np.float32)
+        # Estado por plaza: bloques procesados y posición de lectura en el AudioTap
+        self.hops = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros(0, dtype=np.int64)
+        # Últimos 3 s: energía y pico real de cada bloque (anillo indexado por hops % 30)
+        self.hop_power = np.zeros((0, SHORT_TERM_HOPS))
+        self.hop_peak = np.zeros((0, SHORT_TERM_HOPS))
+        self.true_peak_max = np.zeros(0)
+        # Últimas muestras del bloque anterior, para interpolar a través del borde
+        self.tail = np.zeros((0, channels, self.tail_size), dtype=np.float32)
+        # Histogramas (cantidad y energía) de los bloques de 400 ms y de los valores de corto plazo
+        self.block_counts = np.zeros((0, HISTOGRAM_BINS))
+        self.block_energy = np.zeros((0, HISTOGRAM_BINS))
+        self.short_counts = np.zeros((0, HISTOGRAM_BINS))
+        self.short_energy = np.zeros((0, HISTOGRAM_BINS))
+        self.grow(capacity)
+
+    def state_arrays(self):
+        return ("hops", "positions", "hop_power", "hop_peak", "true_peak_max", "tail",
+                "block_counts", "block_energy", "short_counts", "short_energy")
+
+    def grow(self, capacity):
+        """Ampliar las plazas conservando el estado de las que ya están en uso."""
+        for name in self.state_arrays():
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def add(self, position=0):
+        """Ocupar una plaza para una pantalla que empieza a leer su audio en `position`."""
+        if not self.free:
+            self.grow(2 * self.capacity)
+        slot = self.free.pop()
+        self.reset(slot, position)
+        return slot
+
+    def remove(self, slot):
+        self.free.append(slot)
+
+    def reset(self, slot, position=0):
+        """Empezar la medición de una plaza desde cero (programa nuevo)."""
+        for name in self.state_arrays():
+            getattr(self, name)[slot] = 0
+        self.positions[slot] = position
+
+    def ensure_batch(self, count):
+        """Agrandar los búferes de lote si se procesan más plazas que espacio."""
+        if len(self.batch) < count:
+            size = max(count, 2 * len(self.batch), 8)
+            self.batch = np.zeros((size, self.hop, self.channels), dtype=np.float32)
+            self.extended = np.zeros((size, self.channels, self.tail_size + self.hop), dtype=np.float32)
+            self.work = np.zeros((2, size * self.channels, self.hop), dtype=np.float32)
+
+    def pump(self, sources):
+        """Procesar todo el audio completo pendiente de `sources` (lista de (plaza, AudioTap))."""
+        self.ensure_batch(len(sources))
+        for _ in range(MAX_HOPS_PER_PUMP):
+            slots = []
+            for slot, tap in sources:
+                position = tap.read_block(int(self.positions[slot]), self.batch[len(slots)])
+                if position is not None:
+                    self.positions[slot] = position
+                    slots.append(slot)
+            if not slots:
+                return
+            self.process(slots, self.batch[:len(slots)])
+
+    def process(self, slots, blocks):
+        """Incorporar un bloque de 100 ms (plazas, muestras, canales) de cada plaza de `slots`."""
+        slots = np.asarray(slots, dtype=np.intp)
+        # Cada canal en una fila contigua, detrás de las últimas muestras del bloque anterior
+        self.ensure_batch(len(slots))
+        extended = self.extended[:len(slots)]
+        extended[:, :, :self.tail_size] = self.tail[slots]
+        extended[:, :, self.tail_size:] = blocks.transpose(0, 2, 1)
+        self.tail[slots] = extended[:, :, -self.tail_size:]
+
+        # Energía ponderada K de cada bloque, sumada sobre los canales con su peso
+        spectrum = np.fft.rfft(extended[:, :, self.tail_size:], axis=2)
+        power = np.square(spectrum.real) + np.square(spectrum.imag)
+        block_power = (power @ self.power_weights) @ self.channel_weights
+        index = self.hops[slots] % SHORT_TERM_HOPS
+        self.hop_power[slots, index] = block_power
+        peak = self.true_peak(extended)
+        self.hop_peak[slots, index] = peak
+        np.maximum(self.true_peak_max[slots], peak, out=peak)
+        self.true_peak_max[slots] = peak
+        self.hops[slots] += 1
+
+        # Bloques de compuerta (400 ms, solapados 75 %) y valores de corto plazo para el LRA
+        hops = self.hops[slots]
+        recent = (hops[:, None] - 1 - np.arange(MOMENTARY_HOPS)) % SHORT_TERM_HOPS
+        momentary = self.hop_power[slots[:, None], recent].mean(axis=1)
+        self.accumulate(slots, hops >= MOMENTARY_HOPS, momentary, self.block_counts, self.block_energy)
+        short_term = self.hop_power[slots].mean(axis=1)
+        self.accumulate(slots, hops >= SHORT_TERM_HOPS, short_term, self.short_counts, self.short_energy)
+
+    @staticmethod
+    def accumulate(slots, ready, power, counts, energy):
+        """Añadir al histograma de cada plaza los valores que pasan la compuerta absoluta."""
+        loudness = power_to_lufs(power)
+        ready &= loudness > ABSOLUTE_GATE
+        if not ready.any():
+            return
+        bins = np.minimum(((loudness[ready] - ABSOLUTE_GATE) / HISTOGRAM_STEP).astype(np.intp),
+                          HISTOGRAM_BINS - 1)
+        np.add.at(counts, (slots[ready], bins), 1.0)
+        np.add.at(energy, (slots[ready], bins), power[ready])
+
+    def true_peak(self, extended):
+        """Pico real (lineal) de cada bloque con sobremuestreo x4.
+
+        Cada bloque se interpola junto con las últimas muestras del anterior,
+        así cada intervalo entre muestras se evalúa una sola vez. Los canales
+        cuyo pico de muestra no puede acercarse a TRUE_PEAK_FLOOR_DB se saltan.
+        """
+        rows = extended.reshape(-1, extended.shape[2])
+        peaks = np.maximum(rows.max(axis=1), -rows.min(axis=1))
+        loud = peaks * self.taps_gain >= self.true_peak_floor
+        if loud.all():
+            peaks = np.maximum(peaks, self.interpolated_peak(rows))
+        elif loud.any():
+            peaks[loud] = np.maximum(peaks[loud], self.interpolated_peak(rows[loud]))
+        return peaks.reshape(len(extended), -1).max(axis=1).astype(np.float64)
+
+    def interpolated_peak(self, rows):
+        """Máximo absoluto de las muestras interpoladas de cada fila (sumas desplazadas en el lugar)."""
+        size = self.hop
+        total, term = self.work[0, :len(rows)], self.work[1, :len(rows)]
+        peaks = np.zeros(len(rows), dtype=np.float32)
+        for phase in self.taps.T:
+            np.multiply(rows[:, :size], phase[0], out=total)
+            for shift in range(1, INTERPOLATION_TAPS):
+                np.multiply(rows[:, shift:shift + size], phase[shift], out=term)
+                total += term
+            np.abs(total, out=total)
+            np.maximum(peaks, total.max(axis=1), out=peaks)
+        return peaks
+
+    def results(self, slot):
+        """Mediciones de una plaza (None en lo que aún no tiene datos suficientes)."""
+        hops = int(self.hops[slot])
+        if not hops:
+            return {"momentary": None, "short_term": None, "integrated": None,
+                    "loudness_range": None, "true_peak": None, "true_peak_max": None}
+        recent = (hops - 1 - np.arange(MOMENTARY_HOPS)) % SHORT_TERM_HOPS
+        momentary = (float(power_to_lufs(self.hop_power[slot, recent].mean()))
+                     if hops >= MOMENTARY_HOPS else None)
+        short_term = (float(power_to_lufs(self.hop_power[slot].mean()))
+                      if hops >= SHORT_TERM_HOPS else None)
+        window = self.hop_peak[slot, :min(hops, SHORT_TERM_HOPS)].max()
+        integrated, _ = gated_mean(self.block_counts[slot], self.block_energy[slot], RELATIVE_GATE)
+        return {
+            "momentary": momentary,
+            "short_term": short_term,
+            "integrated": None if integrated is None else float(power_to_lufs(integrated)),
+            "loudness_range": self.loudness_range(slot),
+            "true_peak": float(20.0 * np.log10(max(window, 1e-6))),
+            "true_peak_max": float(20.0 * np.log10(max(self.true_peak_max[slot], 1e-6))),
+        }
+
+    def loudness_range(self, slot):
+        """LRA: distancia entre los percentiles 10 y 95 de la sonoridad de corto plazo con compuerta."""
+        counts = self.short_counts[slot]
+        _, keep = gated_mean(counts, self.short_energy[slot], RANGE_RELATIVE_GATE)
+        if keep is None:
+            return None
+        cumulative = np.cumsum(counts * keep)
+        last = cumulative[-1] - 1
+        low, high = (HISTOGRAM_CENTERS[np.searchsorted(cumulative, round(last * percentile), side="right")]
+                     for percentile in RANGE_PERCENTILES)
+        return float(high - low)
+
+
+class LoudnessMonitor(QObject):
+    """Mide la sonoridad de las pantallas locales en un hilo y publica resultados y alarmas.
+
+    El hilo lee los AudioTap cada 50 ms y procesa los bloques completos; un
+    temporizador de la interfaz muestra los resultados y evalúa las alarmas.
+    Las pantallas de un proceso de decodificación reciben la medición ya
+    calculada con sus métricas y la entregan con `apply`.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.settings = dict(DEFAULT_LOUDNESS_SETTINGS)
+        self.engine = LoudnessEngine()
+        self.lock = threading.Lock()  # Protege el motor y las plazas
+        self.slots = {}  # pantalla -> plaza del motor
+        self.latest = {}  # pantalla -> últimas mediciones (lo reemplaza el hilo)
+        self.since = {}  # (pantalla, alarma) -> instante en que empezó la condición
+        self.raised = set()  # (pantalla, alarma) publicadas en el bus
+        self.thread = None
+        self.stopping = threading.Event()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(RESULT_MS)
+        self.timer.timeout.connect(self.publish)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close)
+
+    def configure(self, settings):
+        """Aplicar la configuración sobre los valores por defecto."""
+        self.settings.update(settings or {})
+
+    def register(self, tile):
+        """Empezar a medir una pantalla local desde el audio que llegue a partir de ahora."""
+        if not self.settings["enabled"] or tile.audio_meter is None:
+            return
+        tap = tile.audio_meter.tap
+        with self.lock:
+            slot = self.slots.get(tile)
+            if slot is None:
+                self.slots[tile] = self.engine.add(tap.write_pos)
+            else:
+                self.engine.reset(slot, tap.write_pos)
+        if self.thread is None:
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self.run, name="loudness", daemon=True)
+            self.thread.start()
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def unregister(self, tile):
+        """Dejar de medir una pantalla (al pausar, detener o cerrar) y retirar sus alarmas."""
+        with self.lock:
+            slot = self.slots.pop(tile, None)
+            if slot is not None:
+                self.engine.remove(slot)
+        self.latest.pop(tile, None)
+        for kind in (ALARM_LOUDNESS_HIGH, ALARM_LOUDNESS_SILENCE, ALARM_TRUE_PEAK):
+            self.set_alarm(tile, kind, False, 0.0)
+        tile.show_loudness(None, False)
+        if not self.slots:
+            self.timer.stop()
+
+    def run(self):
+        """Bucle del hilo de medición."""
+        last_results = 0.0
+        while not self.stopping.wait(HOP_SECONDS / 2.0):
+            with self.lock:
+                sources = [(slot, tile.audio_meter.tap) for tile, slot in self.slots.items()]
+                self.engine.pump(sources)
+                now = time.monotonic()
+                if now - last_results >= RESULT_MS / 1000.0:
+                    last_results = now
+                    self.latest = {tile: self.engine.results(slot) for tile, slot in self.slots.items()}
+
+    def publish(self):
+        """Mostrar las últimas mediciones del hilo en sus pantallas (hilo de la interfaz)."""
+        for tile, result in list(self.latest.items()):
+            if tile in self.slots:
+                self.apply(tile, result)
+
+    def apply(self, tile, result, now=None):
+        """Evaluar las alarmas de una medición y mostrarla en la pantalla."""
+        now = time.monotonic() if now is None else now
+        settings = self.settings
+        short_term = result["short_term"]
+        high, silence = settings["high_lufs"], settings["silence_lufs"]
+        over = high is not None and short_term is not None and short_term > high
+        quiet = silence is not None and short_term is not None and short_term < silence
+        peak = result["true_peak"] is not None and result["true_peak"] > settings["true_peak_max"]
+        self.set_alarm(tile, ALARM_LOUDNESS_HIGH, over, now, settings["hold"],
+                       f"Sonoridad por encima de {high:g} LUFS" if high is not None else "")
+        self.set_alarm(tile, ALARM_LOUDNESS_SILENCE, quiet, now, settings["hold"],
+                       f"Sonoridad por debajo de {silence:g} LUFS" if silence is not None else "")
+        self.set_alarm(tile, ALARM_TRUE_PEAK, peak, now, 0.0,
+                       f"Pico real por encima de {settings['true_peak_max']:g} dBTP")
+        if settings["overlay"]:
+            tile.show_loudness(result, over or peak)
+
+    def set_alarm(self, tile, kind, active, now, hold=0.0, message=""):
+        """Publicar la alarma si la condición dura `hold` segundos; retirarla en cuanto deja de cumplirse."""
+        key = (tile, kind)
+        if not active:
+            self.since.pop(key, None)
+            if key in self.raised:
+                self.raised.discard(key)
+                get_alarm_bus().clear_alarm(tile.alarm_source, kind)
+            return
+        since = self.since.setdefault(key, now)
+        if key not in self.raised and now - since >= hold:
+            self.raised.add(key)
+            get_alarm_bus().raise_alarm(tile.alarm_source, kind, SEVERITY_WARNING, message,
+                                        tile.alarm_label())
+
+    def close(self):
+        """Detener el hilo de medición."""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+
+def format_loudness(value, unit="LUFS"):
+    """Texto de una medición (guion si aún no hay datos o está por debajo de la compuerta)."""
+    if value is None or (unit != "LU" and value <= ABSOLUTE_GATE):
+        return "—"
+    return f"{value:.1f}"
+
+
+def sine(frequency, dbfs, seconds, phase=0.0, sample_rate=SAMPLE_RATE):
+    """Seno estéreo de referencia con amplitud de pico `dbfs`."""
+    t = np.arange(int(round(seconds * sample_rate))) / sample_rate
+    mono = 10.0 ** (dbfs / 20.0) * np.sin(2.0 * np.pi * frequency * t + phase)
+    return np.repeat(mono[:, None], CHANNELS, axis=1).astype(np.float32)
+
+
+def measure(*parts):
+    """Medir una señal de referencia (la concatenación de `parts`) en una plaza nueva."""
+    engine = LoudnessEngine(capacity=1)
+    signal = np.concatenate(parts)
+    slot = engine.add()
+    for start in range(0, len(signal) - engine.hop + 1, engine.hop):
+        engine.process([slot], signal[None, start:start + engine.hop])
+    return engine.results(slot)
+
+
+def self_test():
+    """Comprobar el medidor con las señales de EBU Tech 3341/3342 y medir su costo."""
+    def check(name, value, expected, low, high=None):
+        high = low if high is None else high
+        ok = value is not None and expected - low <= value <= expected + high
+        print(f"{'OK   ' if ok else 'FALLO'} {name}: {value if value is None else round(value, 2)} "
+              f"(esperado {expected:g} -{low:g}/+{high:g})")
+        return ok
+
+    passed = True
+    # 3341 casos 1 y 2: seno de 1 kHz a -23 y -33 dBFS
+    for level in (-23.0, -33.0):
+        result = measure(sine(1000.0, level, 20.0))
+        for key in ("momentary", "short_term", "integrated"):
+            passed &= check(f"1 kHz a {level:g} dBFS, {key}", result[key], level, 0.1)
+    # 3341 casos 3 y 4: compuertas relativa y absoluta
+    result = measure(sine(1000.0, -36.0, 10.0), sine(1000.0, -23.0, 60.0), sine(1000.0, -36.0, 10.0))
+    passed &= check("Compuerta relativa, integrated", result["integrated"], -23.0, 0.1)
+    result = measure(sine(1000.0, -72.0, 10.0), sine(1000.0, -36.0, 10.0), sine(1000.0, -23.0, 60.0),
+                     sine(1000.0, -36.0, 10.0), sine(1000.0, -72.0, 10.0))
+    passed &= check("Compuerta absoluta, integrated", result["integrated"], -23.0, 0.1)
+    # 3342 casos 1 y 2: rango de sonoridad
+    result = measure(sine(1000.0, -20.0, 20.0), sine(1000.0, -30.0, 20.0))
+    passed &= check("LRA -20/-30 dBFS", result["loudness_range"], 10.0, 1.0)
+    result = measure(sine(1000.0, -20.0, 20.0), sine(1000.0, -15.0, 20.0))
+    passed &= check("LRA -20/-15 dBFS", result["loudness_range"], 5.0, 1.0)
+    # 3341 caso 15: seno de fs/4 desfasado 45°: las muestras quedan 3 dB por debajo del pico real
+    result = measure(sine(SAMPLE_RATE / 4.0, -6.0, 5.0, phase=np.pi / 4.0))
+    passed &= check("Pico real fs/4 a -6 dBFS", result["true_peak_max"], -6.0, 0.4, 0.2)
+    result = measure(sine(997.0, -1.0, 5.0, phase=0.3))
+    passed &= check("Pico real 997 Hz a -1 dBFS", result["true_peak_max"], -1.0, 0.4, 0.2)
+    # La ponderación K elimina la componente continua
+    dc = np.full((SAMPLE_RATE * 5, CHANNELS), 0.5, dtype=np.float32)
+    result = measure(dc)
+    ok = result["integrated"] is None
+    print(f"{'OK   ' if ok else 'FALLO'} Continua: sin sonoridad integrada")
+    passed &= ok
+
+    # Lectura desde el búfer de audio en bloques fijos, como en la aplicación
+    from audio_meter import AudioTap
+
+    class Player:
+        def __getattr__(self, name):
+            return lambda *args: None
+
+    tap = AudioTap(Player())
+    engine = LoudnessEngine(capacity=1)
+    slot = engine.add(tap.write_pos)
+    signal = sine(1000.0, -23.0, 10.0)
+    for start in range(0, len(signal), 1024):  # Entregas de libvlc de tamaño arbitrario
+        tap.write(signal[start:start + 1024])
+        engine.pump([(slot, tap)])
+    ok = engine.hops[slot] == len(signal) // engine.hop
+    passed &= ok and check("Desde AudioTap, integrated", engine.results(slot)["integrated"], -23.0, 0.1)
+
+    # Costo: 75 pantallas estéreo con ruido a -20 dBFS (el peor caso: todas sobremuestrean)
+    tiles, seconds = 75, 10.0
+    engine = LoudnessEngine(capacity=tiles)
+    slots = [engine.add() for _ in range(tiles)]
+    noise = (np.random.default_rng(1).standard_normal((tiles, engine.hop, CHANNELS)) * 0.1).astype(np.float32)
+    hops = int(seconds / HOP_SECONDS)
+    started = time.perf_counter()
+    for _ in range(hops):
+        engine.process(slots, noise)
+    for slot in slots:
+        engine.results(slot)
+    elapsed = time.perf_counter() - started
+    print(f"{tiles} pantallas estéreo: {elapsed / hops * 1000.0:.1f} ms por bloque de 100 ms "
+          f"({elapsed / seconds:.0%} de un núcleo)")
+    passed &= elapsed < seconds
+
+    print("Prueba del medidor de sonoridad " + ("correcta" if passed else "FALLIDA"))
+    return 0 if passed else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Medidor de sonoridad EBU R128 del MultiViewer")
+    parser.add_argument("--self-test", action="store_true", help="comprobar con señales de referencia")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return self_test()
+    parser.print_help()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
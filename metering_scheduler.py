@@ -0,0 +1,139 @@
+import time
+import numpy as np
+from PyQt5.QtCore import QObject, QTimer, QCoreApplication
+from audio_meter import (FFT_SIZE, SPECTRUM_BANDS, SAMPLE_RATE, CHANNELS, SILENCE_DB,
+                         compute_levels, compute_spectrum, db_to_meter, spectrum_band_edges)
+from frame_probe import FrameSampler
+from alarm_bus import get_alarm_bus, SEVERITY_WARNING
+
+# Periodo del tick de medición
+TICK_MS = 100
+# Las pantallas ocultas o minimizadas se actualizan una vez cada N ticks
+HIDDEN_TICK_DIVISOR = 10
+# Cada cuántos ticks se comprueba si algún stream se ha bloqueado
+STALL_CHECK_TICKS = 10
+# Nivel (0-100) a partir del cual la barra se muestra en alarma
+LEVEL_ALARM = 95
+# Segundos seguidos por debajo del rango del medidor antes de alarmar por silencio
+SILENCE_HOLD = 10.0
+ALARM_AUDIO_SILENCE = "audio_silence"
+
+_scheduler = None
+
+
+def get_metering_scheduler():
+    """Obtener el planificador de medición único de la aplicación."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = MeteringScheduler(parent=QCoreApplication.instance())
+    return _scheduler
+
+
+def is_tile_hidden(tile):
+    """Indica si la pantalla no se ve: fuera del área de scroll, oculta o minimizada."""
+    return (not tile.isVisible() or tile.window().isMinimized()
+            or tile.visibleRegion().isEmpty())
+
+
+class MeteringScheduler(QObject):
+    """Temporizador único que calcula los niveles de todas las pantallas en lote.
+
+    En cada tick se copian las ventanas de audio de las pantallas activas en un
+    único arreglo, se calculan pico y espectro con una sola pasada de NumPy y
+    solo se actualizan los widgets cuyo valor o estado de alarma cambió.
+    """
+    def __init__(self, interval_ms=TICK_MS, parent=None):
+        super().__init__(parent)
+        self.tiles = []
+        self.tick_count = 0
+        self.silence_since = {}  # pantalla -> instante en que empezó el silencio
+        self.silent = set()  # pantallas con alarma de silencio publicada
+        # Capturas de imagen para detectar negro, congelado y falta de señal
+        self.frame_sampler = FrameSampler(self)
+
+        # Búferes reutilizados entre ticks (crecen si hay más pantallas)
+        self.batch = np.zeros((0, FFT_SIZE, CHANNELS), dtype=np.float32)
+        self.window = np.hanning(FFT_SIZE).astype(np.float32)
+        self.band_edges = spectrum_band_edges(FFT_SIZE, SPECTRUM_BANDS, SAMPLE_RATE)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.tick)
+
+    def register(self, tile):
+        """Empezar a medir una pantalla (al reproducir)."""
+        if tile not in self.tiles:
+            self.tiles.append(tile)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def unregister(self, tile):
+        """Dejar de medir una pantalla (al pausar, detener o cerrar)."""
+        if tile in self.tiles:
+            self.tiles.remove(tile)
+        self.silence_since.pop(tile, None)
+        self.silent.discard(tile)
+        if not self.tiles:
+            self.timer.stop()
+
+    def ensure_capacity(self, count):
+        """Agrandar el búfer de lote si hay más pantallas que espacio."""
+        if len(self.batch) < count:
+            size = max(count, 2 * len(self.batch), 8)
+            self.batch = np.zeros((size, FFT_SIZE, CHANNELS), dtype=np.float32)
+
+    def tick(self):
+        """Calcular y publicar los niveles de todas las pantallas que tocan en este tick."""
+        self.tick_count += 1
+        throttled_tick = self.tick_count % HIDDEN_TICK_DIVISOR == 0
+        due = []
+        for tile in list(self.tiles):
+            # Las pantallas de un proceso de decodificación reciben sus niveles de él
+            if tile.audio_meter is None:
+                continue
+            hidden = is_tile_hidden(tile)
+            if hidden and not throttled_tick:
+                continue
+            due.append((tile, hidden))
+
+        if due:
+            self.ensure_capacity(len(due))
+            batch = self.batch[:len(due)]
+            fresh = np.array([tile.audio_meter.snapshot(frames)
+                              for (tile, _), frames in zip(due, batch)])
+            peak_db, _ = compute_levels(batch)
+            spectra = compute_spectrum(batch, self.window, self.band_edges)
+            # Sin audio nuevo el medidor cae a cero
+            peak_db = np.where(fresh, peak_db, SILENCE_DB)
+            spectra[~fresh] = 0.0
+            levels = db_to_meter(peak_db).astype(int)
+            now = time.monotonic()
+            for (tile, hidden), level, spectrum in zip(due, levels, spectra):
+                tile.apply_audio_levels(int(level), bool(level > LEVEL_ALARM),
+                                        None if hidden else spectrum)
+                self.check_silence(tile, level, now)
+
+        # Sin imagen decodificada (fuera de vista) no hay nada que analizar
+        self.frame_sampler.schedule([tile for tile in self.tiles
+                                     if tile.frame_probe is not None and not tile.video_suspended])
+
+        # Vigilar una vez por segundo que los streams sigan avanzando
+        if self.tick_count % STALL_CHECK_TICKS == 0:
+            now = time.monotonic()
+            for tile in list(self.tiles):
+                tile.reconnect.check_stall(now)
+
+    def check_silence(self, tile, level, now):
+        """Publicar o retirar la alarma de silencio de una pantalla."""
+        bus = get_alarm_bus()
+        if level > 0:
+            self.silence_since.pop(tile, None)
+            if tile in self.silent:
+                self.silent.discard(tile)
+                bus.clear_alarm(tile.alarm_source, ALARM_AUDIO_SILENCE)
+            return
+        since = self.silence_since.setdefault(tile, now)
+        if tile not in self.silent and now - since >= SILENCE_HOLD:
+            self.silent.add(tile)
+            bus.raise_alarm(tile.alarm_source, ALARM_AUDIO_SILENCE, SEVERITY_WARNING,
+                            "Audio en silencio", tile.alarm_label())
@@ -0,0 +1,758 @@
+"""Servidor de mosaico para el cliente web (html/): miniaturas por fuente y mosaico compuesto.
+
+Uso:
+    python mosaic_server.py [--urls urls.json] [--playlist lista.m3u8 ...] [URL ...]
+                            [--host 127.0.0.1] [--port 8090] [--width 320] [--fps 2]
+                            [--quality 70] [--format jpeg|webp]
+    python mosaic_server.py --self-test
+
+Cada fuente (las de la pared, de las listas indicadas y de la línea de
+comandos, sin repetir) se abre una sola vez en un reproductor de libvlc sin
+ventana ni audio que entrega unos pocos cuadros por segundo ya reducidos a un
+búfer en memoria. Un hilo codifica solo los cuadros nuevos, una vez, y todos
+los navegadores reciben esa misma miniatura: diez operadores cuestan aguas
+arriba lo mismo que uno y ningún navegador decodifica quince streams HLS.
+
+    GET /                        El cliente web (html/)
+    GET /api/sources             Fuentes (id, nombre, URL, tamaño, segundos desde el último cuadro)
+    GET /thumb/<id>              Última miniatura (con ETag: 304 si no cambió)
+    GET /mjpeg/<id>?fps=2        Stream MJPEG de una fuente
+    GET /mjpeg/mosaic?columns=4  Mosaico compuesto de todas las fuentes (MJPEG)
+    GET /hls/...                 Proxy HLS con caché (ver hls_proxy): "live_url" de cada fuente
+    GET /ws                      WebSocket: el cliente envía {"subscribe": [ids], "fps": 2} y
+                                 recibe cada miniatura como mensaje binario
+                                 (1 byte de largo del id, el id y la imagen)
+
+Cada cliente recibe siempre el cuadro más reciente, nunca una cola: si su
+conexión no alcanza, su intervalo de envío se alarga solo y vuelve al pedido
+cuando se recupera. Los valores por defecto se leen de multiviewer_config.json
+bajo la clave "mosaic". Escucha solo en 127.0.0.1 salvo que se indique otro
+"host" (o --host): la lista de fuentes y el proxy HLS no piden autenticación.
+"""
+import argparse
+import asyncio
+import ctypes
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import threading
+import time
+import numpy as np
+import vlc
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt5.QtGui import QImage
+from channel_db import default_urls_file, read_state
+from control_server import (read_request, http_response, binary_response, websocket_accept, encode_frame,
+                            read_message, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG)
+from hls_proxy import DEFAULT_PROXY_SETTINGS, PROXY_PREFIX, HlsProxy, is_proxiable, proxy_path
+from playlist_import import iter_m3u, open_playlist
+from reconnect import backoff_delay
+from source_hub import normalize_url
+
+# Valores por defecto (se pueden cambiar en multiviewer_config.json bajo la clave "mosaic")
+DEFAULT_MOSAIC_SETTINGS = {
+    "host": "127.0.0.1",     # Solo esta máquina; "0.0.0.0" lo abre a la red (sin autenticación)
+    "port": 8090,
+    "width": 320,            # Ancho de las miniaturas (el alto sale de 16:9)
+    "fps": 2.0,              # Cuadros por segundo que entrega cada fuente y que se envían a cada cliente
+    "quality": 70,           # Calidad de compresión (0-100)
+    "format": "jpeg",        # "jpeg" o "webp"
+    "max_sources": 64,
+    "network_caching": 1000,
+}
+FORMAT_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+# Una fuente sin cuadros nuevos durante este tiempo se considera caída y se reabre
+STALE_SECONDS = 15.0
+# Intervalo máximo al que se frena a un cliente lento
+MAX_CLIENT_INTERVAL = 10.0
+# Bytes pendientes de envío a un cliente a partir de los cuales se espera a que los reciba
+CLIENT_WRITE_BUFFER = 32 * 1024
+# Columnas de mosaico distintas que se mantienen codificadas a la vez
+MAX_MOSAIC_LAYOUTS = 4
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html")
+
+
+def load_settings(section="mosaic", defaults=DEFAULT_MOSAIC_SETTINGS):
+    """Una sección de multiviewer_config.json sobre sus valores por defecto."""
+    settings = dict(defaults)
+    try:
+        with open("multiviewer_config.json", "r") as file:
+            settings.update(json.load(file).get(section) or {})
+    except (OSError, json.JSONDecodeError):
+        pass
+    return settings
+
+
+def source_id(url):
+    """Identificador corto y estable de una fuente (la misma URL da el mismo id entre reinicios)."""
+    return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()[:12]
+
+
+def collect_sources(urls_file=None, playlists=(), urls=()):
+    """Fuentes (URL, nombre) de la pared, de las listas y de la línea de comandos, sin repetir."""
+    sources = {}
+
+    def add(url, name):
+        url = url.strip()
+        if url and source_id(url) not in sources:
+            sources[source_id(url)] = (url, name)
+
+    if urls_file:
+        for _, window in sorted(read_state(urls_file).items()):
+            names = window.get("names", {})
+            for index, url in sorted(window.get("urls", {}).items(), key=lambda item: int(item[0])):
+                add(url, names.get(index, ""))
+    for playlist in playlists:
+        with open_playlist(playlist) as lines:
+            for channel in iter_m3u(lines):
+                add(channel.url, channel.name)
+    for url in urls:
+        add(url, "")
+    return list(sources.values())
+
+
+def encode_image(pixels, quality, image_format="jpeg"):
+    """Comprimir un cuadro (alto, ancho, 4) en BGRA como JPEG o WebP."""
+    height, width = pixels.shape[:2]
+    image = QImage(pixels.data, width, height, width * 4, QImage.Format_RGB32)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    if not image.save(buffer, image_format.upper(), int(quality)):
+        raise RuntimeError(f"No se pudo codificar la miniatura como {image_format}")
+    return bytes(data)
+
+
+class RatePacer:
+    """Intervalo de envío de un cliente: el pedido, o más largo mientras el cliente no alcanza a recibir."""
+    def __init__(self, interval):
+        self.requested = interval
+        self.interval = interval
+
+    def request(self, interval):
+        self.requested = interval
+        self.interval = max(self.interval, interval)
+
+    def sent(self, seconds):
+        """Registrar cuánto tardó en vaciarse un envío."""
+        if seconds > self.interval / 2.0:
+            # El enlace del cliente es el cuello de botella: enviarle la mitad de cuadros
+            self.interval = min(self.interval * 2.0, MAX_CLIENT_INTERVAL)
+        else:
+            self.interval = max(self.requested, self.interval * 0.8)
+
+
+class SourceFeed:
+    """Una fuente: reproductor de libvlc sin ventana que escribe cuadros reducidos en memoria.
+
+    libvlc escribe en `back` (callbacks de video en sus hilos) y al completar un
+    cuadro se copia a `front`, que es lo que se codifica y se compone en el
+    mosaico. El filtro fps limita los cuadros que llegan a la conversión.
+    """
+    def __init__(self, url, name, width, height):
+        self.id = source_id(url)
+        self.url = url
+        self.name = name
+        self.width = width
+        self.height = height
+        self.back = np.zeros((height, width, 4), dtype=np.uint8)
+        self.front = np.zeros((height, width, 4), dtype=np.uint8)
+        self.lock = threading.Lock()
+        self.frames = 0          # Cuadros recibidos
+        self.encoded_frames = 0  # Cuadros recibidos cuando se codificó la última miniatura
+        self.last_frame = None   # time.monotonic() del último cuadro
+        self.image = None        # Última miniatura codificada
+        self.seq = 0             # Cambia con cada miniatura nueva
+        self.player = None
+        self.attempt = 0
+        self.retry_at = 0.0
+
+        # Mantener referencias a los callbacks para que ctypes no los libere
+        self._lock_cb = vlc.CallbackDecorators.VideoLockCb(self._on_lock)
+        self._unlock_cb = vlc.CallbackDecorators.VideoUnlockCb(self._on_unlock)
+        self._display_cb = vlc.CallbackDecorators.VideoDisplayCb(self._on_display)
+
+    def open(self, instance, options, url=None):
+        """Crear el reproductor y empezar a recibir cuadros (de `url` si se indica, p. ej. el proxy HLS)."""
+        self.player = instance.media_player_new()
+        self.player.video_set_callbacks(self._lock_cb, self._unlock_cb, self._display_cb, None)
+        self.player.video_set_format("RV32", self.width, self.height, self.width * 4)
+        self.player.set_media(instance.media_new(url or self.url, *options))
+        self.player.play()
+        self.last_frame = time.monotonic()
+
+    def _on_lock(self, opaque, planes):
+        planes[0] = ctypes.c_void_p(self.back.ctypes.data)
+        return None
+
+    def _on_unlock(self, opaque, picture, planes):
+        pass
+
+    def _on_display(self, opaque, picture):
+        self.write(self.back)
+
+    def write(self, pixels):
+        """Publicar un cuadro completo (alto, ancho, 4) en BGRA."""
+        with self.lock:
+            np.copyto(self.front, pixels)
+            self.frames += 1
+            self.last_frame = time.monotonic()
+            self.attempt = 0
+
+    def take_new_frame(self, out):
+        """Copiar en `out` el último cuadro si llegó uno desde la última miniatura."""
+        with self.lock:
+            if self.frames == self.encoded_frames:
+                return False
+            self.encoded_frames = self.frames
+            np.copyto(out, self.front)
+            return True
+
+    def copy_into(self, out):
+        with self.lock:
+            np.copyto(out, self.front)
+
+    def age(self, now):
+        """Segundos desde el último cuadro (None si nunca llegó uno)."""
+        return None if self.last_frame is None or not self.frames else now - self.last_frame
+
+    def supervise(self, now):
+        """Reabrir la fuente si dejó de entregar cuadros, con retardo exponencial entre intentos."""
+        if self.player is None or self.last_frame is None or now - self.last_frame < STALE_SECONDS:
+            return
+        if now < self.retry_at:
+            return
+        self.retry_at = now + backoff_delay(self.attempt)
+        self.attempt += 1
+        self.player.stop()
+        self.player.play()
+
+    def close(self):
+        if self.player is not None:
+            self.player.stop()
+            self.player.release()
+            self.player = None
+
+    def describe(self, now):
+        age = self.age(now)
+        return {"id": self.id, "name": self.name, "url": self.url, "width": self.width,
+                "height": self.height, "age": None if age is None else round(age, 1),
+                "live": age is not None and age < STALE_SECONDS}
+
+
+class MosaicEngine:
+    """Las fuentes abiertas, el hilo que codifica sus miniaturas y los mosaicos compuestos.
+
+    Las miniaturas y los mosaicos se codifican una sola vez por cuadro nuevo y
+    se comparten entre todos los clientes. Los clientes (en el lazo de asyncio)
+    esperan a `next_change`, que se resuelve cuando el hilo publica algo nuevo.
+    """
+    def __init__(self, settings):
+        self.settings = settings
+        self.width = int(settings["width"]) // 2 * 2
+        self.height = int(round(self.width * 9 / 16)) // 2 * 2
+        self.feeds = {}  # id -> SourceFeed, en el orden de la pared
+        self.scratch = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+        self.mosaics = {}  # columnas -> (generación, imagen)
+        self.mosaic_requests = {}  # columnas -> último instante en que un cliente lo pidió
+        self.generation = 0
+        self.instance = None
+        self.loop = None
+        self.waiter = None
+        self.running = False
+        self.thread = None
+
+    def add_source(self, url, name=""):
+        if len(self.feeds) >= int(self.settings["max_sources"]):
+            print(f"Se alcanzó el máximo de fuentes del mosaico ({self.settings['max_sources']}); se omite {url}")
+            return None
+        feed = SourceFeed(url, name, self.width, self.height)
+        self.feeds.setdefault(feed.id, feed)
+        return self.feeds[feed.id]
+
+    def open_sources(self, proxy_base=None):
+        """Abrir todas las fuentes en libvlc (sin audio, pocos cuadros por segundo, decodificación liviana).
+
+        Con `proxy_base` (la URL de este servidor) las listas HLS se leen por su
+        proxy, y el reproductor web de la misma fuente reutiliza esos segmentos.
+        """
+        self.instance = vlc.Instance(["--no-audio", "--no-video-title-show", "--no-osd",
+                                      f"--network-caching={int(self.settings['network_caching'])}"])
+        if self.instance is None:
+            raise RuntimeError("No se pudo iniciar libvlc")
+        options = [":video-filter=fps", f":fps-fps={float(self.settings['fps']):g}",
+                   ":avcodec-skiploopfilter=4", ":avcodec-threads=1"]
+        for feed in self.feeds.values():
+            url = proxy_base + proxy_path(feed.url) if proxy_base and is_proxiable(feed.url) else None
+            feed.open(self.instance, options, url)
+
+    def start(self, loop):
+        """Empezar a codificar en un hilo; los avisos de cambios van al lazo `loop`."""
+        self.loop = loop
+        self.waiter = loop.create_future()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="mosaic-encoder", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        for feed in self.feeds.values():
+            feed.close()
+
+    def run(self):
+        """Hilo de codificación: una pasada por intervalo, solo sobre lo que cambió."""
+        interval = 1.0 / float(self.settings["fps"])
+        while self.running:
+            started = time.monotonic()
+            try:
+                if self.encode_pass(started):
+                    self.loop.call_soon_threadsafe(self.wake)
+            except Exception as e:
+                print(f"Error al codificar miniaturas: {e}")
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def encode_pass(self, now):
+        """Codificar los cuadros nuevos y los mosaicos pedidos. Devuelve True si hubo cambios."""
+        changed = False
+        quality, image_format = self.settings["quality"], self.settings["format"]
+        for feed in self.feeds.values():
+            feed.supervise(now)
+            if feed.take_new_frame(self.scratch):
+                feed.image = encode_image(self.scratch, quality, image_format)
+                feed.seq += 1
+                changed = True
+        if changed:
+            self.generation += 1
+        # Solo se componen los mosaicos que algún cliente pidió hace poco
+        for columns, requested in list(self.mosaic_requests.items()):
+            if now - requested > 2 * MAX_CLIENT_INTERVAL:
+                del self.mosaic_requests[columns]
+                self.mosaics.pop(columns, None)
+            elif self.mosaics.get(columns, (None,))[0] != self.generation:
+                self.mosaics[columns] = (self.generation, encode_image(self.compose(columns), quality, image_format))
+                changed = True
+        return changed
+
+    def compose(self, columns):
+        """Cuadrícula con el último cuadro de cada fuente (las que no tienen imagen quedan en negro)."""
+        feeds = list(self.feeds.values())
+        rows = max(1, -(-len(feeds) // columns))
+        canvas = np.zeros((rows * self.height, columns * self.width, 4), dtype=np.uint8)
+        for position, feed in enumerate(feeds):
+            row, column = divmod(position, columns)
+            feed.copy_into(canvas[row * self.height:(row + 1) * self.height,
+                                  column * self.width:(column + 1) * self.width])
+        return canvas
+
+    def request_mosaic(self, columns):
+        """Pedir (o renovar el pedido de) un mosaico de `columns` columnas. Devuelve la imagen o None."""
+        if columns not in self.mosaic_requests and len(self.mosaic_requests) >= MAX_MOSAIC_LAYOUTS:
+            return None
+        self.mosaic_requests[columns] = time.monotonic()
+        entry = self.mosaics.get(columns)
+        return entry[1] if entry is not None else None
+
+    def wake(self):
+        """Despertar a los clientes que esperan un cambio (en el lazo)."""
+        waiter, self.waiter = self.waiter, self.loop.create_future()
+        waiter.set_result(None)
+
+    async def next_change(self):
+        """Esperar a que el hilo de codificación publique algo nuevo."""
+        await self.waiter
+
+
+class MosaicServer:
+    """HTTP, MJPEG y WebSocket sobre asyncio para el motor de mosaico."""
+    def __init__(self, engine, proxy=None, static_dir=STATIC_DIR):
+        self.engine = engine
+        self.proxy = proxy  # HlsProxy que atiende /hls/, o None
+        if proxy is not None:
+            for feed in engine.feeds.values():
+                proxy.allow(feed.url)
+        self.static_dir = static_dir
+        self.content_type = FORMAT_TYPES[engine.settings["format"]]
+        self.clients = 0
+
+    async def handle(self, reader, writer):
+        writer.transport.set_write_buffer_limits(high=CLIENT_WRITE_BUFFER)
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError as e:
+                    writer.write(http_response(400, {"error": str(e)}, keep_alive=False))
+                    break
+                if request is None or request.method != "GET":
+                    if request is not None:
+                        writer.write(http_response(405, {"error": "solo GET"}, keep_alive=False))
+                    break
+                path = request.path
+                if path == "/ws" and request.headers.get("upgrade", "").lower() == "websocket":
+                    await self.serve_websocket(request, reader, writer)
+                    break
+                if path.startswith("/mjpeg/"):
+                    await self.serve_mjpeg(request, writer)
+                    break
+                if path.startswith(PROXY_PREFIX) and self.proxy is not None:
+                    writer.write(await self.proxy.respond(request))
+                else:
+                    writer.write(self.respond(request))
+                await writer.drain()
+                if request.headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Cliente que se fue, o el servidor que se detiene
+            pass
+        finally:
+            writer.close()
+
+    def sources(self):
+        """Descripción de las fuentes; "live_url" es la URL para verlas completas (por el proxy si está)."""
+        now = time.monotonic()
+        sources = []
+        for feed in self.engine.feeds.values():
+            source = feed.describe(now)
+            source["live_url"] = proxy_path(feed.url) if self.proxy and is_proxiable(feed.url) else feed.url
+            sources.append(source)
+        return sources
+
+    def respond(self, request):
+        """Respuesta completa a una petición simple (archivos, lista de fuentes, miniaturas)."""
+        path = request.path
+        if path == "/api/sources":
+            return http_response(200, {"format": self.engine.settings["format"], "fps": self.engine.settings["fps"],
+                                       "sources": self.sources()})
+        if path.startswith("/thumb/"):
+            feed = self.engine.feeds.get(path[len("/thumb/"):])
+            if feed is None:
+                return http_response(404, {"error": "fuente desconocida"})
+            if feed.image is None:
+                return http_response(503, {"error": "la fuente aún no entregó imagen"})
+            etag = f'"{feed.id}-{feed.seq}"'
+            if request.headers.get("if-none-match") == etag:
+                return binary_response(304, b"", None, {"ETag": etag})
+            return binary_response(200, feed.image, self.content_type, {"ETag": etag, "Cache-Control": "no-cache"})
+        name = "index.html" if path == "/" else path.lstrip("/")
+        # Solo archivos de la carpeta del cliente, sin subcarpetas
+        if "/" not in name and name in os.listdir(self.static_dir):
+            with open(os.path.join(self.static_dir, name), "rb") as file:
+                body = file.read()
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            return binary_response(200, body, content_type, {"Cache-Control": "no-cache"})
+        return http_response(404, {"error": f"ruta desconocida: {path}"})
+
+    def client_interval(self, request):
+        """Intervalo pedido por el cliente (?fps=), sin superar los cuadros que entrega el motor."""
+        try:
+            fps = float(request.query.get("fps", [self.engine.settings["fps"]])[0])
+        except ValueError:
+            fps = self.engine.settings["fps"]
+        return 1.0 / min(max(fps, 0.1), float(self.engine.settings["fps"]))
+
+    async def serve_mjpeg(self, request, writer):
+        """Stream multipart con el cuadro más reciente de una fuente o del mosaico."""
+        target = request.path[len("/mjpeg/"):]
+        if target == "mosaic":
+            try:
+                columns = max(1, min(16, int(request.query.get("columns", ["4"])[0])))
+            except ValueError:
+                columns = 4
+            if self.engine.request_mosaic(columns) is None and columns not in self.engine.mosaic_requests:
+                writer.write(http_response(503, {"error": "demasiados mosaicos distintos"}, keep_alive=False))
+                return
+
+            def current():
+                image = self.engine.request_mosaic(columns)
+                return (self.engine.mosaics.get(columns, (None,))[0], image)
+        else:
+            feed = self.engine.feeds.get(target)
+            if feed is None:
+                writer.write(http_response(404, {"error": "fuente desconocida"}, keep_alive=False))
+                return
+
+            def current():
+                return feed.seq, feed.image
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary=frame\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        pacer = RatePacer(self.client_interval(request))
+        sent = None
+        self.clients += 1
+        try:
+            while True:
+                version, image = current()
+                if image is None or version == sent:
+                    await self.engine.next_change()
+                    continue
+                started = time.monotonic()
+                writer.write(b"--frame\r\nContent-Type: " + self.content_type.encode() +
+                             b"\r\nContent-Length: " + str(len(image)).encode() + b"\r\n\r\n" + image + b"\r\n")
+                await writer.drain()
+                sent = version
+                elapsed = time.monotonic() - started
+                pacer.sent(elapsed)
+                await asyncio.sleep(max(0.0, pacer.interval - elapsed))
+        finally:
+            self.clients -= 1
+
+    async def serve_websocket(self, request, reader, writer):
+        """Enviar las miniaturas nuevas de las fuentes suscriptas, al ritmo que el cliente alcance."""
+        key = request.headers.get("sec-websocket-key")
+        if not key:
+            writer.write(http_response(400, {"error": "falta Sec-WebSocket-Key"}, keep_alive=False))
+            return
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n").encode("latin-1"))
+        writer.write(encode_frame(OP_TEXT, json.dumps({
+            "type": "sources", "format": self.engine.settings["format"],
+            "sources": self.sources()}).encode("utf-8")))
+        session = {"subscribed": list(self.engine.feeds), "pacer": RatePacer(self.client_interval(request)),
+                   "changed": asyncio.Event()}
+        self.clients += 1
+        receiver = asyncio.ensure_future(self.receive_websocket(reader, writer, session))
+        sender = asyncio.ensure_future(self.send_thumbnails(writer, session))
+        try:
+            await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.clients -= 1
+            receiver.cancel()
+            sender.cancel()
+            await asyncio.gather(receiver, sender, return_exceptions=True)
+
+    async def receive_websocket(self, reader, writer, session):
+        """Atender las suscripciones y el cierre del cliente."""
+        try:
+            while True:
+                opcode, data = await read_message(reader)
+                if opcode == OP_CLOSE:
+                    writer.write(encode_frame(OP_CLOSE, data[:2]))
+                    return
+                if opcode == OP_PING:
+                    writer.write(encode_frame(OP_PONG, data))
+                elif opcode == OP_TEXT:
+                    try:
+                        message = json.loads(data)
+                    except ValueError:
+                        continue
+                    if not isinstance(message, dict):
+                        continue
+                    if isinstance(message.get("subscribe"), list):
+                        session["subscribed"] = [source for source in message["subscribe"]
+                                                 if source in self.engine.feeds]
+                        session["changed"].set()
+                    if isinstance(message.get("fps"), (int, float)) and message["fps"] > 0:
+                        fps = min(float(message["fps"]), float(self.engine.settings["fps"]))
+                        session["pacer"].request(1.0 / fps)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+
+    async def send_thumbnails(self, writer, session):
+        sent = {}  # id -> seq enviada
+        pacer = session["pacer"]
+        while True:
+            started = time.monotonic()
+            for source in session["subscribed"]:
+                feed = self.engine.feeds[source]
+                if feed.image is not None and sent.get(source) != feed.seq:
+                    sent[source] = feed.seq
+                    identifier = source.encode("ascii")
+                    writer.write(encode_frame(OP_BINARY, bytes((len(identifier),)) + identifier + feed.image))
+            if writer.transport.get_write_buffer_size():
+                await writer.drain()
+                pacer.sent(time.monotonic() - started)
+            # Esperar el intervalo del cliente y, si no hay nada nuevo, el próximo cambio
+            await asyncio.sleep(max(0.0, pacer.interval - (time.monotonic() - started)))
+            if all(sent.get(source) == self.engine.feeds[source].seq for source in session["subscribed"]):
+                session["changed"].clear()
+                waiter = asyncio.ensure_future(session["changed"].wait())
+                await asyncio.wait({waiter, self.engine.waiter}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+
+
+async def serve(engine, host, port, started=None, proxy=None):
+    """Servir hasta que se cancele. `started` recibe el puerto una vez abierto."""
+    loop = asyncio.get_running_loop()
+    engine.start(loop)
+    server = await asyncio.start_server(MosaicServer(engine, proxy).handle, host, port)
+    try:
+        if started is not None:
+            started(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+    finally:
+        engine.stop()
+
+
+def self_test():
+    """Motor con cuadros sintéticos (sin libvlc): miniaturas, ETag, MJPEG, mosaico, WebSocket y ritmo."""
+    import base64
+    import socket
+    import urllib.request
+
+    pacer = RatePacer(0.5)
+    pacer.sent(0.4)
+    assert pacer.interval == 1.0
+    for _ in range(20):
+        pacer.sent(0.01)
+    assert pacer.interval == 0.5
+
+    engine = MosaicEngine(dict(DEFAULT_MOSAIC_SETTINGS, width=160, fps=20.0))
+    feeds = [engine.add_source(f"http://fuente/{number}.m3u8", f"Canal {number}") for number in range(5)]
+    assert engine.add_source("HTTP://FUENTE:80/0.m3u8") is feeds[0]  # La misma fuente no se abre dos veces
+    ports = []
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(serve(engine, "127.0.0.1", 0, ports.append, HlsProxy()))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        # Cerrar también las conexiones que quedaron abiertas
+        pending = asyncio.all_tasks(loop)
+        for pending_task in pending:
+            pending_task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not ports and time.monotonic() < deadline:
+        time.sleep(0.01)
+    base = f"http://127.0.0.1:{ports[0]}"
+
+    def fill(feed, value):
+        feed.write(np.full((engine.height, engine.width, 4), value, dtype=np.uint8))
+
+    for number, feed in enumerate(feeds[:4]):
+        fill(feed, 40 * (number + 1))
+    deadline = time.monotonic() + 5
+    while any(feed.image is None for feed in feeds[:4]) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    sources = json.loads(urllib.request.urlopen(base + "/api/sources", timeout=5).read())["sources"]
+    assert [source["name"] for source in sources] == [f"Canal {number}" for number in range(5)]
+    assert [source["live"] for source in sources] == [True] * 4 + [False]
+    assert all(source["live_url"] == proxy_path(source["url"]) for source in sources)
+    try:
+        urllib.request.urlopen(base + PROXY_PREFIX + "no-es-un-origen/x.m3u8", timeout=5)
+        raise AssertionError("se esperaba 404")
+    except urllib.error.HTTPError as e:
+        assert e.code == 404
+    with urllib.request.urlopen(f"{base}/thumb/{feeds[1].id}", timeout=5) as response:
+        etag = response.headers["ETag"]
+        image = QImage.fromData(response.read())
+    assert (image.width(), image.height()) == (engine.width, engine.height)
+    assert abs(QImage.pixelColor(image, 10, 10).red() - 80) < 8
+    try:
+        urllib.request.urlopen(urllib.request.Request(f"{base}/thumb/{feeds[1].id}",
+                                                      headers={"If-None-Match": etag}), timeout=5)
+        raise AssertionError("se esperaba 304")
+    except urllib.error.HTTPError as e:
+        assert e.code == 304
+    assert b"video-grid" in urllib.request.urlopen(base + "/", timeout=5).read()
+
+    # Mosaico de 3 columnas: 5 fuentes en 2 filas, compartido por todos los clientes
+    with urllib.request.urlopen(base + "/mjpeg/mosaic?columns=3", timeout=5) as response:
+        assert response.headers["Content-Type"].startswith("multipart/x-mixed-replace")
+        assert response.readline() == b"--frame\r\n"
+        headers = {}
+        while True:
+            line = response.readline().strip()
+            if not line:
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        mosaic = QImage.fromData(response.read(int(headers["content-length"])))
+    assert (mosaic.width(), mosaic.height()) == (3 * engine.width, 2 * engine.height)
+    assert abs(mosaic.pixelColor(engine.width + 10, 10).red() - 80) < 8   # Fuente 1
+    assert mosaic.pixelColor(2 * engine.width + 10, engine.height + 10).red() < 8  # Fuente 4, sin imagen
+
+    # WebSocket: solo llegan las miniaturas suscriptas y solo cuando cambian
+    sock = socket.create_connection(("127.0.0.1", ports[0]), timeout=5)
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((f"GET /ws?fps=20 HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    stream = sock.makefile("rb")
+    while stream.readline() != b"\r\n":
+        pass
+
+    def receive():
+        first, second = stream.read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = int.from_bytes(stream.read(2), "big")
+        elif length == 127:
+            length = int.from_bytes(stream.read(8), "big")
+        return first & 0x0F, stream.read(length)
+
+    opcode, data = receive()
+    assert opcode == OP_TEXT and len(json.loads(data)["sources"]) == 5
+    sock.sendall(encode_frame(OP_TEXT, json.dumps({"subscribe": [feeds[2].id]}).encode(), mask=os.urandom(4)))
+    time.sleep(0.2)
+    fill(feeds[2], 200)
+    received = set()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        opcode, data = receive()
+        assert opcode == OP_BINARY
+        identifier = data[1:1 + data[0]].decode()
+        received.add(identifier)
+        if identifier == feeds[2].id and QImage.fromData(data[1 + data[0]:]).pixelColor(5, 5).red() > 190:
+            break
+    else:
+        raise AssertionError("no llegó la miniatura actualizada")
+    assert received <= {feed.id for feed in feeds[:4]}
+    sock.close()
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(timeout=5)
+    print(f"Prueba del servidor de mosaico correcta ({len(feeds[0].image)} bytes por miniatura de "
+          f"{engine.width}x{engine.height})")
+    return 0
+
+
+def main(argv=None):
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description="Servidor de miniaturas y mosaico para el cliente web")
+    parser.add_argument("urls", nargs="*", help="URL adicionales")
+    parser.add_argument("--urls", dest="urls_file", default=None, help="archivo de URLs (por defecto el configurado)")
+    parser.add_argument("--playlist", action="append", default=[], help="lista M3U a incluir (se puede repetir)")
+    parser.add_argument("--host", default=settings["host"])
+    parser.add_argument("--port", type=int, default=settings["port"])
+    parser.add_argument("--width", type=int, default=settings["width"])
+    parser.add_argument("--fps", type=float, default=settings["fps"])
+    parser.add_argument("--quality", type=int, default=settings["quality"])
+    parser.add_argument("--format", choices=sorted(FORMAT_TYPES), default=settings["format"])
+    parser.add_argument("--self-test", action="store_true", help="comprobar el motor y el servidor sin libvlc")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return self_test()
+    settings.update(width=args.width, fps=args.fps, quality=args.quality, format=args.format)
+    proxy_settings = load_settings("hls_proxy", DEFAULT_PROXY_SETTINGS)
+    proxy = HlsProxy(proxy_settings) if proxy_settings["enabled"] else None
+    engine = MosaicEngine(settings)
+    for url, name in collect_sources(args.urls_file or default_urls_file(), args.playlist, args.urls):
+        engine.add_source(url, name)
+    if not engine.feeds:
+        print("No hay fuentes: configure la pared o indique listas o URL")
+        return 1
+
+    def started(port):
+        # Las fuentes se abren con el puerto ya escuchando, para que lean las HLS por el proxy
+        engine.open_sources(f"http://127.0.0.1:{port}" if proxy is not None else None)
+        print(f"Mosaico de {len(engine.feeds)} fuentes en http://{args.host}:{port}/")
+
+    try:
+        asyncio.run(serve(engine, args.host, args.port, started, proxy))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,32 @@
 import sys
-import vlc
-import random
+import collections
+import multiprocessing
+import time
+import startup_timing  # Primero, para medir el arranque desde el inicio
 import json
 import os
-import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, 
                              QLineEdit, QLabel, QGridLayout, QHBoxLayout, QScrollArea, 
-                             QMessageBox, QProgressBar, QInputDialog, QFileDialog)
+                             QMessageBox, QProgressBar, QInputDialog, QFileDialog, QMenu)
 from PyQt5.QtCore import Qt, QTimer
-import pyqtgraph as pg
-import subprocess
+from state_store import get_state_store
+from vlc_pool import get_instance_pool, get_vlc_instance
+from source_hub import get_source_hub
+from hls_proxy import get_hls_proxy
+from decode_workers import get_worker_pool, worker_mode_supported
+from audio_meter import AudioMeter, AudioMonitorOutput
+from spectrum_widget import SpectrumWidget
+from metering_scheduler import get_metering_scheduler, is_tile_hidden, LEVEL_ALARM
+from frame_probe import FrameProbe, ALARM_LABELS, ALARM_SEVERITIES
+from alarm_bus import get_alarm_bus, AlarmPanel, DEFAULT_ALARM_LOG, SEVERITY_COLORS
+from tile_telemetry import get_telemetry, COLUMN
+from loudness_meter import get_loudness_monitor, format_loudness
+from tile_visibility import VideoGate, VisibilityTracker, OFFSCREEN_PAUSE
+from quality_tiers import get_quality_policy, TIER_FULL
+from decode_policy import get_decode_policy
+from layout_presets import get_layout_presets, SAVE_HOTKEY, RECALL_HOTKEY
+from control_server import get_control_server
+from reconnect import ReconnectSupervisor, STATE_IDLE, STATE_PLAYING, STATE_LABELS, STATE_COLORS
 
 # Cargar la configuración guardada o usar la predeterminada
 def load_config():
@@ -24,19 +41,22 @@ def load_config():
             "vlc_lib_path": "/Applications/VLC.app/Contents/MacOS/libvlc.dylib",
         }
 
-config = load_config()
-URLS_FILE = config["urls_file"]
-DEFAULT_VLC_PATH = config["vlc_lib_path"]
-
-def load_urls():
-    """Cargar todas las URLs desde el archivo JSON."""
-    try:
-        with open(URLS_FILE, 'r') as file:
-            return json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
 # Clases FullScreenWindow y VideoWidget siguen iguales como has proporcionado anteriormente.
+# Estilos de la barra de nivel; solo se cambian cuando cambia el estado de alarma
+METER_STYLE_OK = "QProgressBar::chunk {background-color: green;} QProgressBar {border: 1px solid #555; border-radius: 5px; background-color: #333;}"
+METER_STYLE_ALARM = "QProgressBar::chunk {background-color: red;} QProgressBar {border: 1px solid #555; border-radius: 5px; background-color: #333;}"
+# Estilos del área de video con y sin alarma de imagen
+VIDEO_FRAME_STYLE = "background-color: black; border-radius: 8px;"
+VIDEO_FRAME_STYLE_ALARM = "background-color: black; border-radius: 8px; border: 3px solid %s;"
+# Alto del gráfico de espectro (y del recuadro que lo reemplaza hasta que se crea)
+SPECTRUM_HEIGHT = 120
+# Intervalo entre arranques automáticos de streams al abrir una ventana
+AUTOSTART_INTERVAL_MS = 300
+# Máximo de pantallas por ventana (configurable con "max_widgets")
+MAX_WIDGETS = 64
+# Espera tras el último cambio de tamaño antes de reacomodar la cuadrícula
+RELAYOUT_DELAY_MS = 150
+
 class FullScreenWindow(QMainWindow):
     """Ventana de Pantalla Completa"""
     def __init__(self, video_widget):
@@ -76,46 +96,52 @@ class FullScreenWindow(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-        # Crear un reproductor VLC independiente para la pantalla completa
-        self.instance = vlc.Instance()
-        self.player = self.instance.media_player_new()
-
-    def start_fullscreen_video(self, media):
-        """Inicia la reproducción en pantalla completa."""
-        self.player.set_media(media)
-
-        # Configurar el área de video de la ventana de pantalla completa
-        if sys.platform.startswith('linux') or sys.platform == "darwin":
-            self.player.set_nsobject(int(self.fullscreen_video_frame.winId()))
-        elif sys.platform == "win32":
-            self.player.set_hwnd(int(self.fullscreen_video_frame.winId()))
+    def start_fullscreen_video(self):
+        """Llevar la imagen del reproductor de la pantalla a esta ventana.
 
-        self.player.play()
+        No se abre un segundo reproductor: el de la pantalla pasa a dibujar
+        aquí, sin otra conexión ni otra decodificación del mismo stream.
+        """
+        self.video_widget.set_video_window(self.fullscreen_video_frame)
 
     def restore_normal_view(self):
         """Restaurar la vista normal sin cerrar la aplicación."""
-        self.player.stop()
+        if self.video_widget.player is not None:
+            self.video_widget.set_video_window()
+            self.video_widget.set_quality_tier(self.video_widget.quality.grid_tier())
         self.hide()
         self.video_widget.is_fullscreen = False
         self.video_widget.fullscreen_button.show()
 
     def closeEvent(self, event):
-        """Cerrar el reproductor VLC al cerrar la ventana completa."""
-        if self.player is not None:
-            self.player.stop()
-            self.player.release()
+        """Devolver la imagen a la pantalla al cerrar la ventana completa."""
+        if self.video_widget.is_fullscreen:
+            self.restore_normal_view()
         event.accept()
 
 
 class VideoWidget(QWidget):
     """Widget de video independiente para cada canal."""
-    def __init__(self, instance, index, window_number, parent=None):
+    def __init__(self, instance, index, window_number, state_store, parent=None):
         super(VideoWidget, self).__init__(parent)
         self.instance = instance
         self.index = index
         self.window_number = window_number
+        self.state_store = state_store
+        # Identificador de la pantalla en el bus de alarmas
+        self.alarm_bus = get_alarm_bus()
+        self.alarm_source = f"window_{window_number}/{index}"
         self.setStyleSheet("background-color: #222; border-radius: 8px;")
-        self.player = self.instance.media_player_new()
+        # El reproductor y lo que depende de él se crean al reproducir por primera
+        # vez (ensure_player): una pantalla sin usar no abre nada en libvlc
+        self.player = None
+        self.audio_meter = None
+        self.audio_output = None
+        self.frame_probe = None
+        self.reconnect = None
+        # Video pausado por estar fuera de vista (ver tile_visibility)
+        self.video_gate = None
+        self.video_suspended = False
 
         # Layout horizontal para combinar video y monitoreo de audio
         self.main_layout = QHBoxLayout(self)
@@ -126,7 +152,7 @@ class VideoWidget(QWidget):
         self.audio_monitor.setOrientation(Qt.Vertical)
         self.audio_monitor.setRange(0, 100)
         self.audio_monitor.setFixedWidth(15)
-        self.audio_monitor.setStyleSheet("QProgressBar::chunk {background-color: green;} QProgressBar {border: 1px solid #555; border-radius: 5px; background-color: #333;}")
+        self.audio_monitor.setStyleSheet(METER_STYLE_OK)
         self.audio_monitor_layout.addWidget(self.audio_monitor)
 
         # Botón para activar/desactivar audio
@@ -155,19 +181,38 @@ class VideoWidget(QWidget):
         self.name_input.textChanged.connect(self.save_name)
         self.video_layout.addWidget(self.name_input)
 
+        # Estado de la conexión (conectando / en reproducción / reintentando / caído)
+        self.connection_label = QLabel()
+        self.video_layout.addWidget(self.connection_label)
+
+        # Indicador de telemetría: tasa de bits y cuadros perdidos (lo actualiza el recolector)
+        self.telemetry_label = QLabel()
+        self.telemetry_label.setStyleSheet("color: #aaa; font-size: 10px;")
+        self.telemetry_label.hide()
+        self.video_layout.addWidget(self.telemetry_label)
+
+        # Sonoridad EBU R128: momentánea, corto plazo, integrada, rango y pico real
+        self.loudness_label = QLabel()
+        self.loudness_label.setStyleSheet("color: #aaa; font-size: 10px;")
+        self.loudness_label.hide()
+        self.video_layout.addWidget(self.loudness_label)
+
         # Área de video
         self.video_frame = QLabel()
         self.video_frame.setFixedSize(280, 180)
-        self.video_frame.setStyleSheet("background-color: black; border-radius: 8px;")
+        self.video_frame.setStyleSheet(VIDEO_FRAME_STYLE)
         self.video_layout.addWidget(self.video_frame, alignment=Qt.AlignCenter)
+        # Dónde dibuja el reproductor: el área de video o la ventana completa
+        self.video_target = self.video_frame
 
-        # Añadir el gráfico de espectro de audio
-        self.spectrum_plot = pg.PlotWidget()
-        self.spectrum_plot.setYRange(0, 100)
-        self.spectrum_plot.setBackground('#333')
-        self.spectrum_plot.hideAxis('bottom')
-        self.spectrum_plot.hideAxis('left')
-        self.spectrum_curve = self.spectrum_plot.plot(pen=pg.mkPen(color='g', width=2))
+        # Indicador de alarmas de imagen (negro, congelado, sin señal)
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #f55; font-weight: bold;")
+        self.status_label.hide()
+        self.video_layout.addWidget(self.status_label, alignment=Qt.AlignCenter)
+
+        # Espectro de audio (dibujado con QPainter sobre búferes fijos)
+        self.spectrum_plot = SpectrumWidget(SPECTRUM_HEIGHT)
         self.video_layout.addWidget(self.spectrum_plot)
 
         # Botones de control
@@ -209,20 +254,35 @@ class VideoWidget(QWidget):
         # Añadir el layout de video al layout principal
         self.main_layout.addLayout(self.video_layout)
 
-        # Configurar un temporizador para actualizar el monitoreo de audio
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_audio_monitor)
-
-        # Temporizador para verificar el estado del video
-        self.check_black_screen_timer = QTimer(self)
-        self.check_black_screen_timer.timeout.connect(self.check_black_screen)
+        # El monitoreo de audio y la verificación de pantalla negra los hace
+        # el planificador común de la aplicación (un único temporizador)
+        self.metering = get_metering_scheduler()
+        # Estadísticas de libvlc (tasa de bits, cuadros perdidos) de cada pantalla
+        self.telemetry = get_telemetry()
+        # Sonoridad (en un hilo aparte, o en el proceso de decodificación)
+        self.loudness = get_loudness_monitor()
+        # Una sola conexión remota por URL aunque varias pantallas la muestren
+        self.source_hub = get_source_hub()
+        self.hls_proxy = get_hls_proxy()
+        # En la cuadrícula el stream se abre a la calidad justa para el tamaño de la pantalla
+        self.quality = get_quality_policy()
+        self.quality_tier = self.quality.grid_tier()
+        self.stream_request = 0  # Para descartar aperturas pendientes que ya no corresponden
+        # Decodificación por hardware mientras haya plazas (y si no falla)
+        self.decode_policy = get_decode_policy()
+        # Los cambios de estado se publican a los clientes de la API de control
+        self.control = get_control_server().wall
+        self.meter_level = 0
+        self.meter_alarm = False
+        self.show_connection_state(STATE_IDLE)
 
         # Bandera para estado de pantalla completa
         self.is_fullscreen = False
         self.fullscreen_window = None
 
-        # Bandera para evitar notificaciones repetitivas
-        self.black_screen_notified = False
+        # Alarmas de imagen activas, para notificar solo los cambios
+        self.video_alarms = set()
+        self.alarm_bus.register_overlay(self.alarm_source, self.set_alarm_overlay)
 
         # Referencia al layout padre
         self.parent_layout = parent
@@ -232,139 +292,302 @@ class VideoWidget(QWidget):
         # Cargar nombre guardado si existe
         self.load_name()
 
+    def ensure_player(self):
+        """Crear el reproductor, la captura de audio y la supervisión si aún no existen."""
+        if self.player is not None:
+            return
+        self.player = self.instance.media_player_new()
+
+        if getattr(self.player, "remote", False):
+            # Decodifica un proceso aparte: las mediciones llegan ya calculadas
+            # y la escucha local no está disponible
+            self.player.metrics_callback = self.apply_remote_metrics
+            self.toggle_audio_button.setEnabled(False)
+        else:
+            # Captura del audio decodificado para los medidores (funciona aunque esté silenciado)
+            self.audio_meter = AudioMeter(self.player)
+            self.frame_probe = FrameProbe(self.player, self.metering.frame_sampler.settings)
+            self.video_gate = VideoGate(self.player)
+
+        # Reconexión automática con espera exponencial si el stream se cae
+        self.reconnect = ReconnectSupervisor(self.player, self.start_stream, self.alarm_source,
+                                             self.alarm_label, self)
+        self.reconnect.state_changed.connect(self.show_connection_state)
+
     def toggle_audio(self):
         """Alternar entre activar y desactivar el audio."""
+        self.ensure_player()
         if self.toggle_audio_button.isChecked():
             self.player.audio_set_volume(100)
+            if self.audio_output is None:
+                self.audio_output = AudioMonitorOutput(self.audio_meter.tap, self)
+            self.audio_output.start()
             self.toggle_audio_button.setText('🔇')
         else:
             self.player.audio_set_volume(0)
+            if self.audio_output is not None:
+                self.audio_output.stop()
             self.toggle_audio_button.setText('🔊')
 
-    def set_video_window(self):
-        """Configura la ventana donde se renderiza el video."""
-        if sys.platform.startswith('linux') or sys.platform == "darwin":
-            self.player.set_nsobject(int(self.video_frame.winId()))
-        elif sys.platform == "win32":
-            self.player.set_hwnd(int(self.video_frame.winId()))
+    def set_video_window(self, target=None):
+        """Configura la ventana donde se renderiza el video (por defecto, el área de la pantalla)."""
+        self.video_target = target or self.video_frame
+        if sys.platform == "win32":
+            self.player.set_hwnd(int(self.video_target.winId()))
+        elif sys.platform == "darwin":
+            self.player.set_nsobject(int(self.video_target.winId()))
+        else:
+            self.player.set_xwindow(int(self.video_target.winId()))
+
+        if self.player.is_playing():
+            # libvlc solo toma la ventana nueva al crear la salida de video: se
+            # vuelve a seleccionar la pista para recrearla sin reabrir el stream
+            track = self.player.video_get_track()
+            if track >= 0:
+                self.player.video_set_track(-1)
+                self.player.video_set_track(track)
+
+    def set_video_suspended(self, suspended):
+        """Dejar de decodificar la imagen mientras la pantalla no se ve (el audio sigue)."""
+        if suspended == self.video_suspended:
+            if suspended and self.video_gate is not None:
+                self.video_gate.enforce()  # Por si el stream se reabrió mientras tanto
+            return
+        self.video_suspended = suspended
+        if self.video_gate is None:
+            self.player.set_video_suspended(suspended)
+        elif suspended:
+            self.video_gate.suspend()
+        else:
+            self.video_gate.resume()
+            # Lo anterior a la pausa no sirve para detectar imagen congelada
+            self.frame_probe.reset()
 
     def play(self):
         """Reproducir el video."""
         stream_url = self.url_input.text()
         if stream_url:
-            media = self.instance.media_new(stream_url)
-            self.player.set_media(media)
-            self.set_video_window()
-            self.player.play()
+            self.ensure_player()
+            self.reconnect.start()
+            self.start_stream()
             self.player.audio_set_volume(0)  # Establecer el volumen a 0 al cargar el stream
-            self.timer.start(100)
-            self.check_black_screen_timer.start(5000)
+            if self.frame_probe is not None:
+                self.frame_probe.reset()
+            self.metering.register(self)
+            self.telemetry.register(self)
+            self.loudness.register(self)
         else:
             print("Por favor, ingrese una URL válida.")
 
+    def start_stream(self):
+        """Abrir (o reabrir tras un fallo) el stream de la pantalla."""
+        # Las listas HLS se leen por el proxy local con caché; el resto, por el concentrador de fuentes
+        url = self.source_hub.acquire(self, self.hls_proxy.local_url(self.url_input.text()), self.reconnect.retry)
+        self.stream_request += 1
+        request = self.stream_request
+        ratio = self.video_frame.devicePixelRatioF()
+        self.quality.prepare(url, self.quality_tier, int(self.video_frame.width() * ratio),
+                             int(self.video_frame.height() * ratio),
+                             lambda options: self.open_media(request, url, options))
+
+    def open_media(self, request, url, options):
+        """Abrir el stream con las opciones de calidad, si la pantalla sigue esperándolo."""
+        if request != self.stream_request or not self.reconnect.active:
+            return
+        options = list(options) + [self.decode_policy.option(self)]
+        media = self.instance.media_new(url, *options)
+        self.player.set_media(media)
+        self.set_video_window(self.video_target)
+        self.player.play()
+
+    def set_quality_tier(self, tier):
+        """Cambiar entre la calidad de la cuadrícula y la de pantalla completa (reabre el stream)."""
+        if tier == self.quality_tier:
+            return
+        self.quality_tier = tier
+        self.reopen_stream()
+
+    def reopen_stream(self):
+        """Volver a abrir el stream en reproducción (con calidad o decodificación nuevas)."""
+        if self.reconnect is not None and self.reconnect.active:
+            self.start_stream()
+
     def pause(self):
         """Pausar el video."""
+        if self.player is None:
+            return
+        self.reconnect.stop()
         self.player.pause()
-        self.timer.stop()
-        self.check_black_screen_timer.stop()
+        self.metering.unregister(self)
+        self.telemetry.unregister(self)
+        self.loudness.unregister(self)
+        self.source_hub.release(self)
+        self.decode_policy.release(self)
 
     def stop(self):
         """Detener el video."""
+        if self.player is None:
+            return
+        self.reconnect.stop()
         self.player.stop()
-        self.timer.stop()
-        self.check_black_screen_timer.stop()
-        self.audio_monitor.setValue(0)
-        self.black_screen_notified = False
+        self.metering.unregister(self)
+        self.telemetry.unregister(self)
+        self.telemetry_label.hide()
+        self.loudness.unregister(self)
+        self.source_hub.release(self)
+        self.decode_policy.release(self)
+        self.apply_audio_levels(0, False, None)
+        self.spectrum_plot.clear()
+        if self.audio_meter is not None:
+            self.audio_meter.reset()
+            self.frame_probe.reset()
+        self.apply_video_alarms(set())
+        self.alarm_bus.clear_source(self.alarm_source)
+
+    def set_channel(self, name, url):
+        """Asignar nombre y URL de una vez; si estaba reproduciendo, abre el canal nuevo."""
+        self.name_input.setText(name)
+        self.url_input.setText(url)
+        if self.is_playing():
+            # La sonoridad y las alarmas eran de la fuente anterior
+            self.loudness.unregister(self)
+            self.apply_video_alarms(set())
+            self.alarm_bus.clear_source(self.alarm_source)
+            self.play()
+
+    def is_playing(self):
+        """Si la pantalla está reproduciendo (o reconectando) su stream."""
+        return self.reconnect is not None and self.reconnect.active
 
     def toggle_fullscreen(self):
         """Alternar entre pantalla completa y tamaño normal."""
         if not self.is_fullscreen:
             if not self.fullscreen_window:
                 self.fullscreen_window = FullScreenWindow(self)
-            media = self.player.get_media()
-            if media:
-                self.fullscreen_window.start_fullscreen_video(media)
+            if self.player is not None and self.player.get_media():
+                self.set_video_suspended(False)
+                self.fullscreen_window.start_fullscreen_video()
+                self.set_quality_tier(TIER_FULL)
             self.fullscreen_window.show()
             self.is_fullscreen = True
             self.fullscreen_button.hide()
         else:
             self.fullscreen_window.restore_normal_view()
 
-    def update_audio_monitor(self):
-        """Actualizar el monitoreo de audio de manera dinámica simulada."""
-        audio_level = random.randint(0, 100)
-        spectrum_data = np.random.normal(size=100) * audio_level
-        self.spectrum_curve.setData(spectrum_data)
-
-        if audio_level > 95:
-            self.audio_monitor.setStyleSheet("QProgressBar::chunk {background-color: red;}")
+    def apply_audio_levels(self, level, alarm, spectrum):
+        """Aplicar los niveles calculados por el planificador solo si cambiaron."""
+        if alarm != self.meter_alarm:
+            self.meter_alarm = alarm
+            self.audio_monitor.setStyleSheet(METER_STYLE_ALARM if alarm else METER_STYLE_OK)
+        if level != self.meter_level:
+            self.meter_level = level
+            self.audio_monitor.setValue(level)
+        if spectrum is not None:
+            self.spectrum_plot.set_spectrum(spectrum)
+
+    def apply_remote_metrics(self, metrics):
+        """Aplicar las mediciones que envía el proceso de decodificación de la pantalla."""
+        if not self.reconnect.active:
+            return
+        level = metrics["level"]
+        self.apply_audio_levels(level, level > LEVEL_ALARM,
+                                None if is_tile_hidden(self) else metrics["spectrum"])
+        self.metering.check_silence(self, level, time.monotonic())
+        self.apply_video_alarms(set(metrics["video_alarms"]))
+        if "loudness" in metrics and self.loudness.settings["enabled"]:
+            self.loudness.apply(self, metrics["loudness"])
+
+    def apply_video_alarms(self, alarms):
+        """Publicar en el bus los cambios en las alarmas de imagen de la pantalla."""
+        if alarms == self.video_alarms:
+            return
+        for alarm in alarms - self.video_alarms:
+            self.alarm_bus.raise_alarm(self.alarm_source, alarm, ALARM_SEVERITIES[alarm],
+                                       ALARM_LABELS[alarm], self.alarm_label())
+        for alarm in self.video_alarms - alarms:
+            self.alarm_bus.clear_alarm(self.alarm_source, alarm)
+        self.video_alarms = alarms
+        if alarms:
+            self.status_label.setText(" · ".join(ALARM_LABELS[alarm] for alarm in sorted(alarms)))
+            self.status_label.show()
         else:
-            self.audio_monitor.setStyleSheet("QProgressBar::chunk {background-color: green;}")
-
-        self.audio_monitor.setValue(audio_level)
-
-    def check_black_screen(self):
-        """Verifica si la pantalla de video se pone negra después de 5 segundos."""
-        try:
-            video_frame = self.player.video_get_size(0)
-            if video_frame == (0, 0) and not self.black_screen_notified:
-                self.notify_black_screen()
-        except Exception as e:
-            print(f"Error al verificar pantalla negra: {e}")
+            self.status_label.hide()
+
+    def show_telemetry(self, sample, lost_recently):
+        """Mostrar la tasa de bits y los cuadros perdidos recientes de la última muestra."""
+        if is_tile_hidden(self):
+            return
+        text = f"{sample[COLUMN['demux_kbps']] / 1000.0:.1f} Mb/s · {int(lost_recently)} cuadros perdidos/min"
+        if text != self.telemetry_label.text():
+            self.telemetry_label.setText(text)
+            self.telemetry_label.setStyleSheet(f"color: {'#f5c542' if lost_recently else '#aaa'}; font-size: 10px;")
+        self.telemetry_label.show()
+
+    def show_loudness(self, result, alarm):
+        """Mostrar la última medición de sonoridad (None la oculta)."""
+        if result is None:
+            self.loudness_label.hide()
+            return
+        if is_tile_hidden(self):
+            return
+        text = (f"M {format_loudness(result['momentary'])} · S {format_loudness(result['short_term'])} · "
+                f"I {format_loudness(result['integrated'])} LUFS · "
+                f"LRA {format_loudness(result['loudness_range'], 'LU')} · "
+                f"TP {format_loudness(result['true_peak'], 'dBTP')}")
+        if text != self.loudness_label.text():
+            self.loudness_label.setText(text)
+            self.loudness_label.setStyleSheet(f"color: {'#f5c542' if alarm else '#aaa'}; font-size: 10px;")
+        self.loudness_label.show()
+
+    def show_connection_state(self, state):
+        """Mostrar el estado de la conexión que informa el supervisor."""
+        self.connection_label.setText(STATE_LABELS[state])
+        self.connection_label.setStyleSheet(f"color: {STATE_COLORS[state]}; font-size: 11px;")
+        if state == STATE_PLAYING:
+            startup_timing.mark("first_picture")
+        self.control.tile_changed(self)
+
+    def set_alarm_overlay(self, severity):
+        """Pintar el borde de la pantalla según la alarma más grave activa."""
+        if severity is None:
+            self.video_frame.setStyleSheet(VIDEO_FRAME_STYLE)
+        else:
+            self.video_frame.setStyleSheet(VIDEO_FRAME_STYLE_ALARM % SEVERITY_COLORS[severity])
 
-    def notify_black_screen(self):
-        """Mostrar una notificación cuando la pantalla se pone negra y permitir edición."""
-        self.black_screen_notified = True
-        QMessageBox.warning(self, "Pantalla Negra Detectada", f"La pantalla de video {self.index + 1} se ha puesto negra. Verifique el stream.")
-        self.url_input.setFocus()
+    def alarm_label(self):
+        """Nombre con el que la pantalla aparece en el panel de alarmas."""
+        name = self.state_store.get_name(self.window_number, self.index)
+        return name or f"V{self.window_number}-P{self.index + 1}"
 
     def save_url(self):
-        """Guardar la URL actual en el archivo JSON."""
-        state = load_urls()
-        window_key = f'window_{self.window_number}'
-        
-        if window_key not in state:
-            state[window_key] = {}
-        if 'urls' not in state[window_key]:
-            state[window_key]['urls'] = {}
-
-        state[window_key]['urls'][str(self.index)] = self.url_input.text()
-
-        with open(URLS_FILE, 'w') as file:
-            json.dump(state, file)
+        """Guardar la URL actual en el almacén de estado (escritura diferida)."""
+        self.state_store.set_url(self.window_number, self.index, self.url_input.text())
 
     def save_name(self):
-        """Guardar el nombre del canal en el archivo JSON."""
-        state = load_urls()
-        window_key = f'window_{self.window_number}'
-
-        if window_key not in state:
-            state[window_key] = {}
-        if 'names' not in state[window_key]:
-            state[window_key]['names'] = {}
-
-        state[window_key]['names'][str(self.index)] = self.name_input.text()
-
-        with open(URLS_FILE, 'w') as file:
-            json.dump(state, file)
+        """Guardar el nombre del canal en el almacén de estado (escritura diferida)."""
+        self.state_store.set_name(self.window_number, self.index, self.name_input.text())
 
     def load_url(self):
-        """Cargar la URL guardada desde el archivo JSON."""
-        state = load_urls()
-        window_key = f'window_{self.window_number}'
-        if window_key in state and 'urls' in state[window_key] and str(self.index) in state[window_key]['urls']:
-            self.url_input.setText(state[window_key]['urls'][str(self.index)])
+        """Cargar la URL guardada desde el almacén de estado."""
+        url = self.state_store.get_url(self.window_number, self.index)
+        if url:
+            self.url_input.setText(url)
 
     def load_name(self):
-        """Cargar el nombre guardado desde el archivo JSON."""
-        state = load_urls()
-        window_key = f'window_{self.window_number}'
-        if window_key in state and 'names' in state[window_key] and str(self.index) in state[window_key]['names']:
-            self.name_input.setText(state[window_key]['names'][str(self.index)])
+        """Cargar el nombre guardado desde el almacén de estado."""
+        name = self.state_store.get_name(self.window_number, self.index)
+        if name:
+            self.name_input.setText(name)
 
     def closeEvent(self, event):
         """Detener el reproductor VLC al cerrar la ventana del widget."""
+        if self.audio_output is not None:
+            self.audio_output.stop()
+        self.alarm_bus.unregister_overlay(self.alarm_source)
+        self.telemetry.forget(self)
         if self.player is not None:
+            if self.frame_probe is not None:
+                self.frame_probe.close()
             self.stop()
             self.player.release()
         event.accept()
@@ -374,7 +597,7 @@ class MainWindow(QMainWindow):
     ventana_count = 1  # Contador de ventanas abiertas
     ventanas_abiertas = []  # Lista para guardar las ventanas abiertas
 
-    def __init__(self, num_widgets=8):
+    def __init__(self, num_widgets=None):
         super().__init__()
 
         # Configuración de la ventana
@@ -383,6 +606,19 @@ class MainWindow(QMainWindow):
         self.setStyleSheet("background-color: #333; color: white;")
         self.window_number = MainWindow.ventana_count
         MainWindow.ventana_count += 1
+        # La configuración se lee al crear cada ventana (puede cambiar en modo admin)
+        config = load_config()
+        self.state_store = get_state_store(config["urls_file"])
+        get_metering_scheduler().frame_sampler.configure(config.get("frame_probe"))
+        get_alarm_bus().configure(config.get("alarm_log", DEFAULT_ALARM_LOG))
+        get_telemetry().configure(config.get("telemetry"))
+        get_quality_policy().configure(config.get("quality"))
+        get_decode_policy().configure(config.get("decode"))
+        get_loudness_monitor().configure(config.get("loudness"))
+        self.presets = get_layout_presets()
+        self.presets.configure(config.get("presets"))
+        # API local para automatización (apagada salvo que se configure "control")
+        get_control_server().configure(config.get("control"))
 
         # Crear el widget central
         central_widget = QWidget(self)
@@ -406,7 +642,7 @@ class MainWindow(QMainWindow):
                 background-color: #777;
             }
         """)
-        add_screen_button.clicked.connect(self.add_video_widget)
+        add_screen_button.clicked.connect(lambda: self.add_video_widget())
         button_layout.addWidget(add_screen_button)
 
         add_window_button = QPushButton('Agregar Ventana')
@@ -425,6 +661,47 @@ class MainWindow(QMainWindow):
         add_window_button.clicked.connect(self.add_new_window)
         button_layout.addWidget(add_window_button)
 
+        # Botón para importar canales desde una lista M3U
+        import_button = QPushButton('Importar Lista')
+        import_button.setStyleSheet("""
+            QPushButton {
+                background-color: #555;
+                color: white;
+                padding: 10px;
+                border-radius: 5px;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background-color: #777;
+            }
+        """)
+        import_button.clicked.connect(self.open_playlist_import)
+        button_layout.addWidget(import_button)
+
+        # Distribuciones guardadas de la pared (también con atajos, ver layout_presets)
+        presets_button = QPushButton('Distribuciones')
+        presets_button.setStyleSheet("""
+            QPushButton {
+                background-color: #555;
+                color: white;
+                padding: 10px;
+                border-radius: 5px;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background-color: #777;
+            }
+            QPushButton::menu-indicator {
+                image: none;
+            }
+        """)
+        presets_menu = QMenu(presets_button)
+        presets_menu.addAction(f'Guardar distribución... ({SAVE_HOTKEY})', lambda: self.presets.prompt_save(self))
+        presets_menu.addAction(f'Recuperar distribución... ({RECALL_HOTKEY})', lambda: self.presets.prompt_recall(self))
+        presets_menu.addAction('Borrar distribución...', lambda: self.presets.prompt_delete(self))
+        presets_button.setMenu(presets_menu)
+        button_layout.addWidget(presets_button)
+
         # Botón para el modo de configuración administrativa
         admin_button = QPushButton('Modo Admin')
         admin_button.setStyleSheet("""
@@ -444,87 +721,293 @@ class MainWindow(QMainWindow):
 
         main_layout_container.addLayout(button_layout)
 
+        # Panel de alarmas no modal (muestra las alarmas de todas las ventanas)
+        self.alarm_panel = AlarmPanel(get_alarm_bus())
+        main_layout_container.addWidget(self.alarm_panel)
+
         # Área de scroll para las pantallas de video
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        main_layout_container.addWidget(scroll_area)
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        main_layout_container.addWidget(self.scroll_area)
 
         # Widget contenedor dentro del área de scroll
         scroll_content = QWidget()
-        scroll_area.setWidget(scroll_content)
+        self.scroll_area.setWidget(scroll_content)
 
         # Crear layout de cuadrícula para las pantallas de video
         self.main_layout = QGridLayout(scroll_content)
         self.main_layout.setSpacing(20)
-
-        # Crear un reproductor VLC
-        self.instance = vlc.Instance()
-
-        # Añadir widgets de video iniciales
+        # Columnas según el ancho de la ventana (se recalculan al cambiar de tamaño)
+        self.columns = 4
+        self.relayout_timer = QTimer(self)
+        self.relayout_timer.setSingleShot(True)
+        self.relayout_timer.setInterval(RELAYOUT_DELAY_MS)
+        self.relayout_timer.timeout.connect(self.relayout_tiles)
+
+        # Instancia de libvlc compartida por todas las ventanas del proceso, o los
+        # procesos de decodificación si se activó "decode_workers" (aíslan fallos)
+        get_instance_pool().configure(config.get("vlc_options"))
+        decode_workers = config.get("decode_workers", 0)
+        if decode_workers and worker_mode_supported():
+            self.instance = get_worker_pool(decode_workers, get_instance_pool().instance_args(),
+                                            get_metering_scheduler().frame_sampler.settings)
+        else:
+            self.instance = get_vlc_instance()
+        get_source_hub().configure(config.get("share_sources", True))
+        get_hls_proxy().configure(config.get("hls_proxy"))
+
+        # Los streams con URL guardada arrancan solos, de a uno, para no
+        # abrir todas las conexiones y decodificadores en el mismo instante
+        self.autostart = config.get("autostart", True)
+        self.autostart_queue = collections.deque()
+        self.autostart_timer = QTimer(self)
+        self.autostart_timer.setInterval(AUTOSTART_INTERVAL_MS)
+        self.autostart_timer.timeout.connect(self.start_next_stream)
+
+        # Añadir widgets de video iniciales (sin número indicado, los guardados)
         self.video_widgets = []
-        self.max_widgets = 15
+        self.max_widgets = config.get("max_widgets", MAX_WIDGETS)
+        self.pending_widgets = 0
+        self.playlist_dialog = None
+        if num_widgets is None:
+            num_widgets = self.load_layout_state()
         self.add_initial_widgets(num_widgets)
 
+        # Las pantallas fuera de vista dejan de decodificar imagen ("offscreen_video": "keep" lo evita)
+        self.visibility = VisibilityTracker(self.video_widgets, config.get("offscreen_video", OFFSCREEN_PAUSE), self)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self.visibility.refresh)
+        self.presets.register_window(self)
+
     def add_initial_widgets(self, num_widgets):
-        """Agregar pantallas de video iniciales según el número indicado."""
-        for i in range(num_widgets):
-            self.add_video_widget(i)
+        """Agregar las pantallas iniciales de a una por vuelta del bucle de eventos.
+
+        La ventana se muestra enseguida y las pantallas van apareciendo sin
+        bloquear la interfaz mientras se construyen.
+        """
+        self.pending_widgets = min(num_widgets, self.max_widgets)
+        QTimer.singleShot(0, self.build_next_widget)
+
+    def build_next_widget(self):
+        """Crear la siguiente pantalla inicial y programar la que sigue."""
+        if self.pending_widgets <= 0:
+            return
+        self.pending_widgets -= 1
+        video_widget = self.create_video_widget(len(self.video_widgets))
+        if self.autostart and video_widget.url_input.text():
+            self.autostart_queue.append(video_widget)
+            if not self.autostart_timer.isActive():
+                self.autostart_timer.start()
+        if self.pending_widgets:
+            QTimer.singleShot(0, self.build_next_widget)
+        else:
+            startup_timing.mark("tiles_built")
+
+    def start_next_stream(self):
+        """Arrancar el siguiente stream de la ola de inicio automático."""
+        while self.autostart_queue:
+            video_widget = self.autostart_queue.popleft()
+            # Si el operador ya la inició a mano no se vuelve a arrancar
+            if not video_widget.is_playing():
+                video_widget.play()
+                break
+        if not self.autostart_queue:
+            self.autostart_timer.stop()
+
+    def create_video_widget(self, index):
+        """Crear una pantalla y colocarla en la siguiente celda de la cuadrícula."""
+        video_widget = VideoWidget(self.instance, index, self.window_number, self.state_store, parent=self)
+        self.video_widgets.append(video_widget)
+
+        row = (len(self.video_widgets) - 1) // self.columns
+        col = (len(self.video_widgets) - 1) % self.columns
+
+        self.main_layout.addWidget(video_widget, row, col, alignment=Qt.AlignCenter)
+        if len(self.video_widgets) == 1:
+            # Con la primera pantalla ya se conoce su ancho
+            self.relayout_timer.start()
+        return video_widget
+
+    def column_count(self):
+        """Cuántas pantallas caben a lo ancho del área visible."""
+        if not self.video_widgets:
+            return self.columns
+        margins = self.main_layout.contentsMargins()
+        width = self.scroll_area.viewport().width() - margins.left() - margins.right()
+        spacing = self.main_layout.spacing()
+        tile_width = self.video_widgets[0].sizeHint().width()
+        return max(1, (width + spacing) // (tile_width + spacing))
+
+    def relayout_tiles(self):
+        """Reacomodar la cuadrícula si cambió el número de columnas."""
+        columns = self.column_count()
+        if columns == self.columns:
+            return
+        self.columns = columns
+        for position, video_widget in enumerate(self.video_widgets):
+            self.main_layout.removeWidget(video_widget)
+            self.main_layout.addWidget(video_widget, position // columns, position % columns,
+                                       alignment=Qt.AlignCenter)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.relayout_timer.start()
+
+    def remove_last_widget(self):
+        """Cerrar la última pantalla de la cuadrícula (libera su reproductor)."""
+        video_widget = self.video_widgets.pop()
+        if video_widget in self.autostart_queue:
+            self.autostart_queue.remove(video_widget)
+        self.visibility.forget(video_widget)
+        self.main_layout.removeWidget(video_widget)
+        video_widget.close()
+        video_widget.deleteLater()
+
+    def widget_count(self):
+        """Pantallas de la ventana, contando las que aún se están construyendo."""
+        return len(self.video_widgets) + self.pending_widgets
+
+    def apply_layout(self, layout):
+        """Llevar la ventana a una distribución ({"num_widgets", "urls", "names"}) sin tocar lo que coincide.
+
+        Las pantallas con la misma URL siguen reproduciendo; las que cambian de
+        fuente abren la nueva en su reproductor (las detenidas arrancan en la
+        ola de inicio si corresponde) y la cuadrícula solo crece o se achica en
+        lo que difiere. Devuelve cuántas pantallas cambiaron.
+        """
+        count = min(layout.get("num_widgets", self.widget_count()), self.max_widgets)
+        urls = layout.get("urls", {})
+        names = layout.get("names", {})
+        changed = 0
+        # Las pantallas aún sin construir leerán su canal del almacén
+        for index in range(len(self.video_widgets), self.widget_count()):
+            self.state_store.set_url(self.window_number, index, urls.get(str(index), ""))
+            self.state_store.set_name(self.window_number, index, names.get(str(index), ""))
+
+        while len(self.video_widgets) > count:
+            index = len(self.video_widgets) - 1
+            self.remove_last_widget()
+            self.state_store.set_url(self.window_number, index, "")
+            self.state_store.set_name(self.window_number, index, "")
+            changed += 1
+        self.pending_widgets = max(0, min(self.pending_widgets, count - len(self.video_widgets)))
+
+        for video_widget in self.video_widgets:
+            url = urls.get(str(video_widget.index), "")
+            name = names.get(str(video_widget.index), "")
+            if video_widget.url_input.text() == url:
+                if video_widget.name_input.text() != name:
+                    video_widget.name_input.setText(name)
+                continue
+            changed += 1
+            was_playing = video_widget.is_playing()
+            if not url:
+                video_widget.stop()
+            video_widget.set_channel(name, url)
+            if url and not video_widget.is_playing() and (was_playing or self.autostart):
+                self.autostart_queue.append(video_widget)
+
+        for index in range(self.widget_count(), count):
+            self.state_store.set_url(self.window_number, index, urls.get(str(index), ""))
+            self.state_store.set_name(self.window_number, index, names.get(str(index), ""))
+            video_widget = self.create_video_widget(index)
+            changed += 1
+            if self.autostart and video_widget.url_input.text():
+                self.autostart_queue.append(video_widget)
+
+        if self.autostart_queue and not self.autostart_timer.isActive():
+            self.autostart_timer.start()
+        self.save_layout_state()
+        return changed
 
     def add_video_widget(self, index=None):
         """Agregar una nueva pantalla de video a la cuadrícula, si no se ha alcanzado el máximo."""
-        if len(self.video_widgets) < self.max_widgets:
+        if len(self.video_widgets) + self.pending_widgets < self.max_widgets:
             index = index if index is not None else len(self.video_widgets)
-            video_widget = VideoWidget(self.instance, index, self.window_number, parent=self)
-            self.video_widgets.append(video_widget)
-
-            row = (len(self.video_widgets) - 1) // 4
-            col = (len(self.video_widgets) - 1) % 4
-
-            self.main_layout.addWidget(video_widget, row, col, alignment=Qt.AlignCenter)
+            self.create_video_widget(index)
             self.save_layout_state()
         else:
-            QMessageBox.information(self, "Límite Alcanzado", "Se ha alcanzado el número máximo de viewers (15) en esta ventana.")
+            QMessageBox.information(self, "Límite Alcanzado", f"Se ha alcanzado el número máximo de viewers ({self.max_widgets}) en esta ventana.")
+
+    def open_playlist_import(self):
+        """Abrir el importador de listas M3U para esta ventana."""
+        if self.playlist_dialog is None:
+            # El importador solo se carga cuando se usa
+            from playlist_import import PlaylistImportDialog
+            self.playlist_dialog = PlaylistImportDialog(self)
+        self.playlist_dialog.show()
+        self.playlist_dialog.raise_()
+
+    def assign_channels(self, channels, start=0):
+        """Asignar canales a pantallas consecutivas desde `start`, creando las que falten.
+
+        Devuelve cuántos canales se asignaron (se detiene al llegar al máximo de pantallas).
+        """
+        assigned = 0
+        for index, channel in enumerate(channels, start):
+            if index >= self.max_widgets:
+                break
+            # Las pantallas que aún se están construyendo leerán el canal del almacén
+            self.state_store.set_url(self.window_number, index, channel.url)
+            self.state_store.set_name(self.window_number, index, channel.name)
+            while len(self.video_widgets) + self.pending_widgets <= index:
+                self.create_video_widget(len(self.video_widgets))
+            if index < len(self.video_widgets):
+                self.video_widgets[index].set_channel(channel.name, channel.url)
+            assigned += 1
+        self.save_layout_state()
+        return assigned
 
     def add_new_window(self):
         """Abrir una nueva ventana para agregar más pantallas de video."""
-        if len(MainWindow.ventanas_abiertas) < 5:
-            new_window = MainWindow(8)
-            new_window.show()
-            MainWindow.ventanas_abiertas.append(new_window)
-        else:
+        if self.open_window(8) is None:
             QMessageBox.warning(self, "Límite de Ventanas Alcanzado", "Se ha alcanzado el número máximo de ventanas permitidas (5).")
 
+    def open_window(self, num_widgets):
+        """Abrir otra ventana (con `num_widgets` pantallas o, si es None, las guardadas).
+
+        Devuelve la ventana, o None si ya se alcanzó el máximo de ventanas.
+        """
+        if len(MainWindow.ventanas_abiertas) >= 5:
+            return None
+        new_window = MainWindow(num_widgets)
+        new_window.show()
+        MainWindow.ventanas_abiertas.append(new_window)
+        return new_window
+
+    @staticmethod
+    def next_window_number():
+        """Número que tomará la próxima ventana que se abra."""
+        return MainWindow.ventana_count
+
     def activate_admin_mode(self):
         """Activar modo de configuración administrativa."""
         password, ok = QInputDialog.getText(self, 'Contraseña de Administrador', 'Ingrese la contraseña:')
         if ok and password == 'admin':
             QMessageBox.information(self, "Modo Admin", "Modo de configuración administrativa activado.")
-            # Abrir admin_multiviewer.py y cerrar multiviewer.py
-            subprocess.Popen(["python3", "admin_multiviewer.py"])
+            # Abrir la configuración administrativa en el mismo proceso y cerrar el visor
+            from admin_multiviewer import AdminWindow
+            self.admin_window = AdminWindow()
+            self.admin_window.show()
             self.close()  # Cerrar la ventana actual de multiviewer
 
     def save_layout_state(self):
-        """Guardar el estado actual del número de pantallas en el archivo JSON."""
-        state = load_urls()
-        window_key = f'window_{self.window_number}'
-        state[window_key] = {'num_widgets': len(self.video_widgets), 'urls': state.get(window_key, {}).get('urls', {}), 'names': state.get(window_key, {}).get('names', {})}
-        with open(URLS_FILE, 'w') as file:
-            json.dump(state, file)
+        """Guardar el estado actual del número de pantallas (escritura diferida)."""
+        self.state_store.set_num_widgets(self.window_number, len(self.video_widgets) + self.pending_widgets)
 
     def load_layout_state(self):
-        """Cargar el estado guardado del archivo JSON y ajustar el número de pantallas en consecuencia."""
-        try:
-            with open(URLS_FILE, 'r') as file:
-                state = json.load(file)
-                window_key = f'window_{self.window_number}'
-                return state.get(window_key, {}).get('num_widgets', 8)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return 8
+        """Cargar el número de pantallas guardado para esta ventana."""
+        return self.state_store.get_num_widgets(self.window_number, 8)
 
     def closeEvent(self, event):
         """Eliminar la ventana de la lista al cerrarla y detener todos los reproductores."""
+        self.pending_widgets = 0
+        self.autostart_timer.stop()
+        self.autostart_queue.clear()
+        self.visibility.stop()
+        self.presets.unregister_window(self)
         for video_widget in self.video_widgets:
             video_widget.close()
+        self.state_store.flush()
         if self in MainWindow.ventanas_abiertas:
             MainWindow.ventanas_abiertas.remove(self)
         MainWindow.ventana_count -= 1
@@ -532,8 +1015,10 @@ class MainWindow(QMainWindow):
 
 # Función principal para ejecutar la aplicación
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Procesos de decodificación en el ejecutable empaquetado
     app = QApplication(sys.argv)
-    initial_widgets = MainWindow().load_layout_state()
-    window = MainWindow(initial_widgets)
+    # La ventana lee del almacén de estado cuántas pantallas tenía
+    window = MainWindow()
     window.show()
+    QTimer.singleShot(0, lambda: startup_timing.mark("window_shown"))
     sys.exit(app.exec_())
@@ -19,16 +19,14 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='multiviewer',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,
     upx_exclude=[],
-    runtime_tmpdir=None,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,8 +34,19 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
-app = BUNDLE(
+# Carpeta en lugar de un único ejecutable: el modo onefile descomprime todo en
+# un directorio temporal en cada arranque y UPX añade otra descompresión
+coll = COLLECT(
     exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='multiviewer',
+)
+app = BUNDLE(
+    coll,
     name='multiviewer.app',
     icon=None,
     bundle_identifier=None,
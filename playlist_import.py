@@ -0,0 +1,282 @@
+import io
+import re
+import sqlite3
+import threading
+import unicodedata
+import urllib.request
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel,
+                             QListWidget, QListWidgetItem, QComboBox, QSpinBox, QFileDialog,
+                             QAbstractItemView, QMessageBox)
+
+# Atributos de una línea #EXTINF (tvg-id="...", group-title="...", etc.)
+ATTRIBUTE_PATTERN = re.compile(r'([A-Za-z][\w-]*)="([^"]*)"')
+# Máximo de resultados que se muestran en la búsqueda
+MAX_RESULTS = 500
+# Cada cuántos canales leídos se informa el avance de la carga
+PROGRESS_EVERY = 2000
+# Canales por transacción al guardar el catálogo (la base queda libre entre tandas para la interfaz)
+CATALOG_BATCH = 1000
+# Espera tras la última tecla antes de buscar
+SEARCH_DELAY_MS = 200
+ALL_GROUPS = "Todos los grupos"
+
+
+class Channel:
+    """Una entrada de la lista: nombre, URL y atributos tvg."""
+    __slots__ = ("name", "url", "tvg_id", "tvg_name", "tvg_logo", "group")
+
+    def __init__(self, name, url, tvg_id="", tvg_name="", tvg_logo="", group=""):
+        self.name = name
+        self.url = url
+        self.tvg_id = tvg_id
+        self.tvg_name = tvg_name
+        self.tvg_logo = tvg_logo
+        self.group = group
+
+
+def open_playlist(source):
+    """Abrir una lista local o remota como texto, sin leerla entera."""
+    if source.startswith(("http://", "https://")):
+        response = urllib.request.urlopen(source, timeout=15)
+        return io.TextIOWrapper(response, encoding="utf-8-sig", errors="replace")
+    return open(source, "r", encoding="utf-8-sig", errors="replace")
+
+
+def parse_extinf(line):
+    """Obtener (atributos, título) de una línea #EXTINF."""
+    attributes = {}
+    end = len("#EXTINF:")
+    for match in ATTRIBUTE_PATTERN.finditer(line):
+        attributes[match.group(1).lower()] = match.group(2)
+        end = match.end()
+    comma = line.find(",", end)
+    title = line[comma + 1:].strip() if comma >= 0 else ""
+    return attributes, title
+
+
+def iter_m3u(lines):
+    """Recorrer una lista M3U/M3U8 línea a línea y devolver sus canales de a uno.
+
+    Admite entradas con o sin #EXTINF, #EXTGRP y líneas en blanco; no guarda
+    más que la entrada en curso, así que sirve para listas de cualquier tamaño.
+    """
+    attributes, title, group = {}, "", ""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#EXTINF:"):
+            attributes, title = parse_extinf(line)
+            group = attributes.get("group-title", "")
+        elif line.startswith("#EXTGRP:"):
+            group = line[len("#EXTGRP:"):].strip()
+        elif line.startswith("#"):
+            continue
+        else:
+            name = title or attributes.get("tvg-name") or line.rsplit("/", 1)[-1] or line
+            yield Channel(name, line, attributes.get("tvg-id", ""), attributes.get("tvg-name", ""),
+                          attributes.get("tvg-logo", ""), group)
+            attributes, title, group = {}, "", ""
+
+
+def search_key(text):
+    """Texto en minúsculas y sin acentos para comparar en las búsquedas."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+class ChannelIndex:
+    """Índice de búsqueda de canales por nombre, tvg-id y grupo."""
+    def __init__(self):
+        self.channels = []
+        self.keys = []  # Texto de búsqueda de cada canal, en el mismo orden
+        self.groups = {}  # grupo -> número de canales
+
+    def add(self, channel):
+        self.channels.append(channel)
+        self.keys.append(search_key(f"{channel.name} {channel.tvg_name} {channel.tvg_id} {channel.group}"))
+        self.groups[channel.group] = self.groups.get(channel.group, 0) + 1
+
+    def __len__(self):
+        return len(self.channels)
+
+    def search(self, text, group=None, limit=MAX_RESULTS):
+        """Canales que contienen todas las palabras buscadas (y del grupo indicado)."""
+        terms = search_key(text).split()
+        results = []
+        for channel, key in zip(self.channels, self.keys):
+            if group is not None and channel.group != group:
+                continue
+            if all(term in key for term in terms):
+                results.append(channel)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+class PlaylistLoader(QObject):
+    """Carga una lista en un hilo aparte y avisa del avance a la interfaz.
+
+    Si se indica una base, en el mismo hilo guarda después los canales en su
+    catálogo, por tandas, para no frenar a la interfaz con listas enormes.
+    """
+    progress = pyqtSignal(int)
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def load(self, source, database=None):
+        threading.Thread(target=self.run, args=(source, database), name="playlist-import", daemon=True).start()
+
+    def run(self, source, database=None):
+        index = ChannelIndex()
+        try:
+            with open_playlist(source) as lines:
+                for channel in iter_m3u(lines):
+                    index.add(channel)
+                    if len(index) % PROGRESS_EVERY == 0:
+                        self.progress.emit(len(index))
+        except (OSError, ValueError) as e:
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(index)
+        if database is not None:
+            self.store_catalog(database, index.channels)
+
+    @staticmethod
+    def store_catalog(database, channels):
+        """Guardar los canales en el catálogo de la base para las búsquedas."""
+        try:
+            for start in range(0, len(channels), CATALOG_BATCH):
+                database.add_catalog((channel.name, channel.url) for channel in channels[start:start + CATALOG_BATCH])
+        except sqlite3.Error as e:
+            print(f"Error al guardar los canales de la lista: {e}")
+
+
+class PlaylistImportDialog(QDialog):
+    """Buscar canales en una lista M3U y asignarlos en bloque a las pantallas de una ventana."""
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.index = ChannelIndex()
+        self.setWindowTitle("Importar Lista M3U")
+        self.resize(600, 500)
+        self.setStyleSheet("background-color: #333; color: white;")
+        input_style = "padding: 5px; border: 1px solid #555; border-radius: 5px; background-color: #222; color: white;"
+
+        layout = QVBoxLayout(self)
+
+        # Origen de la lista (archivo o URL)
+        source_layout = QHBoxLayout()
+        self.source_input = QLineEdit()
+        self.source_input.setPlaceholderText("Archivo .m3u/.m3u8 o URL de la lista...")
+        self.source_input.setStyleSheet(input_style)
+        browse_button = QPushButton("Seleccionar")
+        browse_button.clicked.connect(self.select_file)
+        load_button = QPushButton("Cargar")
+        load_button.clicked.connect(self.load_playlist)
+        source_layout.addWidget(self.source_input)
+        source_layout.addWidget(browse_button)
+        source_layout.addWidget(load_button)
+        layout.addLayout(source_layout)
+
+        # Búsqueda y filtro por grupo
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Buscar por nombre, tvg-id o grupo...")
+        self.search_input.setStyleSheet(input_style)
+        self.search_input.textChanged.connect(self.schedule_search)
+        self.group_combo = QComboBox()
+        self.group_combo.addItem(ALL_GROUPS)
+        self.group_combo.currentIndexChanged.connect(self.refresh_results)
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.group_combo)
+        layout.addLayout(search_layout)
+
+        self.results = QListWidget()
+        self.results.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        layout.addWidget(self.results)
+
+        self.status_label = QLabel("Cargue una lista para empezar.")
+        self.status_label.setStyleSheet("font-size: 11px; color: grey;")
+        layout.addWidget(self.status_label)
+
+        # Destino: desde qué pantalla se asignan los canales seleccionados
+        assign_layout = QHBoxLayout()
+        assign_layout.addWidget(QLabel("Desde la pantalla:"))
+        self.start_spin = QSpinBox()
+        self.start_spin.setRange(1, main_window.max_widgets)
+        assign_layout.addWidget(self.start_spin)
+        assign_button = QPushButton("Asignar Seleccionados")
+        assign_button.clicked.connect(self.assign_selected)
+        assign_layout.addWidget(assign_button)
+        layout.addLayout(assign_layout)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.refresh_results)
+
+        self.loader = PlaylistLoader(self)
+        self.loader.progress.connect(lambda count: self.status_label.setText(f"Leyendo... {count} canales"))
+        self.loader.loaded.connect(self.set_index)
+        self.loader.failed.connect(self.show_error)
+
+    def select_file(self):
+        """Elegir un archivo de lista."""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Seleccionar lista", "", "Listas M3U (*.m3u *.m3u8)")
+        if file_path:
+            self.source_input.setText(file_path)
+            self.load_playlist()
+
+    def load_playlist(self):
+        """Leer la lista en segundo plano."""
+        source = self.source_input.text().strip()
+        if source:
+            self.status_label.setText("Leyendo...")
+            self.loader.load(source, self.main_window.state_store.database)
+
+    def set_index(self, index):
+        """Mostrar la lista recién cargada (sus canales se guardan en la base desde el hilo del cargador)."""
+        self.index = index
+        self.group_combo.blockSignals(True)
+        self.group_combo.clear()
+        self.group_combo.addItem(ALL_GROUPS)
+        for group in sorted(group for group in index.groups if group):
+            self.group_combo.addItem(group)
+        self.group_combo.blockSignals(False)
+        self.refresh_results()
+
+    def show_error(self, message):
+        self.status_label.setText("No se pudo leer la lista.")
+        QMessageBox.warning(self, "Error al Importar", f"No se pudo leer la lista: {message}")
+
+    def schedule_search(self):
+        """Buscar cuando el operador deja de escribir."""
+        self.search_timer.start()
+
+    def refresh_results(self):
+        """Actualizar la lista de resultados con la búsqueda y el grupo actuales."""
+        group = self.group_combo.currentText()
+        results = self.index.search(self.search_input.text(), None if group == ALL_GROUPS else group)
+        self.results.clear()
+        for channel in results:
+            label = f"{channel.name}  [{channel.group}]" if channel.group else channel.name
+            item = QListWidgetItem(label)
+            item.setData(Qt.UserRole, channel)
+            item.setToolTip(channel.url)
+            self.results.addItem(item)
+        more = " (se muestran los primeros)" if len(results) >= MAX_RESULTS else ""
+        self.status_label.setText(f"{len(self.index)} canales, {len(results)} resultados{more}")
+
+    def assign_selected(self):
+        """Asignar los canales seleccionados a pantallas consecutivas de la ventana."""
+        items = sorted(self.results.selectedItems(), key=self.results.row)
+        channels = [item.data(Qt.UserRole) for item in items]
+        if not channels:
+            return
+        assigned = self.main_window.assign_channels(channels, self.start_spin.value() - 1)
+        self.status_label.setText(f"{assigned} canales asignados")
+        if assigned < len(channels):
+            QMessageBox.information(self, "Límite Alcanzado",
+                                    f"Solo se asignaron {assigned} canales: no hay más pantallas disponibles.")
@@ -0,0 +1,138 @@
+import http.client
+import threading
+import urllib.parse
+import urllib.request
+from PyQt5.QtCore import QObject, QCoreApplication, pyqtSignal
+from hls_playlist import parse_playlist
+
+# Calidad con la que se abre un stream: la de la pantalla de la cuadrícula, la de pantalla
+# completa, o la baja (cuadrícula sin filtro de bloques, solo si se elige en "grid_tier")
+TIER_TILE = "tile"
+TIER_FULL = "full"
+TIER_LOW = "low"
+
+# Valores por defecto (se pueden cambiar en multiviewer_config.json bajo la clave "quality")
+DEFAULT_QUALITY_SETTINGS = {
+    "hls_variant": True,    # En la cuadrícula, limitar HLS a la variante más baja que cubra la pantalla
+    "skip_loop_filter": 0,  # --avcodec-skiploopfilter en la cuadrícula (0 ninguno ... 4 todos)
+    "skip_frame": 0,        # --avcodec-skip-frame en la cuadrícula (1 = omitir cuadros sin referencia)
+    "threads": 2,           # --avcodec-threads en la cuadrícula (0 = automático)
+    "grid_tier": TIER_TILE,  # "low" para paredes sin CPU suficiente (imagen visiblemente peor)
+    "low_skip_loop_filter": 4,  # --avcodec-skiploopfilter en la calidad baja
+}
+# Segundos de espera al leer la lista maestra antes de abrir el stream sin límite
+MASTER_TIMEOUT = 5.0
+
+_policy = None
+
+
+def get_quality_policy():
+    """Obtener la política de calidad única de la aplicación."""
+    global _policy
+    if _policy is None:
+        _policy = QualityPolicy(parent=QCoreApplication.instance())
+    return _policy
+
+
+def is_hls_url(url):
+    return urllib.parse.urlsplit(url).path.lower().endswith((".m3u8", ".m3u"))
+
+
+def choose_variant(variants, width, height):
+    """La variante más baja cuya resolución cubre `width` x `height` (o la más alta si ninguna alcanza).
+
+    Devuelve None si la lista no informa resoluciones.
+    """
+    sized = sorted((variant for variant in variants if variant.resolution),
+                   key=lambda variant: (variant.resolution[0] * variant.resolution[1], variant.bandwidth))
+    if not sized:
+        return None
+    for variant in sized:
+        if variant.resolution[0] >= width and variant.resolution[1] >= height:
+            return variant
+    return sized[-1]
+
+
+def read_variants(url):
+    """Descargar una lista HLS y devolver sus variantes ([] si es una lista de medios)."""
+    with urllib.request.urlopen(url, timeout=MASTER_TIMEOUT) as response:
+        playlist = parse_playlist(response.read().decode("utf-8", "replace"), response.geturl())
+    return playlist.variants if playlist.is_master else []
+
+
+class QualityPolicy(QObject):
+    """Opciones de libvlc con las que cada pantalla abre su stream según su tamaño.
+
+    En la cuadrícula los streams HLS se limitan (con --adaptive-maxwidth/height)
+    a la variante más baja que cubre la pantalla (y, solo en la calidad baja, el
+    decodificador omite el filtro de bloques); en pantalla completa se abren
+    sin límites. Las listas
+    maestras se leen una vez en un hilo aparte y se recuerdan por URL.
+    """
+    resolved = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.settings = dict(DEFAULT_QUALITY_SETTINGS)
+        self.variants = {}  # URL -> variantes de la lista maestra (None si no se pudo leer)
+        self.waiting = {}  # URL -> funciones a llamar cuando se conozcan sus variantes
+        self.resolved.connect(self.deliver)
+
+    def configure(self, settings):
+        """Aplicar la configuración sobre los valores por defecto."""
+        self.settings.update(settings or {})
+
+    def grid_tier(self):
+        """Calidad de las pantallas en la cuadrícula: la normal o, si se configuró, la baja."""
+        return TIER_LOW if self.settings["grid_tier"] == TIER_LOW else TIER_TILE
+
+    def decode_options(self, tier):
+        """Opciones del decodificador para una calidad."""
+        if tier == TIER_FULL:
+            return []
+        skip_loop_filter = self.settings["low_skip_loop_filter" if tier == TIER_LOW else "skip_loop_filter"]
+        return [f":avcodec-skiploopfilter={int(skip_loop_filter)}",
+                f":avcodec-skip-frame={int(self.settings['skip_frame'])}",
+                f":avcodec-threads={int(self.settings['threads'])}"]
+
+    def prepare(self, url, tier, width, height, ready):
+        """Llamar a `ready(opciones)` con las opciones para abrir `url`.
+
+        Si hay que leer antes la lista maestra, la llamada llega más tarde en
+        el hilo de la interfaz; si no, se hace enseguida.
+        """
+        options = self.decode_options(tier)
+        if tier == TIER_FULL or not self.settings["hls_variant"] or not is_hls_url(url):
+            ready(options)
+            return
+        if url not in self.variants:
+            callbacks = self.waiting.setdefault(url, [])
+            callbacks.append(lambda: self.prepare(url, tier, width, height, ready))
+            if len(callbacks) == 1:
+                threading.Thread(target=self.resolve, args=(url,), name="hls-variants", daemon=True).start()
+            return
+        variant = choose_variant(self.variants[url] or [], width, height)
+        if variant is not None:
+            options += [f":adaptive-maxwidth={variant.resolution[0]}",
+                        f":adaptive-maxheight={variant.resolution[1]}"]
+        ready(options)
+
+    def resolve(self, url):
+        """Leer la lista maestra (en un hilo aparte)."""
+        variants = None
+        try:
+            variants = read_variants(url)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            print(f"No se pudo leer la lista HLS {url}: {e!r}")
+        finally:
+            # Pase lo que pase, las pantallas que esperan se abren (sin límite de variante si falló)
+            self.variants[url] = variants
+            self.resolved.emit(url)
+
+    def deliver(self, url):
+        """Abrir los streams que esperaban las variantes de `url`."""
+        for callback in self.waiting.pop(url, []):
+            callback()
+        if self.variants.get(url) is None:
+            # Se vuelve a intentar leerla la próxima vez que se abra el stream
+            self.variants.pop(url, None)
@@ -0,0 +1,164 @@
+import random
+import time
+import vlc
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from alarm_bus import get_alarm_bus, SEVERITY_WARNING, SEVERITY_CRITICAL
+
+STATE_IDLE = "idle"
+STATE_CONNECTING = "connecting"
+STATE_PLAYING = "playing"
+STATE_RETRYING = "retrying"
+STATE_FAILED = "failed"
+
+STATE_LABELS = {
+    STATE_IDLE: "Detenido",
+    STATE_CONNECTING: "Conectando...",
+    STATE_PLAYING: "En reproducción",
+    STATE_RETRYING: "Reintentando",
+    STATE_FAILED: "Sin conexión",
+}
+STATE_COLORS = {
+    STATE_IDLE: "#888",
+    STATE_CONNECTING: "#8ab4f8",
+    STATE_PLAYING: "#5c5",
+    STATE_RETRYING: "#f5c542",
+    STATE_FAILED: "#ff5555",
+}
+
+# Primer reintento a los ~1 s, duplicando hasta un máximo de 60 s
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# Reintentos seguidos antes de dar el stream por caído
+MAX_RETRIES = 12
+# Segundos sin avance del tiempo de reproducción que se consideran un bloqueo
+STALL_TIMEOUT = 15.0
+# Segundos reproduciendo sin fallos para volver a empezar la cuenta de reintentos
+STABLE_AFTER = 30.0
+
+ALARM_PLAYBACK_ERROR = "playback_error"
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Retardo exponencial con jitter para el reintento número `attempt` (desde 0).
+
+    La mitad del retardo es fija y la otra mitad aleatoria: así, cuando vuelve un
+    codificador compartido, las pantallas no reconectan todas en el mismo instante.
+    """
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2.0 + random.uniform(0.0, delay / 2.0)
+
+
+class ReconnectSupervisor(QObject):
+    """Supervisa el reproductor de una pantalla y reabre el stream si se cae.
+
+    Escucha los eventos de error y fin de libvlc y vigila que el tiempo de
+    reproducción avance; ante un fallo vuelve a abrir el stream con retardo
+    exponencial y jitter hasta un máximo de reintentos.
+    """
+    state_changed = pyqtSignal(str)
+    player_event = pyqtSignal(str)  # Eventos de libvlc trasladados al hilo de la interfaz
+
+    def __init__(self, player, start_stream, alarm_source, alarm_label, parent=None):
+        super().__init__(parent)
+        self.player = player
+        self.start_stream = start_stream
+        self.alarm_source = alarm_source
+        self.alarm_label = alarm_label
+        self.state = STATE_IDLE
+        self.active = False
+        self.attempt = 0
+        self.last_time = None
+        self.last_progress = time.monotonic()
+        self.playing_since = None
+
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.retry)
+
+        self.player_event.connect(self.handle_event)
+        events = player.event_manager()
+        events.event_attach(vlc.EventType.MediaPlayerPlaying, self.on_vlc_event, "playing")
+        events.event_attach(vlc.EventType.MediaPlayerEncounteredError, self.on_vlc_event, "error")
+        events.event_attach(vlc.EventType.MediaPlayerEndReached, self.on_vlc_event, "ended")
+
+    def on_vlc_event(self, event, name):
+        """Callback de libvlc (hilo de VLC): solo reenvía el evento."""
+        self.player_event.emit(name)
+
+    def set_state(self, state):
+        """Cambiar de estado y avisar a la pantalla."""
+        if state != self.state:
+            self.state = state
+            self.state_changed.emit(state)
+
+    def start(self):
+        """El operador inició la reproducción: empezar a supervisar."""
+        self.active = True
+        self.attempt = 0
+        self.retry_timer.stop()
+        get_alarm_bus().clear_alarm(self.alarm_source, ALARM_PLAYBACK_ERROR)
+        self.mark_progress()
+        self.set_state(STATE_CONNECTING)
+
+    def stop(self):
+        """El operador detuvo la reproducción: no reconectar."""
+        self.active = False
+        self.retry_timer.stop()
+        get_alarm_bus().clear_alarm(self.alarm_source, ALARM_PLAYBACK_ERROR)
+        self.set_state(STATE_IDLE)
+
+    def mark_progress(self):
+        """Reiniciar la vigilancia de bloqueo."""
+        self.last_time = None
+        self.last_progress = time.monotonic()
+
+    def handle_event(self, name):
+        """Reaccionar a un evento del reproductor en el hilo de la interfaz."""
+        if not self.active:
+            return
+        if name == "playing":
+            # La cuenta de reintentos se reinicia cuando el stream se mantiene estable
+            self.playing_since = time.monotonic()
+            self.mark_progress()
+            get_alarm_bus().clear_alarm(self.alarm_source, ALARM_PLAYBACK_ERROR)
+            self.set_state(STATE_PLAYING)
+        elif self.state in (STATE_CONNECTING, STATE_PLAYING):
+            self.schedule_retry()
+
+    def check_stall(self, now):
+        """Detectar un stream bloqueado (el tiempo de reproducción no avanza)."""
+        if not self.active or self.state not in (STATE_CONNECTING, STATE_PLAYING):
+            return
+        if (self.state == STATE_PLAYING and self.attempt
+                and now - self.playing_since >= STABLE_AFTER):
+            self.attempt = 0
+        current = self.player.get_time()
+        if current != self.last_time:
+            self.last_time = current
+            self.last_progress = now
+        elif now - self.last_progress >= STALL_TIMEOUT:
+            self.schedule_retry()
+
+    def schedule_retry(self):
+        """Programar el siguiente reintento o dar el stream por caído."""
+        bus = get_alarm_bus()
+        self.player.stop()
+        if self.attempt >= MAX_RETRIES:
+            bus.raise_alarm(self.alarm_source, ALARM_PLAYBACK_ERROR, SEVERITY_CRITICAL,
+                            "Stream caído", self.alarm_label())
+            self.set_state(STATE_FAILED)
+            return
+        delay = backoff_delay(self.attempt)
+        self.attempt += 1
+        bus.raise_alarm(self.alarm_source, ALARM_PLAYBACK_ERROR, SEVERITY_WARNING,
+                        "Reconectando", self.alarm_label())
+        self.set_state(STATE_RETRYING)
+        self.retry_timer.start(int(delay * 1000))
+
+    def retry(self):
+        """Volver a abrir el stream."""
+        if not self.active:
+            return
+        self.mark_progress()
+        self.set_state(STATE_CONNECTING)
+        self.start_stream()
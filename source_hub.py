@@ -0,0 +1,198 @@
+import socket
+import urllib.parse
+import time
+import vlc
+from PyQt5.QtCore import QTimer
+from vlc_pool import get_vlc_instance
+
+# Esquemas de red que vale la pena compartir (multicast udp/rtp ya se comparte solo)
+SHARED_SCHEMES = ("http", "https", "rtsp", "rtmp", "srt")
+DEFAULT_PORTS = {"http": 80, "https": 443, "rtsp": 554, "rtmp": 1935}
+# Los relés locales solo escuchan en la propia máquina
+RELAY_HOST = "127.0.0.1"
+# Espera a que el relé acepte conexiones antes de repartir su URL
+RELAY_POLL_MS = 200
+RELAY_READY_TIMEOUT = 10.0
+# Puertos distintos que se prueban si el relé no consigue escuchar
+RELAY_BIND_ATTEMPTS = 3
+
+_hub = None
+
+
+def get_source_hub():
+    """Obtener el concentrador de fuentes único de la aplicación."""
+    global _hub
+    if _hub is None:
+        _hub = SourceHub()
+    return _hub
+
+
+def normalize_url(url):
+    """Clave de una fuente: la misma URL escrita de formas equivalentes da la misma clave."""
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username:
+        credentials = parts.username + (f":{parts.password}" if parts.password else "")
+        host = f"{credentials}@{host}"
+    return urllib.parse.urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def free_port():
+    """Puerto TCP libre en la interfaz local para un relé."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((RELAY_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def port_accepts(port):
+    """¿Hay algo escuchando ya en ese puerto local?"""
+    try:
+        with socket.create_connection((RELAY_HOST, port), timeout=0.1):
+            return True
+    except OSError:
+        return False
+
+
+class Source:
+    """Una fuente remota y las pantallas que la muestran."""
+    def __init__(self, key, url):
+        self.key = key
+        self.url = url
+        self.holders = {}  # pantalla -> función que reabre su stream
+        self.relay = None
+        self.port = None
+        self.local_url = None  # solo se fija cuando el relé ya acepta conexiones
+        self.deadline = 0.0
+        self.attempts = 0
+
+
+class SourceHub:
+    """Descarga cada stream remoto una sola vez aunque lo muestren varias pantallas.
+
+    Mientras una fuente tiene una sola pantalla, esta se conecta directamente.
+    Cuando una segunda pantalla pide la misma URL se levanta un relé local (un
+    reproductor de libvlc con salida `#http`) que hace la única conexión remota,
+    y todas las pantallas de esa fuente pasan a leer del relé. El relé se
+    cierra cuando la última pantalla deja la fuente.
+
+    Hasta que el relé acepta conexiones en su puerto las pantallas siguen
+    conectadas directamente; entonces se les pide que se reconecten al relé.
+    Si el relé no llega a escuchar (p. ej. otro proceso ocupó el puerto) se
+    vuelve a intentar en otro puerto.
+    """
+    def __init__(self):
+        self.enabled = True
+        self.sources = {}  # clave -> Source
+        self.holder_keys = {}  # pantalla -> clave de la fuente que muestra
+        self.poll_timer = None
+
+    def configure(self, enabled):
+        """Activar o desactivar el uso compartido para las próximas conexiones."""
+        self.enabled = bool(enabled)
+
+    def acquire(self, holder, url, restart):
+        """Registrar que `holder` muestra `url` y devolver la URL que debe abrir.
+
+        `restart` se llama si la pantalla tiene que reconectarse al relé
+        porque otra pantalla empezó a mostrar la misma fuente.
+        """
+        parts = urllib.parse.urlsplit(url)
+        # Lo que ya se sirve en esta máquina (p. ej. el proxy HLS) no necesita relé
+        if not self.enabled or parts.scheme.lower() not in SHARED_SCHEMES or parts.hostname == RELAY_HOST:
+            self.release(holder)
+            return url
+        key = normalize_url(url)
+        if self.holder_keys.get(holder) not in (None, key):
+            self.release(holder)
+        source = self.sources.get(key)
+        if source is None:
+            source = self.sources[key] = Source(key, url)
+        source.holders[holder] = restart
+        self.holder_keys[holder] = key
+
+        if source.relay is None:
+            if len(source.holders) < 2:
+                return url
+            source.attempts = 0
+            self.start_relay(source)
+        elif source.local_url is None:
+            # El relé aún no escucha: mientras tanto, conexión directa
+            pass
+        elif source.relay.get_state() in (vlc.State.Ended, vlc.State.Error, vlc.State.Stopped):
+            # Se cayó la fuente remota: la primera pantalla que reintenta reabre el relé
+            source.relay.stop()
+            source.relay.play()
+        return source.local_url or url
+
+    def release(self, holder):
+        """La pantalla dejó de mostrar su fuente; cerrar el relé si era la última."""
+        key = self.holder_keys.pop(holder, None)
+        if key is None:
+            return
+        source = self.sources[key]
+        source.holders.pop(holder, None)
+        if not source.holders:
+            self.stop_relay(source)
+            del self.sources[key]
+
+    def start_relay(self, source):
+        """Abrir la conexión remota una vez y servirla en un puerto local.
+
+        La URL local no se reparte hasta que `poll_relays` ve el puerto escuchando.
+        """
+        instance = get_vlc_instance()
+        source.attempts += 1
+        source.port = free_port()
+        media = instance.media_new(source.url)
+        media.add_option(f":sout=#http{{mux=ts,dst={RELAY_HOST}:{source.port}/}}")
+        media.add_option(":sout-all")
+        media.add_option(":sout-keep")
+        source.relay = instance.media_player_new()
+        source.relay.set_media(media)
+        source.relay.play()
+        source.local_url = None
+        source.deadline = time.monotonic() + RELAY_READY_TIMEOUT
+        if self.poll_timer is None:
+            self.poll_timer = QTimer()
+            self.poll_timer.setInterval(RELAY_POLL_MS)
+            self.poll_timer.timeout.connect(self.poll_relays)
+        self.poll_timer.start()
+
+    def poll_relays(self):
+        """Repartir la URL de los relés que ya escuchan y reintentar los que fallaron."""
+        pending = False
+        for source in list(self.sources.values()):
+            if source.relay is None or source.local_url is not None:
+                continue
+            if port_accepts(source.port):
+                source.local_url = f"http://{RELAY_HOST}:{source.port}/"
+                # Las pantallas conectadas directamente pasan al relé
+                for restart in list(source.holders.values()):
+                    restart()
+                continue
+            failed = source.relay.get_state() == vlc.State.Error
+            if not failed and time.monotonic() < source.deadline:
+                pending = True
+                continue
+            # No consiguió escuchar en ese puerto: probar con otro
+            self.stop_relay(source)
+            if source.attempts < RELAY_BIND_ATTEMPTS:
+                print(f"El relé de {source.url} no escucha en el puerto local; reintentando")
+                self.start_relay(source)
+                pending = True
+            else:
+                print(f"No se pudo abrir el relé de {source.url}; las pantallas siguen conectadas directamente")
+        if not pending:
+            self.poll_timer.stop()
+
+    def stop_relay(self, source):
+        """Cerrar el relé y la conexión remota de una fuente."""
+        if source.relay is not None:
+            source.relay.stop()
+            source.relay.release()
+            source.relay = None
+            source.port = None
+            source.local_url = None
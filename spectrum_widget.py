@@ -0,0 +1,115 @@
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPainter, QPolygonF, QColor, QPen
+from PyQt5.QtWidgets import QWidget
+from audio_meter import SPECTRUM_BANDS
+
+# Fracción del nivel anterior que se conserva en cada actualización (caída suave)
+DECAY = 0.7
+# Actualizaciones que se mantiene el pico antes de empezar a bajar
+PEAK_HOLD = 10
+# Cuánto baja el pico (sobre 100) en cada actualización, una vez vencida la espera
+PEAK_FALL = 2.0
+BACKGROUND_COLOR = QColor("#333")
+FILL_COLOR = QColor("#1f5f1f")
+LINE_COLOR = QColor(0, 255, 0)
+PEAK_COLOR = QColor("#cfc")
+
+
+def polygon_array(polygon, points):
+    """Vista de NumPy (puntos x 2) sobre la memoria de un QPolygonF, sin copiarla."""
+    data = polygon.data()
+    data.setsize(points * 2 * np.dtype(np.float64).itemsize)
+    return np.frombuffer(data, dtype=np.float64).reshape(points, 2)
+
+
+class SpectrumWidget(QWidget):
+    """Espectro de una pantalla dibujado con QPainter sobre búferes reservados una sola vez.
+
+    Los niveles y picos viven en arreglos fijos que se actualizan en el lugar
+    (subida inmediata, caída exponencial y retención de picos, todo vectorizado).
+    Las coordenadas se escriben directamente en la memoria de dos QPolygonF,
+    así que cada repintado es una única pasada sin crear objetos nuevos.
+    """
+    def __init__(self, height, bands=SPECTRUM_BANDS, parent=None):
+        super().__init__(parent)
+        self.setFixedHeight(height)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.levels = np.zeros(bands, dtype=np.float64)
+        self.peaks = np.zeros(bands, dtype=np.float64)
+        self.peak_age = np.zeros(bands, dtype=np.int32)
+        self.rising = np.zeros(bands, dtype=bool)
+        self.falling = np.zeros(bands, dtype=bool)
+
+        # Área rellena: las bandas más dos esquinas sobre la base
+        self.area = QPolygonF(bands + 2)
+        self.area_points = polygon_array(self.area, bands + 2)
+        self.peak_line = QPolygonF(bands)
+        self.peak_points = polygon_array(self.peak_line, bands)
+        # Sin antialiasing ni transparencias: el relleno por software es mucho más barato
+        self.line_pen = QPen(LINE_COLOR, 1)
+        self.peak_pen = QPen(PEAK_COLOR, 1.0)
+        self.update_geometry()
+
+    def update_geometry(self):
+        """Recalcular las posiciones horizontales y la escala al cambiar de tamaño."""
+        width, height = float(self.width()), float(self.height())
+        self.scale = height / 100.0
+        self.area_points[1:-1, 0] = np.linspace(0.0, width, len(self.levels))
+        self.area_points[0] = (0.0, height)
+        self.area_points[-1] = (width, height)
+        self.peak_points[:, 0] = self.area_points[1:-1, 0]
+        self.update_points()
+
+    def update_points(self):
+        """Pasar niveles y picos (0-100) a coordenadas verticales, en el lugar."""
+        height = float(self.height())
+        np.multiply(self.levels, -self.scale, out=self.area_points[1:-1, 1])
+        self.area_points[1:-1, 1] += height
+        np.multiply(self.peaks, -self.scale, out=self.peak_points[:, 1])
+        self.peak_points[:, 1] += height
+
+    def set_spectrum(self, spectrum):
+        """Incorporar un espectro nuevo (0-100 por banda) y repintar si hace falta."""
+        if not spectrum.any() and not self.peaks.any():
+            return  # Sigue en silencio y ya no queda nada que caiga
+        # Subida inmediata y caída exponencial
+        self.levels *= DECAY
+        np.maximum(self.levels, spectrum, out=self.levels)
+        # Retención de picos: se reinicia la espera donde el nivel alcanza el pico
+        self.peak_age += 1
+        np.greater_equal(self.levels, self.peaks, out=self.rising)
+        np.copyto(self.peak_age, 0, where=self.rising)
+        np.greater(self.peak_age, PEAK_HOLD, out=self.falling)
+        np.subtract(self.peaks, PEAK_FALL, out=self.peaks, where=self.falling)
+        np.maximum(self.peaks, self.levels, out=self.peaks)
+        np.maximum(self.peaks, 0.0, out=self.peaks)
+        # Lo que ya casi no se ve pasa a cero para que el silencio deje de repintar
+        np.less(self.peaks, 0.5, out=self.falling)
+        np.copyto(self.peaks, 0.0, where=self.falling)
+        np.copyto(self.levels, 0.0, where=self.falling)
+        self.update_points()
+        self.update()
+
+    def clear(self):
+        """Volver a cero (al detener la pantalla)."""
+        self.levels[:] = 0.0
+        self.peaks[:] = 0.0
+        self.peak_age[:] = 0
+        self.update_points()
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_geometry()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), BACKGROUND_COLOR)
+        if self.peaks.any():
+            painter.setPen(self.line_pen)
+            painter.setBrush(FILL_COLOR)
+            painter.drawPolygon(self.area)
+            painter.setPen(self.peak_pen)
+            painter.drawPolyline(self.peak_line)
+        painter.end()
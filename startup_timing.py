@@ -0,0 +1,31 @@
+import json
+import os
+import time
+
+# Instante de referencia: el primer import de este módulo (al inicio del programa)
+T0 = time.perf_counter()
+# Si está definida, los hitos también se añaden a este archivo (para las mediciones)
+STARTUP_LOG_ENV = "MULTIVIEWER_STARTUP_LOG"
+
+_marks = {}
+
+
+def mark(event):
+    """Registrar la primera vez que se alcanza un hito del arranque."""
+    if event in _marks:
+        return
+    elapsed = time.perf_counter() - T0
+    _marks[event] = elapsed
+    print(f"Arranque: {event} a los {elapsed:.2f} s")
+    path = os.environ.get(STARTUP_LOG_ENV)
+    if path:
+        try:
+            with open(path, 'a') as file:
+                file.write(json.dumps({"event": event, "seconds": round(elapsed, 4)}) + "\n")
+        except OSError as e:
+            print(f"Error al escribir los tiempos de arranque: {e}")
+
+
+def marks():
+    """Hitos alcanzados hasta ahora y sus segundos desde el inicio."""
+    return dict(_marks)
@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import time
+from PyQt5.QtCore import QObject, QTimer, QCoreApplication
+from channel_db import ChannelDatabase, database_path
+
+# Tiempo de espera tras la última edición antes de escribir en disco
+FLUSH_DELAY_MS = 500
+# Tiempo máximo que un cambio puede quedar pendiente mientras se sigue escribiendo
+FLUSH_MAX_WAIT = 3.0
+
+_stores = {}
+
+
+def get_state_store(path):
+    """Obtener el almacén de estado compartido del proceso para un archivo de URLs (urls.json -> urls.db)."""
+    path = os.path.abspath(path)
+    store = _stores.get(path)
+    if store is None:
+        store = StateStore(path)
+        _stores[path] = store
+    return store
+
+
+def flush_all_stores():
+    """Escribir en disco los cambios pendientes de todos los almacenes."""
+    for store in _stores.values():
+        store.flush()
+
+
+class StateStore(QObject):
+    """Estado en memoria de la pared compartido por todas las ventanas y pantallas.
+
+    El estado se lee una vez de la base de canales (importando el urls.json la
+    primera vez) y conserva su forma {"window_N": {"urls", "names", "num_widgets"}}.
+    Las ediciones se aplican en memoria y se marcan como pendientes; la escritura
+    se agrupa tras un breve retardo en una sola transacción que solo toca las
+    pantallas y ventanas que cambiaron, para no bloquear la interfaz en cada tecla.
+    """
+    def __init__(self, path, flush_delay_ms=FLUSH_DELAY_MS, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.database = ChannelDatabase(database_path(path), legacy_json=path)
+        self.state = self.database.load_layout()
+        self.dirty_tiles = set()  # (ventana, índice)
+        self.dirty_windows = set()
+        self.dirty = False
+        self.dirty_since = None
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(flush_delay_ms)
+        self.flush_timer.timeout.connect(self.flush)
+
+        # Asegurar que nada quede pendiente al cerrar la aplicación
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.flush)
+
+    def window_state(self, window_number):
+        """Devolver (creándolo si hace falta) el bloque de una ventana."""
+        window = self.state.setdefault(f'window_{window_number}', {})
+        window.setdefault('urls', {})
+        window.setdefault('names', {})
+        return window
+
+    def get_url(self, window_number, index):
+        """Obtener la URL guardada de una pantalla."""
+        window = self.state.get(f'window_{window_number}', {})
+        return window.get('urls', {}).get(str(index), '')
+
+    def get_name(self, window_number, index):
+        """Obtener el nombre guardado de una pantalla."""
+        window = self.state.get(f'window_{window_number}', {})
+        return window.get('names', {}).get(str(index), '')
+
+    def set_url(self, window_number, index, url):
+        """Actualizar la URL de una pantalla."""
+        self.set_value(window_number, 'urls', index, url)
+
+    def set_name(self, window_number, index, name):
+        """Actualizar el nombre de una pantalla."""
+        self.set_value(window_number, 'names', index, name)
+
+    def set_value(self, window_number, section, index, value):
+        """Actualizar una entrada y programar la escritura solo si cambió."""
+        entries = self.window_state(window_number)[section]
+        if entries.get(str(index)) == value:
+            return
+        entries[str(index)] = value
+        self.dirty_tiles.add((window_number, int(index)))
+        self.mark_dirty()
+
+    def get_num_widgets(self, window_number, default=8):
+        """Obtener el número de pantallas guardado para una ventana."""
+        window = self.state.get(f'window_{window_number}', {})
+        return window.get('num_widgets', default)
+
+    def set_num_widgets(self, window_number, num_widgets):
+        """Actualizar el número de pantallas de una ventana."""
+        window = self.window_state(window_number)
+        if window.get('num_widgets') == num_widgets:
+            return
+        window['num_widgets'] = num_widgets
+        self.dirty_windows.add(window_number)
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """Marcar el estado como pendiente y reprogramar la escritura diferida."""
+        now = time.monotonic()
+        if not self.dirty:
+            self.dirty = True
+            self.dirty_since = now
+        # Reiniciar el retardo salvo que el cambio lleve demasiado tiempo esperando
+        if now - self.dirty_since < FLUSH_MAX_WAIT or not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        """Guardar en la base, en una sola transacción, las pantallas y ventanas que cambiaron."""
+        self.flush_timer.stop()
+        if not self.dirty:
+            return
+        try:
+            with self.database.transaction():
+                for window_number, index in sorted(self.dirty_tiles):
+                    self.database.save_tile(window_number, index,
+                                            self.get_url(window_number, index),
+                                            self.get_name(window_number, index))
+                for window_number in sorted(self.dirty_windows):
+                    self.database.save_window(window_number, self.get_num_widgets(window_number))
+                self.database.prune_channels()
+        except sqlite3.Error as e:
+            print(f"Error al guardar el estado en {self.database.path}: {e}")
+            return
+        self.dirty_tiles.clear()
+        self.dirty_windows.clear()
+        self.dirty = False
+        self.dirty_since = None
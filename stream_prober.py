@@ -0,0 +1,331 @@
+"""Comprobación previa de todas las fuentes del MultiViewer, sin interfaz.
+
+Uso:
+    python stream_prober.py [--state urls.json] [--playlist lista.m3u8 ...] [URL ...]
+                            [--concurrency 16] [--timeout 10] [--report informe.json]
+    python stream_prober.py --self-test
+
+Reúne las URL de todas las ventanas de la pared (urls.db, o urls.json si aún
+no se migró), de las listas M3U indicadas y de la línea de comandos, y
+comprueba cada fuente una sola vez en paralelo: conexión, respuesta HTTP y
+tiempo hasta el primer byte; en HLS, la lista maestra, la de medios y la
+descarga del primer segmento (tasa y margen respecto al tiempo real). El
+resultado se muestra como tabla y se guarda en JSON.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from channel_db import default_urls_file, read_state
+from hls_playlist import is_playlist, parse_playlist
+from playlist_import import iter_m3u, open_playlist
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 10.0
+# Bytes máximos que se descargan de un segmento o de un stream continuo
+MAX_SAMPLE_BYTES = 4 * 1024 * 1024
+# Segundos máximos de lectura de un stream continuo (por ejemplo .ts por HTTP)
+MAX_SAMPLE_SECONDS = 3.0
+READ_CHUNK = 64 * 1024
+USER_AGENT = "MultiViewer-Prober/1.0"
+# Puerto por defecto de los esquemas que se comprueban con una conexión TCP
+TCP_PORTS = {"rtsp": 554, "rtmp": 1935}
+
+
+class ProbeResult:
+    """Resultado de la comprobación de una fuente."""
+    def __init__(self, url, sources):
+        self.url = url
+        self.sources = sources  # Dónde aparece (ventana/pantalla o lista)
+        self.ok = False
+        self.checked = True  # False si el esquema no se puede comprobar sin abrir el stream (udp, srt...)
+        self.kind = None  # "hls", "http", "tcp" o None si no se puede comprobar
+        self.error = None
+        self.http_status = None
+        self.ttfb_ms = None
+        self.variants = None
+        self.variant_bandwidth = None
+        self.target_duration = None
+        self.segments = None
+        self.live = None
+        self.sample_bytes = None
+        self.sample_seconds = None
+        self.rate_kbps = None
+        self.realtime_factor = None  # Segundos de contenido por segundo de descarga
+
+    def as_record(self):
+        return dict(vars(self))
+
+
+def collect_sources(state_path=None, playlists=(), urls=()):
+    """Reunir las URL a comprobar (sin repetir) y dónde aparece cada una."""
+    sources = {}
+
+    def add(url, where):
+        url = url.strip()
+        if url:
+            sources.setdefault(url, []).append(where)
+
+    if state_path:
+        state = read_state(state_path)
+        for window, data in sorted(state.items()):
+            for index, url in sorted(data.get("urls", {}).items()):
+                add(url, f"{window}/{index}")
+    for playlist in playlists:
+        with open_playlist(playlist) as lines:
+            for channel in iter_m3u(lines):
+                add(channel.url, f"{os.path.basename(playlist)}: {channel.name}")
+    for url in urls:
+        add(url, "línea de comandos")
+    return sources
+
+
+def http_get(url, timeout):
+    """Abrir una URL y devolver (respuesta, milisegundos hasta recibir la respuesta)."""
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    start = time.perf_counter()
+    response = urllib.request.urlopen(request, timeout=timeout)
+    return response, (time.perf_counter() - start) * 1000.0
+
+
+def read_sample(response, max_bytes=MAX_SAMPLE_BYTES, max_seconds=None):
+    """Leer hasta `max_bytes` (o `max_seconds`) y devolver (bytes leídos, segundos)."""
+    total = 0
+    start = time.perf_counter()
+    while total < max_bytes:
+        chunk = response.read(min(READ_CHUNK, max_bytes - total))
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_seconds is not None and time.perf_counter() - start >= max_seconds:
+            break
+    return total, time.perf_counter() - start
+
+
+def probe_tcp(result, parts, timeout):
+    """Comprobar que el servidor acepta conexiones (RTSP/RTMP)."""
+    result.kind = "tcp"
+    start = time.perf_counter()
+    with socket.create_connection((parts.hostname, parts.port or TCP_PORTS[parts.scheme]), timeout=timeout):
+        result.ttfb_ms = (time.perf_counter() - start) * 1000.0
+    result.ok = True
+
+
+def probe_hls(result, playlist, url, timeout):
+    """Seguir la lista maestra hasta la de medios y descargar el primer segmento."""
+    result.kind = "hls"
+    if playlist.is_master:
+        result.variants = len(playlist.variants)
+        # Se prueba la calidad más alta: es la que más exige a la red
+        variant = max(playlist.variants, key=lambda variant: variant.bandwidth)
+        result.variant_bandwidth = variant.bandwidth
+        with http_get(variant.uri, timeout)[0] as response:
+            url = response.geturl()
+            playlist = parse_playlist(response.read().decode("utf-8", "replace"), url)
+        if playlist.is_master:
+            raise ValueError("La variante apunta a otra lista maestra")
+    result.target_duration = playlist.target_duration
+    result.segments = len(playlist.segments)
+    result.live = not playlist.ended
+    if not playlist.segments:
+        raise ValueError("La lista de medios no tiene segmentos")
+    segment = playlist.segments[0]
+    with http_get(segment.uri, timeout)[0] as response:
+        result.sample_bytes, result.sample_seconds = read_sample(response)
+    if result.sample_seconds > 0:
+        result.rate_kbps = result.sample_bytes * 8 / 1000.0 / result.sample_seconds
+        result.realtime_factor = segment.duration / result.sample_seconds
+    result.ok = True
+
+
+def probe_source(url, sources, timeout=DEFAULT_TIMEOUT):
+    """Comprobar una fuente y devolver su ProbeResult (nunca lanza excepciones)."""
+    result = ProbeResult(url, sources)
+    parts = urllib.parse.urlsplit(url)
+    try:
+        if parts.scheme in TCP_PORTS:
+            probe_tcp(result, parts, timeout)
+        elif parts.scheme in ("http", "https"):
+            response, result.ttfb_ms = http_get(url, timeout)
+            with response:
+                result.http_status = response.status
+                head = response.read(7)
+                if is_playlist(head):
+                    text = (head + response.read()).decode("utf-8", "replace")
+                    probe_hls(result, parse_playlist(text, response.geturl()), url, timeout)
+                else:
+                    # Stream continuo (por ejemplo MPEG-TS por HTTP): medir la tasa de llegada
+                    result.kind = "http"
+                    result.sample_bytes, result.sample_seconds = read_sample(
+                        response, max_seconds=MAX_SAMPLE_SECONDS)
+                    result.sample_bytes += len(head)
+                    if result.sample_seconds > 0:
+                        result.rate_kbps = result.sample_bytes * 8 / 1000.0 / result.sample_seconds
+                    result.ok = result.sample_bytes > 0
+                    if not result.ok:
+                        result.error = "Respuesta vacía"
+        else:
+            result.checked = False
+            result.error = f"Esquema '{parts.scheme}' sin comprobación"
+    except urllib.error.HTTPError as e:
+        result.http_status = e.code
+        result.error = f"HTTP {e.code}"
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        result.error = str(getattr(e, "reason", e))
+    except http.client.HTTPException as e:
+        # Respuesta que no es HTTP válido (línea de estado o cabeceras rotas)
+        result.error = f"Respuesta HTTP inválida: {e!r}"
+    return result
+
+
+def probe_all(sources, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, progress=None):
+    """Comprobar todas las fuentes con un máximo de `concurrency` a la vez."""
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="probe") as executor:
+        futures = [executor.submit(probe_source, url, where, timeout) for url, where in sources.items()]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if progress is not None:
+                progress(len(results), len(futures))
+    results.sort(key=lambda result: (result.ok, result.url))
+    return results
+
+
+def format_value(value, pattern):
+    return pattern % value if value is not None else "-"
+
+
+def print_report(results):
+    """Mostrar una línea por fuente: primero las que fallaron."""
+    print(f"{'estado':<7} {'tipo':<5} {'TTFB ms':>8} {'kbit/s':>9} {'x real':>7}  URL")
+    for result in results:
+        status = "OK" if result.ok else ("FALLO" if result.checked else "OMITIDO")
+        print(f"{status:<7} {result.kind or '-':<5} {format_value(result.ttfb_ms, '%.0f'):>8} "
+              f"{format_value(result.rate_kbps, '%.0f'):>9} {format_value(result.realtime_factor, '%.1f'):>7}  "
+              f"{result.url}" + (f"  ({result.error})" if result.error else ""))
+    alive = sum(1 for result in results if result.ok)
+    checked = sum(1 for result in results if result.checked)
+    print(f"\n{alive} de {checked} fuentes comprobadas responden ({len(results) - checked} sin comprobar)")
+
+
+def write_report(results, path):
+    with open(path, "w") as file:
+        json.dump({"generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "results": [result.as_record() for result in results]}, file, indent=2)
+
+
+def self_test():
+    """Comprobar el prober contra un servidor HTTP local con HLS, TS y errores."""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    segment = bytes(188 * 1000)
+    files = {
+        "/master.m3u8": b"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\nlow.m3u8\n"
+                        b"#EXT-X-STREAM-INF:BANDWIDTH=3000000,RESOLUTION=1280x720\nhigh.m3u8\n",
+        "/high.m3u8": b"#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXT-X-MEDIA-SEQUENCE:7\n"
+                      b"#EXTINF:4.0,\nseg7.ts\n#EXTINF:4.0,\nseg8.ts\n",
+        "/seg7.ts": segment,
+        "/live.ts": segment,
+        "/empty.m3u8": b"#EXTM3U\n#EXT-X-TARGETDURATION:4\n",
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = files.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Servidor que responde basura en lugar de una línea de estado HTTP
+    garbage = socket.socket()
+    garbage.bind(("127.0.0.1", 0))
+    garbage.listen()
+
+    def answer_garbage():
+        while True:
+            try:
+                connection, _ = garbage.accept()
+            except OSError:
+                return
+            with connection:
+                connection.recv(4096)
+                connection.sendall(b"\x00\x01basura sin estado\r\n\r\n")
+
+    threading.Thread(target=answer_garbage, daemon=True).start()
+    garbage_url = f"http://127.0.0.1:{garbage.getsockname()[1]}/stream.m3u8"
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        closed_port = closed.getsockname()[1]
+    try:
+        sources = {f"{base}/master.m3u8": ["prueba"], f"{base}/live.ts": ["prueba"],
+                   f"{base}/missing.m3u8": ["prueba"], f"{base}/empty.m3u8": ["prueba"],
+                   f"rtsp://127.0.0.1:{closed_port}/x": ["prueba"], "udp://@239.0.0.1:1234": ["prueba"],
+                   garbage_url: ["prueba"]}
+        results = {result.url: result for result in probe_all(sources, concurrency=4, timeout=5)}
+    finally:
+        server.shutdown()
+        garbage.close()
+
+    master = results[f"{base}/master.m3u8"]
+    assert master.ok and master.kind == "hls", master.as_record()
+    assert master.variants == 2 and master.variant_bandwidth == 3000000
+    assert master.segments == 2 and master.live and master.sample_bytes == len(segment)
+    live = results[f"{base}/live.ts"]
+    assert live.ok and live.kind == "http" and live.sample_bytes == len(segment), live.as_record()
+    assert not results[f"{base}/missing.m3u8"].ok and results[f"{base}/missing.m3u8"].http_status == 404
+    assert not results[f"{base}/empty.m3u8"].ok
+    assert not results[f"rtsp://127.0.0.1:{closed_port}/x"].ok
+    assert not results["udp://@239.0.0.1:1234"].checked
+    assert not results[garbage_url].ok and results[garbage_url].error, results[garbage_url].as_record()
+    print("Prueba del prober correcta")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comprobación previa de las fuentes del MultiViewer")
+    parser.add_argument("urls", nargs="*", help="URL adicionales a comprobar")
+    parser.add_argument("--state", default=None, help="archivo de URLs (por defecto el configurado)")
+    parser.add_argument("--playlist", action="append", default=[], help="lista M3U a incluir (se puede repetir)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--report", default="probe_report.json", help="archivo JSON del informe")
+    parser.add_argument("--self-test", action="store_true", help="probar contra un servidor HTTP local")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return self_test()
+
+    sources = collect_sources(args.state or default_urls_file(), args.playlist, args.urls)
+    if not sources:
+        print("No hay fuentes que comprobar.")
+        return 1
+    print(f"Comprobando {len(sources)} fuentes ({args.concurrency} a la vez)...")
+    results = probe_all(sources, args.concurrency, args.timeout,
+                        progress=lambda done, total: print(f"\r{done}/{total}", end="", file=sys.stderr))
+    print(file=sys.stderr)
+    print_report(results)
+    write_report(results, args.report)
+    print(f"Informe guardado en {args.report}")
+    return 0 if all(result.ok for result in results if result.checked) else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import vlc
+from PyQt5.QtCore import QObject, QTimer, QCoreApplication, pyqtSignal
+from alarm_bus import AlarmLog
+
+# Columnas de cada muestra; los contadores de libvlc son acumulados desde que se abrió el stream
+FIELDS = ("time", "state", "input_kbps", "demux_kbps", "decoded_video", "displayed_pictures",
+          "lost_pictures", "decoded_audio", "lost_abuffers", "demux_corrupted")
+COLUMN = {field: index for index, field in enumerate(FIELDS)}
+# Lo que devuelve read_stats: todas las columnas menos el instante de la muestra
+STATS_FIELDS = FIELDS[1:]
+# Contadores que se exportan como tales (el resto son valores instantáneos)
+COUNTERS = ("decoded_video", "displayed_pictures", "lost_pictures", "decoded_audio",
+            "lost_abuffers", "demux_corrupted")
+
+DEFAULT_TELEMETRY_SETTINGS = {
+    "interval_ms": 1000,    # Periodo de lectura de las estadísticas
+    "history": 600,         # Muestras que se guardan por pantalla
+    "overlay": True,        # Mostrar tasa de bits y pérdidas en cada pantalla
+    "loss_window": 60.0,    # Segundos sobre los que se promedian las pérdidas del indicador
+    "prometheus_port": 0,   # Puerto local de /metrics (0 = desactivado)
+    "jsonl": None,          # Archivo donde añadir cada lectura (None = desactivado)
+}
+EXPORT_HOST = "127.0.0.1"
+
+_telemetry = None
+
+
+def get_telemetry():
+    """Obtener el recolector de telemetría único de la aplicación."""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = TelemetryCollector(parent=QCoreApplication.instance())
+    return _telemetry
+
+
+def read_stats(player, stats):
+    """Leer estado y estadísticas de un reproductor de libvlc en el orden de STATS_FIELDS.
+
+    `stats` es un vlc.MediaStats reutilizado entre lecturas. Se usa también en
+    los procesos de decodificación, que envían el resultado con sus mediciones.
+    """
+    state = player.get_state().value
+    media = player.get_media()
+    if media is None or not media.get_stats(stats):
+        return (state,) + (0.0,) * (len(STATS_FIELDS) - 1)
+    return (state, stats.input_bitrate * 8000.0, stats.demux_bitrate * 8000.0,  # kbit/s
+            stats.decoded_video, stats.displayed_pictures, stats.lost_pictures,
+            stats.decoded_audio, stats.lost_abuffers, stats.demux_corrupted)
+
+
+class TelemetryRing:
+    """Historial de tamaño fijo de una pantalla: un arreglo de muestras por columnas."""
+    def __init__(self, capacity):
+        self.data = np.zeros((capacity, len(FIELDS)), dtype=np.float64)
+        self.head = 0  # Fila donde se escribe la próxima muestra
+        self.count = 0
+
+    def append(self, row):
+        self.data[self.head] = row
+        self.head = (self.head + 1) % len(self.data)
+        self.count = min(self.count + 1, len(self.data))
+
+    def latest(self):
+        """Última muestra, o None si aún no hay ninguna."""
+        if not self.count:
+            return None
+        return self.data[self.head - 1]
+
+    def rows(self):
+        """Las muestras guardadas en orden cronológico (copia)."""
+        if self.count < len(self.data):
+            return self.data[:self.count].copy()
+        return np.roll(self.data, -self.head, axis=0)
+
+    def increase(self, field, seconds):
+        """Cuánto creció un contador en los últimos `seconds` (sin contar los reinicios al reconectar)."""
+        rows = self.rows()
+        rows = rows[rows[:, COLUMN["time"]] >= rows[-1, COLUMN["time"]] - seconds] if len(rows) else rows
+        if len(rows) < 2:
+            return 0.0
+        return float(np.clip(np.diff(rows[:, COLUMN[field]]), 0.0, None).sum())
+
+
+class MetricsServer:
+    """Servidor HTTP local que entrega el último texto de /metrics (formato Prometheus)."""
+    def __init__(self, port):
+        self.text = ""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = server.text.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((EXPORT_HOST, port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name="telemetry-http", daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def format_metrics(samples):
+    """Texto en formato de exposición de Prometheus para las últimas muestras de cada pantalla."""
+    lines = []
+    for field in STATS_FIELDS:
+        name = f"multiviewer_{field}" + ("_total" if field in COUNTERS else "")
+        lines.append(f"# TYPE {name} {'counter' if field in COUNTERS else 'gauge'}")
+        for (source, label), row in samples:
+            lines.append(f'{name}{{tile="{escape_label(source)}",name="{escape_label(label)}"}} '
+                         f"{row[COLUMN[field]]:g}")
+    return "\n".join(lines) + "\n"
+
+
+class TelemetryCollector(QObject):
+    """Lee periódicamente las estadísticas de libvlc de todas las pantallas en reproducción.
+
+    Guarda un historial fijo por pantalla, actualiza el indicador de cada una y,
+    si está configurado, publica los valores en /metrics y en un archivo JSONL.
+    """
+    # Cada lectura: [((pantalla, nombre), fila con las columnas de FIELDS)]
+    sampled = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.settings = dict(DEFAULT_TELEMETRY_SETTINGS)
+        self.tiles = []
+        self.rings = {}  # pantalla -> TelemetryRing (se conserva al pausar)
+        self.stats = vlc.MediaStats()
+        self.server = None
+        self.log = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.settings["interval_ms"])
+        self.timer.timeout.connect(self.poll)
+
+    def configure(self, settings):
+        """Aplicar la configuración y abrir los destinos de exportación la primera vez."""
+        self.settings.update(settings or {})
+        self.timer.setInterval(int(self.settings["interval_ms"]))
+        port = self.settings["prometheus_port"]
+        if port and self.server is None:
+            try:
+                self.server = MetricsServer(int(port))
+            except OSError as e:
+                print(f"No se pudo abrir el puerto de telemetría {port}: {e}")
+        if self.settings["jsonl"] and self.log is None:
+            # Mismo escritor en segundo plano que el registro de alarmas
+            self.log = AlarmLog(self.settings["jsonl"])
+
+    def register(self, tile):
+        """Empezar a leer las estadísticas de una pantalla (al reproducir)."""
+        if tile not in self.tiles:
+            self.tiles.append(tile)
+        if tile not in self.rings:
+            self.rings[tile] = TelemetryRing(int(self.settings["history"]))
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def unregister(self, tile):
+        """Dejar de leer una pantalla (al pausar o detener); su historial se conserva."""
+        if tile in self.tiles:
+            self.tiles.remove(tile)
+        if not self.tiles:
+            self.timer.stop()
+
+    def forget(self, tile):
+        """Descartar el historial de una pantalla que se cierra."""
+        self.unregister(tile)
+        self.rings.pop(tile, None)
+
+    def poll(self):
+        """Tomar una muestra de cada pantalla activa y publicarla."""
+        now = time.time()
+        samples = []
+        records = []
+        for tile in self.tiles:
+            player = tile.player
+            if getattr(player, "remote", False):
+                # El proceso de decodificación envía sus estadísticas con las mediciones
+                values = player.stats
+                if values is None:
+                    continue
+            else:
+                values = read_stats(player, self.stats)
+            ring = self.rings[tile]
+            ring.append((now,) + tuple(values))
+            row = ring.latest()
+            samples.append(((tile.alarm_source, tile.alarm_label()), row))
+            if self.settings["overlay"]:
+                window = self.settings["loss_window"]
+                tile.show_telemetry(row, ring.increase("lost_pictures", window) * 60.0 / window)
+            if self.log is not None:
+                record = {field: float(value) for field, value in zip(FIELDS, row)}
+                record["tile"] = tile.alarm_source
+                records.append(record)
+
+        if self.server is not None:
+            self.server.text = format_metrics(samples)
+        for record in records:
+            self.log.write(record)
+        if samples:
+            self.sampled.emit(samples)
+
+    def history(self, tile):
+        """Muestras guardadas de una pantalla (arreglo con las columnas de FIELDS)."""
+        ring = self.rings.get(tile)
+        return ring.rows() if ring is not None else np.zeros((0, len(FIELDS)))
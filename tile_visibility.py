@@ -0,0 +1,96 @@
+import time
+from PyQt5.QtCore import QObject, QTimer
+from metering_scheduler import is_tile_hidden
+
+# Qué hacer con el video de las pantallas que no se ven:
+# "pause" deja de decodificar y dibujar la imagen (el audio y la conexión siguen),
+# "keep" las deja como están
+OFFSCREEN_PAUSE = "pause"
+OFFSCREEN_KEEP = "keep"
+# Periodo de la revisión de qué pantallas se ven
+VISIBILITY_CHECK_MS = 500
+# Segundos fuera de vista antes de pausar el video (evita cortes al desplazarse)
+OFFSCREEN_DELAY = 3.0
+
+
+class VideoGate:
+    """Activa o desactiva la pista de video de un reproductor de libvlc.
+
+    Sin pista de video libvlc no decodifica ni dibuja la imagen, pero el stream
+    sigue conectado y el audio sigue llegando a los medidores. Se usa igual en
+    la interfaz y en los procesos de decodificación.
+    """
+    def __init__(self, player):
+        self.player = player
+        self.suspended = False
+        self.track = -1  # Pista que tenía el reproductor antes de pausar el video
+
+    def suspend(self):
+        self.suspended = True
+        self.enforce()
+
+    def enforce(self):
+        """Volver a quitar la pista si el stream se reabrió mientras estaba pausado."""
+        if not self.suspended:
+            return
+        track = self.player.video_get_track()
+        if track >= 0:
+            self.track = track
+            self.player.video_set_track(-1)
+
+    def resume(self):
+        self.suspended = False
+        if self.player.video_get_track() >= 0:
+            return
+        # Tras una reconexión la pista puede tener otro número: se usa la primera disponible
+        if self.track < 0 or self.player.video_set_track(self.track) != 0:
+            for track, _ in self.player.video_get_track_description() or []:
+                if track >= 0:
+                    self.player.video_set_track(track)
+                    break
+        self.track = -1
+
+
+class VisibilityTracker(QObject):
+    """Pausa el video de las pantallas de una ventana que quedan fuera de vista.
+
+    Revisa periódicamente (y al desplazarse) qué pantallas se ven. Las que
+    vuelven a verse se reanudan enseguida; las que dejan de verse se pausan
+    tras OFFSCREEN_DELAY segundos para no cortar el video al pasar de largo.
+    """
+    def __init__(self, tiles, policy=OFFSCREEN_PAUSE, parent=None):
+        super().__init__(parent)
+        self.tiles = tiles  # Lista de pantallas de la ventana (se comparte, no se copia)
+        self.policy = policy
+        self.hidden_since = {}  # pantalla -> instante en que dejó de verse
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(VISIBILITY_CHECK_MS)
+        self.timer.timeout.connect(self.refresh)
+        if policy == OFFSCREEN_PAUSE:
+            self.timer.start()
+
+    def refresh(self):
+        """Pausar o reanudar el video de cada pantalla según si se ve."""
+        if self.policy != OFFSCREEN_PAUSE:
+            return
+        now = time.monotonic()
+        for tile in self.tiles:
+            if tile.player is None:
+                continue
+            # Una pantalla en pantalla completa se ve aunque su celda esté fuera de vista
+            if not tile.is_fullscreen and is_tile_hidden(tile):
+                since = self.hidden_since.setdefault(tile, now)
+                if now - since >= OFFSCREEN_DELAY:
+                    tile.set_video_suspended(True)
+            else:
+                self.hidden_since.pop(tile, None)
+                tile.set_video_suspended(False)
+
+    def forget(self, tile):
+        """Olvidar una pantalla que se cierra."""
+        self.hidden_since.pop(tile, None)
+
+    def stop(self):
+        self.timer.stop()
+        self.hidden_since.clear()
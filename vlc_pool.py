@@ -0,0 +1,63 @@
+import vlc
+
+# Opciones de libvlc por defecto (se pueden cambiar en multiviewer_config.json
+# bajo la clave "vlc_options"). La decodificación por hardware la decide cada
+# pantalla con decode_policy (clave "decode").
+DEFAULT_VLC_OPTIONS = {
+    "network_caching": 1000,    # Milisegundos de búfer de red
+    "extra": [],                # Argumentos de libvlc adicionales, tal cual
+}
+
+_pool = None
+
+
+def get_instance_pool():
+    """Obtener el conjunto de instancias de libvlc del proceso."""
+    global _pool
+    if _pool is None:
+        _pool = InstancePool()
+    return _pool
+
+
+def get_vlc_instance(no_audio=False):
+    """Instancia de libvlc compartida con las opciones configuradas."""
+    return get_instance_pool().get(no_audio)
+
+
+class InstancePool:
+    """Instancias de libvlc compartidas por todas las ventanas del proceso.
+
+    Crear una instancia carga los plugins de libvlc y tarda; aquí se crea una
+    sola por combinación de opciones y todos los reproductores la reutilizan.
+    """
+    def __init__(self):
+        self.options = dict(DEFAULT_VLC_OPTIONS)
+        self.instances = {}  # argumentos -> vlc.Instance
+
+    def configure(self, options):
+        """Aplicar las opciones de la configuración sobre los valores por defecto.
+
+        Las instancias ya creadas no cambian; las nuevas opciones se usan a
+        partir de la próxima instancia que se pida.
+        """
+        self.options.update(options or {})
+
+    def instance_args(self, no_audio=False):
+        """Argumentos de línea de comandos de libvlc para las opciones actuales."""
+        args = [f"--network-caching={int(self.options['network_caching'])}"]
+        if no_audio:
+            # Sin decodificar audio (no sirve para pantallas con medidor de nivel)
+            args.append("--no-audio")
+        args.extend(self.options["extra"])
+        return tuple(args)
+
+    def get(self, no_audio=False):
+        """Devolver (creándola la primera vez) la instancia para estas opciones."""
+        args = self.instance_args(no_audio)
+        instance = self.instances.get(args)
+        if instance is None:
+            instance = vlc.Instance(list(args))
+            if instance is None:
+                raise RuntimeError(f"No se pudo iniciar libvlc con las opciones {' '.join(args)}")
+            self.instances[args] = instance
+        return instance